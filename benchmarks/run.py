@@ -0,0 +1,162 @@
+"""Benchmarks of parser, graph and scheduler hot paths
+
+Usage:
+    python benchmarks/run.py --steps 200 --checks 4 --latency 0.01 --output bench.json
+
+Results are printed (or written) as JSON so that runs of different releases
+can be compared.
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+from etl_lite.core.executor import ParallelExecutor
+from etl_lite.core.graph import StepGraph
+from etl_lite.core.parser import BLOCK_SEPARATOR, MAIN_SEPARATOR, ParseCache, parse_sql_file
+from etl_lite.engines.connection import ConnectionPool
+from etl_lite.utils import yaml_loader
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fake_client import FakeEngine  # noqa: E402
+from synthetic import generate_steps  # noqa: E402
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Wall time statistics of func over repeat runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+    }
+
+
+def bench_parse(paths: List[Path], repeat: int) -> Dict[str, Any]:
+    """parse_sql_file throughput without cache, with a cold and a warm cache"""
+    def uncached():
+        for path in paths:
+            parse_sql_file(path, cache=None)
+
+    def cold_cache():
+        cache = ParseCache()
+        for path in paths:
+            cache.get(path)
+
+    warm = ParseCache()
+    for path in paths:
+        warm.get(path)
+
+    def warm_cache():
+        for path in paths:
+            warm.get(path)
+
+    results = {}
+    for name, func in [('uncached', uncached), ('cold_cache', cold_cache), ('warm_cache', warm_cache)]:
+        timing = measure(func, repeat)
+        timing['files_per_second'] = len(paths) / timing['median']
+        results[name] = timing
+    return results
+
+
+def bench_yaml(paths: List[Path], repeat: int) -> Dict[str, Any]:
+    """Metadata block YAML loading: pure Python PyYAML, libyaml and the fast path"""
+    import yaml
+
+    texts = []
+    for path in paths:
+        metadata_text = MAIN_SEPARATOR.split(path.read_text())[0]
+        for block in BLOCK_SEPARATOR.split(metadata_text)[1:]:
+            lines = block.strip().split('\n')[1:]
+            texts.append('\n'.join(re.sub(r'^\s*--\s?', '', line) for line in lines))
+
+    loaders = [('pure_python', lambda text: yaml.load(text, Loader=yaml.SafeLoader))]
+    if hasattr(yaml, 'CSafeLoader'):
+        loaders.append(('libyaml', lambda text: yaml.load(text, Loader=yaml.CSafeLoader)))
+    loaders.append(('fast_path', yaml_loader.load_yaml))
+
+    results = {'blocks': len(texts)}
+    for name, load in loaders:
+        timing = measure(lambda: [load(text) for text in texts], repeat)
+        timing['blocks_per_second'] = len(texts) / timing['median']
+        results[name] = timing
+    for name, _ in loaders[1:]:
+        results[name]['speedup'] = results['pure_python']['median'] / results[name]['median']
+    return results
+
+
+def bench_graph(steps: List[tuple], repeat: int) -> Dict[str, Any]:
+    """Graph construction including edge computation and topological sort"""
+    return measure(lambda: StepGraph.from_metadata(steps).topological_order(), repeat)
+
+
+def bench_schedule(steps: List[tuple], latency: float, workers: int, repeat: int) -> Dict[str, Any]:
+    """Scheduler run time against a fake client compared to the ideal schedule"""
+    graph = StepGraph.from_metadata(steps)
+    engine = FakeEngine(latency)
+    pool = ConnectionPool(engine, min_size=workers, max_size=workers)
+    executor = ParallelExecutor(pool, max_workers=workers)
+
+    queries_before = engine.queries
+    timing = measure(lambda: executor.run(graph), repeat)
+    queries_per_run = (engine.queries - queries_before) // repeat
+
+    # Lower bound: longest dependency chain, and total work spread over all workers
+    per_step = latency * queries_per_run / len(steps)
+    chain = len(graph.critical_path({name: 1.0 for name in graph.nodes}))
+    ideal = max(chain * per_step, len(steps) * per_step / workers)
+    timing.update({
+        'workers': workers,
+        'latency': latency,
+        'queries_per_run': queries_per_run,
+        'ideal': ideal,
+        'overhead': timing['median'] - ideal,
+    })
+    pool.close()
+    return timing
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=200, help='number of synthetic step files')
+    parser.add_argument('--checks', type=int, default=4, help='tests/invariants per step')
+    parser.add_argument('--latency', type=float, default=0.002, help='fake query latency, seconds')
+    parser.add_argument('--workers', type=int, default=8, help='scheduler worker slots')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions per benchmark')
+    parser.add_argument('--output', type=Path, help='write JSON results to file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_steps(Path(directory), steps=args.steps, checks=args.checks)
+        steps = [(path, parse_sql_file(path, cache=None)) for path in paths]
+
+        results = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {**vars(args), 'output': str(args.output) if args.output else None},
+            'parse': bench_parse(paths, args.repeat),
+            'yaml': bench_yaml(paths, args.repeat),
+            'graph': bench_graph(steps, args.repeat),
+            'schedule': bench_schedule(steps, args.latency, args.workers, args.repeat),
+        }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    return results
+
+
+if __name__ == '__main__':
+    main()
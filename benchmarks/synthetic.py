@@ -0,0 +1,86 @@
+"""Synthetic step files for benchmarks"""
+from pathlib import Path
+from typing import List
+import random
+
+STEP_TEMPLATE = """-- @meta.engine: ClickHouse
+--   type: clickhouse
+--   settings:
+--     max_memory_usage: 20000000000
+
+-- @meta.description: Synthetic step {index}
+--   Generated for benchmarking
+
+-- @target.table: Output of step {index}
+--   name: bench.step_{index}
+--   engine: MergeTree
+--   order_by: [id, day]
+--   partition_by: toYYYYMM(day)
+--   columns:
+--     id: UInt64
+--     day: Date
+--     amount: Float64
+{checks}
+-- @main
+SELECT id, day, sum(amount) AS amount
+FROM {source}
+GROUP BY id, day
+"""
+
+CHECK_TEMPLATES = [
+    """
+-- @test.no_duplicates: Unique rows {i}
+--   name: unique_{i}
+--   columns: [id, day]
+""",
+    """
+-- @test.range: Amount range {i}
+--   name: range_{i}
+--   column: amount
+--   min: 0
+--   max: 1000000
+""",
+    """
+-- @invariant.sum: Total amount {i}
+--   name: total_{i}
+--   column: amount
+--   tolerance: relative(0.001)
+""",
+    """
+-- @invariant.count: Row count {i}
+--   name: count_{i}
+--   tolerance: absolute(0)
+""",
+]
+
+
+def generate_steps(directory: Path, steps: int = 200, checks: int = 4,
+                   dependency_ratio: float = 0.3, seed: int = 42) -> List[Path]:
+    """Write synthetic step files
+
+    Args:
+        directory: Output directory
+        steps: Number of step files
+        checks: Number of test/invariant blocks per step
+        dependency_ratio: Share of steps reading an earlier step instead of raw data
+        seed: Random seed, so generated pipelines are reproducible
+
+    Returns:
+        Paths of generated files in declaration order
+    """
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(steps):
+        if index and rng.random() < dependency_ratio:
+            source = f"bench.step_{rng.randrange(index)}"
+        else:
+            source = f"raw.source_{index % 10}"
+        blocks = "".join(
+            CHECK_TEMPLATES[i % len(CHECK_TEMPLATES)].format(i=i)
+            for i in range(checks)
+        )
+        path = directory / f"{index:04d}_step.sql"
+        path.write_text(STEP_TEMPLATE.format(index=index, checks=blocks, source=source))
+        paths.append(path)
+    return paths
@@ -0,0 +1,143 @@
+# src/etl_lite/clickhouse/connection.py
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from clickhouse_driver import Client
+from clickhouse_driver.protocol import ServerPacketTypes
+
+from etl_lite.engines.base import Engine
+
+
+class ClickHouseClient(Client):
+    """clickhouse_driver Client streaming columnar blocks
+
+    `execute_iter(..., columnar=True)` yields the columns of every block the
+    server sends (NumPy arrays with the use_numpy setting) instead of
+    transposing blocks into row tuples, so large results can be turned into
+    DataFrames block by block without a row-wise copy.
+    """
+
+    columnar_iter = True
+
+    def execute_iter(self, query, params=None, with_column_types=False, external_tables=None,
+                     query_id=None, settings=None, types_check=False, chunk_size=1, columnar=False):
+        if not columnar:
+            return super().execute_iter(query, params, with_column_types, external_tables, query_id,
+                                        settings, types_check, chunk_size)
+        with self.disconnect_on_error(query, settings):
+            if params is not None:
+                query = self.substitute_params(query, params, self.connection.context)
+            self.connection.send_query(query, query_id=query_id, params=params)
+            self.connection.send_external_tables(external_tables, types_check=types_check)
+            return column_blocks(self.packet_generator(), with_column_types)
+
+
+def column_blocks(packets: Iterable[Any], with_column_types: bool = False) -> Iterator[Any]:
+    """Columns of the data blocks of a query result
+
+    With `with_column_types` the (name, type) list of the result is yielded
+    first, taken from the header block the server sends before any rows.
+    """
+    header = with_column_types
+    for packet in packets:
+        block = getattr(packet, 'block', None)
+        if block is None or packet.type != ServerPacketTypes.DATA:
+            continue
+        if header:
+            header = False
+            yield block.columns_with_types
+        if block.num_rows:
+            yield block.get_columns()
+
+
+class ClickHouseEngine(Engine):
+    """ClickHouse engine based on clickhouse_driver
+
+    Keyword arguments are passed to clickhouse_driver.Client (host, port,
+    user, password, database, settings...). Connections are ClickHouseClient
+    instances, which can stream columnar blocks.
+    """
+
+    name = 'clickhouse'
+    server_side_params = True
+
+    def __init__(self, **client_kwargs: Any):
+        self.client_kwargs = client_kwargs
+
+    def connect(self) -> ClickHouseClient:
+        return ClickHouseClient(**self.client_kwargs)
+
+    def close(self, connection: Client):
+        connection.disconnect()
+
+    def kill_queries(self, query_ids: List[str]) -> bool:
+        """KILL QUERY by query_id, finished queries are ignored by the server"""
+        if query_ids:
+            connection = self.connect()
+            try:
+                connection.execute(
+                    "KILL QUERY WHERE query_id IN %(query_ids)s ASYNC",
+                    {'query_ids': tuple(query_ids)},
+                )
+            finally:
+                self.close(connection)
+        return True
+
+    def table_versions(self, connection: Client, tables: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Row counts, sizes and modification times of tables from system tables
+
+        Only MergeTree tables with active parts have a version: views,
+        Distributed, Merge, Buffer and external tables have no parts and
+        their row counts and metadata times don't follow their data.
+        """
+        tables = list(tables)
+        if not tables:
+            return {}
+
+        database = connection.execute("SELECT currentDatabase()")[0][0]
+        qualified = {
+            table: tuple(table.split('.', 1)) if '.' in table else (database, table)
+            for table in tables
+        }
+        keys = tuple(set(qualified.values()))
+
+        known = {}
+        for db, name, rows, size, modified in connection.execute(
+            "SELECT database, name, total_rows, total_bytes, toString(metadata_modification_time) "
+            "FROM system.tables WHERE (database, name) IN %(keys)s",
+            {'keys': keys},
+        ):
+            if rows is not None:
+                known[(db, name)] = [rows, size, modified]
+
+        # MergeTree tables: active parts change on every insert, merge or mutation
+        versions = {}
+        for db, name, parts, rows, modified in connection.execute(
+            "SELECT database, table, count(), sum(rows), toString(max(modification_time)) "
+            "FROM system.parts WHERE active AND (database, table) IN %(keys)s "
+            "GROUP BY database, table",
+            {'keys': keys},
+        ):
+            if (db, name) in known:
+                versions[(db, name)] = known[(db, name)] + [parts, rows, modified]
+
+        return {table: versions.get(key) for table, key in qualified.items()}
+
+    def partition_versions(self, connection: Client, table: str) -> Optional[Dict[str, Any]]:
+        """Active parts of each partition; inserts, merges and mutations all replace parts"""
+        database, name = table.split('.', 1) if '.' in table else ('', table)
+        keys = {'database': database, 'table': name}
+        engine = connection.execute(
+            "SELECT engine FROM system.tables "
+            "WHERE database = if(%(database)s = '', currentDatabase(), %(database)s) AND name = %(table)s",
+            keys,
+        )
+        if not engine or 'MergeTree' not in engine[0][0]:
+            return None
+
+        parts = connection.execute(
+            "SELECT partition_id, cityHash64(arrayStringConcat(arraySort(groupArray(name)), ',')), sum(rows) "
+            "FROM system.parts WHERE active "
+            "AND database = if(%(database)s = '', currentDatabase(), %(database)s) AND table = %(table)s "
+            "GROUP BY partition_id",
+            keys,
+        )
+        return {partition: [names, rows] for partition, names, rows in parts}
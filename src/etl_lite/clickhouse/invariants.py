@@ -1,19 +1,27 @@
-from etl_lite.sql import invariants as sql_invariants
+from etl_lite.modules.sql import invariants as sql_invariants
+from etl_lite.core.checks import AggregateCheck, aggregate_check
 from typing import Any
 
 # Override generic SQL implementation
-def sum(connection: Any, name: str, column: str, tolerance: str):
+@aggregate_check
+def sum(name: str, column: str, tolerance: str) -> AggregateCheck:
     """ClickHouse-specific sum implementation"""
-    query = f"SELECT sum({column}) FROM {{table}} SETTINGS optimize_aggregation_in_order=1"
-    result = connection.execute(query)
-    return float(result[0][0])
+    return AggregateCheck(
+        expressions=(f"sum({column})",),
+        evaluate=float,
+        settings={'optimize_aggregation_in_order': 1},
+        additive=True,
+    )
 
 # Add ClickHouse-specific invariant
-def array_sum(connection: Any, name: str, column: str, tolerance: str):
+@aggregate_check
+def array_sum(name: str, column: str, tolerance: str) -> AggregateCheck:
     """ClickHouse-specific array sum invariant"""
-    query = f"SELECT sum(arraySum({column})) FROM {{table}}"
-    result = connection.execute(query)
-    return float(result[0][0])
+    return AggregateCheck(
+        expressions=(f"sum(arraySum({column}))",),
+        evaluate=float,
+        additive=True,
+    )
 
 # Inherit other functions from SQL invariants
 count = sql_invariants.count
@@ -0,0 +1,11 @@
+from etl_lite.modules.sql import strategies as sql_strategies
+from etl_lite.core.strategy import ChunkStrategy
+from typing import Any, List, Optional
+
+# Override generic SQL implementation
+def chunk(column: str, count: Optional[int] = None, values: Optional[List[Any]] = None) -> ChunkStrategy:
+    """ClickHouse-specific chunking, hashing works for columns of any type"""
+    return ChunkStrategy(column=column, count=count, values=values, hash_function='cityHash64')
+
+# Inherit other functions from SQL strategies
+incremental = sql_strategies.incremental
@@ -1,28 +1,42 @@
 # src/etl_lite/clickhouse/tests.py
-from etl_lite.sql import tests as sql_tests
+from etl_lite.modules.sql import tests as sql_tests
+from etl_lite.core.checks import AggregateCheck, aggregate_check
 from typing import List, Any
 
+# Bound of the relative error of uniqCombined64 estimates: three standard
+# errors of its HyperLogLog (precision 17), rounded up
+UNIQ_COMBINED_ERROR = 0.01
+
 # Override generic SQL implementation
-def no_duplicates(connection: Any, name: str, columns: List[str]):
-    """ClickHouse-specific duplicate check"""
-    cols = ", ".join(columns)
-    query = f"""
-        SELECT count(*) = count(distinct({cols}))
-        FROM {{table}}
-        SETTINGS optimize_aggregation_in_order=1
+@aggregate_check
+def no_duplicates(name: str, columns: List[str]) -> AggregateCheck:
+    """ClickHouse-specific duplicate check
+
+    The fast variant compares the row count with uniqCombined64, which needs
+    a small fixed amount of memory instead of an exact hash set. The
+    estimate may overshoot the number of distinct rows by up to
+    UNIQ_COMBINED_ERROR, so it is only green when it exceeds the row count
+    by more than that; anything else is amber and the exact check decides.
     """
-    result = connection.execute(query)
-    return bool(result[0][0])
+    cols = ", ".join(columns)
+    return AggregateCheck(
+        expressions=("count(*)", f"count(distinct({cols}))"),
+        evaluate=lambda total, distinct: total == distinct,
+        settings={'optimize_aggregation_in_order': 1},
+        fast=AggregateCheck(
+            expressions=("count(*)", f"uniqCombined64({cols})"),
+            evaluate=lambda total, estimate: 'green' if estimate > total * (1 + UNIQ_COMBINED_ERROR) else 'amber',
+        ),
+    )
 
 # Add ClickHouse-specific test
-def array_length(connection: Any, name: str, column: str, min_length: int):
+@aggregate_check
+def array_length(name: str, column: str, min_length: int) -> AggregateCheck:
     """ClickHouse-specific array length test"""
-    query = f"""
-        SELECT min(length({column})) >= {min_length}
-        FROM {{table}}
-    """
-    result = connection.execute(query)
-    return bool(result[0][0])
+    return AggregateCheck(
+        expressions=(f"min(length({column}))",),
+        evaluate=lambda shortest: shortest >= min_length,
+    )
 
 # Inherit other functions from SQL tests
 range = sql_tests.range
@@ -0,0 +1,162 @@
+# src/etl_lite/core/async_executor.py
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import datetime
+import logging
+import threading
+import time
+
+from etl_lite.core.cache import QueryCache
+from etl_lite.core.executor import ParallelExecutor
+from etl_lite.core.graph import StepGraph
+from etl_lite.core.results import PipelineResult, QueryProgress, StepResult, StepStatus
+from etl_lite.core.state import RunStateStore
+from etl_lite.core.strategy import WatermarkStore
+from etl_lite.engines.connection import ConnectionPool
+
+
+class _Slots:
+    """Counter of free worker slots that steps wait on"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.free = total
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, count: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.free >= count)
+            self.free -= count
+
+    async def release(self, count: int):
+        async with self._condition:
+            self.free += count
+            self._condition.notify_all()
+
+
+class AsyncExecutor:
+    """Run steps of a StepGraph from an asyncio event loop
+
+    The blocking driver calls of each step run on a dedicated thread pool,
+    so the event loop stays free and one process can keep up to
+    `max_in_flight` steps (and their queries) running at once. The number of
+    open connections is still bounded by the pool's max_size.
+
+    Steps can be given a timeout, and the whole run can be cancelled by
+    cancelling the awaiting task. The running query of a cancelled or timed
+    out step is cancelled on the server (and killed by query_id as well),
+    the step is reported as cancelled and its downstream is skipped.
+
+    Example:
+        executor = AsyncExecutor(ConnectionPool(ClickHouseEngine(), max_size=64), max_in_flight=64)
+        result = await executor.run(graph, timeout=600)
+    """
+
+    def __init__(self, pool: ConnectionPool, max_in_flight: int = 64,
+                 watermarks: Optional[WatermarkStore] = None,
+                 state: Optional[RunStateStore] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None):
+        """
+        Args:
+            pool: Connection pool; each running step holds one connection
+            max_in_flight: Maximum number of worker slots used concurrently
+            watermarks: Watermark store for incremental steps
+            state: Run state store; steps unchanged since their last run are skipped
+            on_progress: Called from worker threads with the progress of
+                running queries
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        # Steps are executed exactly as by the thread based scheduler
+        self.steps = ParallelExecutor(pool, max_workers=max_in_flight, watermarks=watermarks,
+                                      state=state, on_progress=on_progress)
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self, graph: StepGraph, select: Optional[List[str]] = None,
+                  timeout: Optional[float] = None) -> PipelineResult:
+        """Execute all steps of the graph
+
+        Args:
+            graph: Step dependency graph
+            select: Selectors limiting the run to part of the graph
+                (see StepGraph.select)
+            timeout: Maximum run time of a single step in seconds
+
+        Returns:
+            Pipeline result with a StepResult per executed step
+        """
+        if select:
+            graph = graph.subgraph(graph.select(select))
+            self.logger.info(f"Selected {len(graph.nodes)} steps: {', '.join(graph.nodes)}")
+
+        order = graph.topological_order()
+        result = PipelineResult(started_at=datetime.datetime.now())
+        steps: Dict[str, StepResult] = {}
+        slots = _Slots(self.max_in_flight)
+        cache = self.steps.new_cache()
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as threads:
+            tasks: Dict[str, asyncio.Future] = {}
+            for name in order:
+                upstream = [tasks[dependency] for dependency in graph.upstream(name)]
+                tasks[name] = asyncio.ensure_future(
+                    self._schedule(graph, name, upstream, steps, slots, threads, timeout, cache)
+                )
+            try:
+                await asyncio.gather(*tasks.values())
+            except asyncio.CancelledError:
+                # Cancellation reached every step task, let them stop their workers
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+                raise
+
+        result.elapsed = time.perf_counter() - start
+        result.steps = {name: steps[name] for name in order if name in steps}
+        return result
+
+    async def _schedule(self, graph: StepGraph, name: str, upstream: List[asyncio.Future],
+                        steps: Dict[str, StepResult], slots: _Slots,
+                        threads: ThreadPoolExecutor, timeout: Optional[float],
+                        cache: Optional[QueryCache] = None) -> bool:
+        """Wait for upstream steps, then run the step; returns whether it succeeded"""
+        if not all(await asyncio.gather(*upstream)):
+            self.logger.warning(f"Skipping step {name}: an upstream step did not succeed")
+            steps[name] = StepResult(name=name, status=StepStatus.SKIPPED)
+            return False
+
+        count = max(1, min(graph.nodes[name].concurrency, self.max_in_flight))
+        await slots.acquire(count)
+        try:
+            steps[name] = result = StepResult(name=name)
+            cancel = threading.Event()
+            future = asyncio.get_running_loop().run_in_executor(
+                threads, self.steps._run_step, graph, name, result, cancel, cache
+            )
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                cancel.set()
+                # The worker cancels its query at the next progress packet; killing
+                # it by id also covers drivers that don't report progress
+                loop = asyncio.get_running_loop()
+                await asyncio.gather(loop.run_in_executor(None, self.steps.kill, result), return_exceptions=True)
+                # Wait for the worker to let go of its connection
+                await asyncio.gather(future, return_exceptions=True)
+                result.status = StepStatus.CANCELLED
+                if isinstance(e, asyncio.CancelledError):
+                    result.error = "Cancelled"
+                    raise
+                result.error = f"Timed out after {timeout}s"
+                self.logger.error(f"Step {name} timed out after {timeout}s")
+                return False
+            except Exception as e:
+                self.logger.error(f"Step {name} failed: {e}")
+                if result.status != StepStatus.CANCELLED:
+                    result.status = StepStatus.FAILED
+                result.error = str(e)
+                return False
+            return True
+        finally:
+            await slots.release(count)
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+import json
+import logging
+import threading
+
+from etl_lite.core.graph import table_matches
+from etl_lite.core.results import InstrumentedConnection
+from etl_lite.engines.base import Engine
+from etl_lite.utils.sql_parser import extract_tables, tokenize
+
+# Functions whose result changes between executions of the same query
+NONDETERMINISTIC = frozenset("""
+    now now64 today yesterday rand rand32 rand64 randconstant randuniform
+    generateuuidv4 rownumberinallblocks blocknumber currentdatabase
+""".split())
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_ROWS = 1000     # larger results are not cached
+
+
+@dataclass
+class CacheEntry:
+    """Cached result of a read-only query"""
+    tables: FrozenSet[str]      # tables read by the query
+    rows: Any
+
+
+class QueryCache:
+    """Run-level LRU cache of read-only check query results
+
+    Steps of one run often evaluate the same invariants and tests against the
+    same unchanged tables (e.g. counts of shared dimension tables). Results
+    are keyed by the normalized query text (comments and whitespace removed),
+    its parameters and, when the engine can tell, the versions of the tables
+    it reads. Entries reading a table are dropped when a step writes to it.
+
+    Only queries that read tables and call no nondeterministic functions
+    (now(), rand() ...) are cached, system tables excluded.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_rows: int = DEFAULT_MAX_ROWS):
+        """
+        Args:
+            engine: Engine used to look up table versions; without versions
+                entries are only invalidated by writes of the run
+            max_entries: Maximum number of cached results, least recently
+                used ones are evicted first
+            max_rows: Maximum number of rows of a cached result
+        """
+        self.engine = engine
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[tuple, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def execute(self, connection: Any, query: str, params: Any = None, **kwargs) -> Any:
+        """Execute query on connection, answering from the cache when possible"""
+        cacheable = self._cacheable(query)
+        if cacheable is None:
+            return connection.execute(query, params, **kwargs)
+        normalized, tables = cacheable
+
+        versions = None
+        if self.engine is not None:
+            versions = self._table_versions(connection, sorted(tables))
+            if versions is not None and any(version is None for version in versions.values()):
+                # Views and other tables without a version may change with any write
+                return connection.execute(query, params, **kwargs)
+        key = (normalized, json.dumps([params, kwargs, versions], sort_keys=True, default=str))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.rows
+            self.misses += 1
+
+        rows = connection.execute(query, params, **kwargs)
+        if isinstance(rows, list) and len(rows) <= self.max_rows:
+            with self._lock:
+                self._entries[key] = CacheEntry(tables, rows)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return rows
+
+    def _table_versions(self, connection: Any, tables: List[str]) -> Optional[Dict[str, Any]]:
+        """Look up table versions, recorded apart from the queries being cached
+
+        On instrumented connections the lookup runs in the 'versions' phase,
+        so it doesn't count towards the time of the checks it serves.
+        """
+        if not isinstance(connection, InstrumentedConnection):
+            return self.engine.table_versions(connection, tables)
+        phase, label = connection.phase, connection.label
+        connection.phase, connection.label = 'versions', None
+        try:
+            return self.engine.table_versions(connection, tables)
+        finally:
+            connection.phase, connection.label = phase, label
+
+    def wrap(self, connection: Any) -> 'CachedConnection':
+        """Connection answering read-only queries from this cache"""
+        return CachedConnection(connection, self)
+
+    def invalidate(self, tables: Iterable[str]):
+        """Drop results of queries reading any of the tables"""
+        tables = list(tables)
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if any(table_matches(read, table) or table_matches(table, read)
+                       for read in entry.tables for table in tables)
+            ]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            self.logger.debug(f"Invalidated {len(stale)} cached results of {', '.join(tables)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _cacheable(query: str) -> Optional[Tuple[str, FrozenSet[str]]]:
+        """(normalized query, tables read) of a cacheable query, None otherwise"""
+        tokens = [text for _, text in tokenize(query)]
+        if not tokens or tokens[0].lower() not in ('select', 'with'):
+            return None
+        if any(token.lower() in NONDETERMINISTIC for token in tokens):
+            return None
+        tables = extract_tables(query).tables
+        if not tables or any(table.lower().startswith('system.') for table in tables):
+            return None
+        return ' '.join(tokens), tables
+
+
+class CachedConnection:
+    """Connection wrapper answering read-only queries from a QueryCache"""
+
+    def __init__(self, connection: Any, cache: QueryCache):
+        self.connection = connection
+        self.cache = cache
+
+    def execute(self, query: str, params: Any = None, **kwargs) -> Any:
+        return self.cache.execute(self.connection, query, params, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
@@ -0,0 +1,336 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import functools
+import logging
+import re
+
+from etl_lite.core.results import InstrumentedConnection
+
+logger = logging.getLogger(__name__)
+
+TABLE_PLACEHOLDER = '{table}'
+FAST_OPTION = 'fast'    # block parameter enabling the approximate variant of a check
+TOLERANCE_PATTERN = re.compile(r'^\s*(relative|absolute)\s*\(\s*([0-9.eE+-]+)\s*\)\s*$')
+
+
+class CheckError(Exception):
+    """Raised when a test or invariant of a step is red"""
+    pass
+
+
+@dataclass(frozen=True)
+class AggregateCheck:
+    """Check expressed as aggregate expressions over the whole target table
+
+    Checks of the same table with compatible settings are merged by
+    CheckPlanner into a single SELECT; `evaluate` receives the values of `expressions` in order.
+
+    `fast` is an optional cheaper variant (e.g. approximate aggregates) whose
+    evaluate returns a RAG status. Blocks with `fast: true` run it first and
+    fall back to the exact check unless it is green.
+
+    `additive` marks expressions whose value over a table is the sum of their
+    values over its partitions (sum, count), which lets the planner reuse
+    stored per-partition totals.
+    """
+    expressions: Tuple[str, ...]
+    evaluate: Callable[..., Any]
+    settings: Dict[str, Any] = field(default_factory=dict)
+    fast: Optional['AggregateCheck'] = None
+    additive: bool = False
+
+    def query(self, table: str = TABLE_PLACEHOLDER) -> str:
+        """Standalone query computing this check"""
+        return build_query(self.expressions, table, self.settings)
+
+
+def build_query(expressions, table: str, settings: Optional[Dict[str, Any]] = None) -> str:
+    """SELECT of aggregate expressions over table"""
+    query = f"SELECT {', '.join(expressions)} FROM {table}"
+    if settings:
+        query += " SETTINGS " + ", ".join(f"{k}={v}" for k, v in settings.items())
+    return query
+
+
+def aggregate_check(plan: Callable[..., AggregateCheck]) -> Callable:
+    """Turn a check plan into a check function
+
+    The decorated function takes check parameters and returns an
+    AggregateCheck. The resulting function keeps the usual check signature
+    `(connection, **params)` and runs the check on its own, while `.plan`
+    exposes the aggregate definition for batching.
+    """
+    @functools.wraps(plan)
+    def check(connection: Any, **params):
+        spec = plan(**check_params(params))
+        result = connection.execute(spec.query())
+        return spec.evaluate(*result[0])
+
+    check.plan = plan
+    return check
+
+
+def check_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Block parameters passed to the check function, without planner options"""
+    return {key: value for key, value in params.items() if key != FAST_OPTION}
+
+
+class TableConnection:
+    """Connection wrapper substituting {table} in check queries"""
+
+    def __init__(self, connection: Any, table: str):
+        self.connection = connection
+        self.table = table
+
+    def execute(self, query: str, *args, **kwargs):
+        return self.connection.execute(query.replace(TABLE_PLACEHOLDER, self.table), *args, **kwargs)
+
+
+@dataclass
+class CheckResult:
+    """Outcome of a single test or invariant"""
+    name: str
+    kind: str                   # 'test' or 'invariant'
+    type: str                   # check function name, e.g. no_duplicates
+    value: Any
+    status: str                 # RAG: 'green', 'amber', 'red'
+    baseline: Any = None        # invariant value before the step ran
+    approximate: bool = False   # decided by the fast variant of the check
+
+
+def parse_tolerance(tolerance: Any) -> Tuple[str, float]:
+    """Parse tolerance spec: relative(0.01), absolute(5) or a plain number"""
+    if isinstance(tolerance, (int, float)):
+        return 'absolute', float(tolerance)
+    match = TOLERANCE_PATTERN.match(str(tolerance))
+    if not match:
+        raise ValueError(f"Invalid tolerance: {tolerance}")
+    return match.group(1), float(match.group(2))
+
+
+def compare_with_tolerance(before: Any, after: Any, tolerance: Any) -> str:
+    """RAG status of an invariant value change
+
+    Green within tolerance, amber within twice the tolerance, red otherwise.
+    Without a baseline (first run) the invariant is green.
+    """
+    if before is None or tolerance is None:
+        return 'green'
+    kind, limit = parse_tolerance(tolerance)
+    deviation = abs(float(after) - float(before))
+    if kind == 'relative':
+        deviation = deviation / abs(float(before)) if before else (0.0 if not deviation else float('inf'))
+    if deviation <= limit:
+        return 'green'
+    if deviation <= 2 * limit:
+        return 'amber'
+    return 'red'
+
+
+def rag_status(value: Any) -> str:
+    """RAG status of a test result (tests return a boolean or a RAG)"""
+    if value in ('green', 'amber', 'red'):
+        return value
+    return 'green' if value else 'red'
+
+
+class CheckPlanner:
+    """Evaluate check blocks with as few table scans as possible
+
+    Blocks whose functions expose an aggregate plan are merged into one SELECT
+    as long as their query settings don't conflict, sharing identical
+    expressions such as count(*). Other blocks (custom queries) run one by one.
+
+    Blocks with `fast: true` whose check has a fast variant are evaluated with
+    it first; only the ones that aren't green are escalated to the exact
+    check, again merged into as few scans as possible.
+
+    With `totals` (state.PartitionTotals), additive checks are computed from
+    stored per-partition values, scanning only changed partitions. With
+    `cache` (cache.QueryCache), check queries repeated across the steps of a
+    run are answered from their earlier results.
+    """
+
+    def __init__(self, connection: Any, totals: Any = None, cache: Any = None):
+        self.connection = connection
+        self.totals = totals
+        # Check queries are read-only, they go through the cache if there is one
+        self.reader = cache.wrap(connection) if cache is not None else connection
+
+    def _spec(self, block: Dict[str, Any], fast: bool = False) -> Optional[AggregateCheck]:
+        """Aggregate definition of a block, the fast one if requested and available"""
+        plan = getattr(block['function'], 'plan', None)
+        if plan is None:
+            return None
+        spec = plan(**check_params(block['params']))
+        if fast and block['params'].get(FAST_OPTION) and spec.fast is not None:
+            return spec.fast
+        return spec
+
+    def plan(self, table: str, blocks: List[Dict[str, Any]], fast: bool = False) -> Tuple[List[tuple], List[int]]:
+        """Group blocks into merged queries
+
+        Args:
+            table: Table the checks run against
+            blocks: Parsed test/invariant blocks
+            fast: Use fast variants of blocks that enable them
+
+        Returns:
+            (queries, standalone) where queries is a list of
+            (query, [(block index, AggregateCheck, expression positions)]) and
+            standalone lists indexes of blocks that can't be merged
+        """
+        groups: List[tuple] = []    # (settings, expressions, members)
+        standalone = []
+
+        for i, block in enumerate(blocks):
+            spec = self._spec(block, fast)
+            if spec is None:
+                standalone.append(i)
+                continue
+
+            settings = spec.settings or {}
+            for group in groups:
+                # Merge into the first group whose settings don't conflict
+                if all(group[0].get(k, v) == v for k, v in settings.items()):
+                    group[0].update(settings)
+                    break
+            else:
+                group = ({}, [], [])
+                group[0].update(settings)
+                groups.append(group)
+
+            _, expressions, members = group
+            positions = []
+            for expression in spec.expressions:
+                if expression not in expressions:
+                    expressions.append(expression)
+                positions.append(expressions.index(expression))
+            members.append((i, spec, positions))
+
+        queries = [
+            (build_query(expressions, table, settings), members)
+            for settings, expressions, members in groups
+        ]
+        return queries, standalone
+
+    def _label(self, blocks):
+        """Name the checks computed by the next query on instrumented connections"""
+        if isinstance(self.connection, InstrumentedConnection):
+            names = [block['params'].get('name', block['type']) for block in blocks]
+            self.connection.label = ','.join(names) or None
+
+    def evaluate(self, table: str, blocks: List[Dict[str, Any]], fast: bool = False) -> List[Any]:
+        """Compute raw values of check blocks
+
+        Args:
+            table: Table the checks run against
+            blocks: Parsed test/invariant blocks
+            fast: Use fast variants of blocks that enable them; their values
+                are RAG statuses
+
+        Returns:
+            Values in the order of blocks
+        """
+        values: List[Any] = [None] * len(blocks)
+        remaining = list(range(len(blocks)))
+
+        if self.totals is not None:
+            additive = {}
+            for i, block in enumerate(blocks):
+                spec = self._spec(block, fast)
+                if spec is not None and spec.additive:
+                    additive[i] = spec
+            if additive:
+                expressions = list(dict.fromkeys(e for spec in additive.values() for e in spec.expressions))
+                self._label(blocks[i] for i in additive)
+                totals = self.totals.compute(self.connection, table, expressions)
+                if totals is not None:
+                    for i, spec in additive.items():
+                        values[i] = spec.evaluate(*(totals[e] for e in spec.expressions))
+                    remaining = [i for i in remaining if i not in additive]
+
+        queries, standalone = self.plan(table, [blocks[i] for i in remaining], fast)
+
+        for query, members in queries:
+            logger.debug(f"Running {len(members)} checks in one scan of {table}")
+            self._label(blocks[remaining[i]] for i, _, _ in members)
+            row = self.reader.execute(query)[0]
+            for i, spec, positions in members:
+                values[remaining[i]] = spec.evaluate(*(row[p] for p in positions))
+
+        bound = TableConnection(self.reader, table)
+        for i in standalone:
+            block = blocks[remaining[i]]
+            self._label([block])
+            values[remaining[i]] = block['function'](bound, **check_params(block['params']))
+        self._label([])
+
+        return values
+
+    def run(self, table: str, tests: List[Dict[str, Any]], invariants: List[Dict[str, Any]],
+            baseline: Optional[List[Any]] = None) -> List[CheckResult]:
+        """Run tests and invariants of a step together
+
+        Args:
+            table: Table to check
+            tests: Parsed test blocks
+            invariants: Parsed invariant blocks
+            baseline: Invariant values computed before the step, if any
+
+        Returns:
+            CheckResult per test, then per invariant
+        """
+        blocks = tests + invariants
+        approximate = [self._is_fast(block) for block in blocks]
+        values = self.evaluate(table, blocks, fast=any(approximate))
+        baseline = baseline or [None] * len(invariants)
+        results = []
+
+        for block, value in zip(tests, values[:len(tests)]):
+            results.append(CheckResult(
+                name=block['params'].get('name', block['type']),
+                kind='test',
+                type=block['type'],
+                value=value,
+                status=rag_status(value),
+            ))
+
+        for block, value, before in zip(invariants, values[len(tests):], baseline):
+            results.append(CheckResult(
+                name=block['params'].get('name', block['type']),
+                kind='invariant',
+                type=block['type'],
+                value=value,
+                status=compare_with_tolerance(before, value, block['params'].get('tolerance')),
+                baseline=before,
+            ))
+
+        for i, result in enumerate(results):
+            if approximate[i]:
+                result.approximate = True
+                # Fast variants report a RAG status, which only stands when green
+                result.status = rag_status(result.value)
+
+        escalated = [i for i, result in enumerate(results) if result.approximate and result.status != 'green']
+        if escalated:
+            logger.info(f"Escalating {len(escalated)} approximate checks to exact ones")
+            exact = self.evaluate(table, [blocks[i] for i in escalated])
+            for i, value in zip(escalated, exact):
+                result = results[i]
+                result.value, result.approximate = value, False
+                if result.kind == 'test':
+                    result.status = rag_status(value)
+                else:
+                    result.status = compare_with_tolerance(
+                        result.baseline, value, blocks[i]['params'].get('tolerance')
+                    )
+
+        return results
+
+    def _is_fast(self, block: Dict[str, Any]) -> bool:
+        """Whether a block is evaluated with a fast variant first"""
+        if not block['params'].get(FAST_OPTION):
+            return False
+        spec = self._spec(block)
+        return spec is not None and spec.fast is not None
@@ -1,32 +1,461 @@
 # src/etl_lite/core/executor.py
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Union
 from pathlib import Path
-from clickhouse_driver import Client
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import datetime
+import hashlib
 import logging
+import threading
+import time
+
+from etl_lite.core.cache import DEFAULT_MAX_ENTRIES, QueryCache
+from etl_lite.core.checks import CheckError, CheckPlanner, CheckResult
+from etl_lite.core.graph import StepGraph
+from etl_lite.core.parser import SQLMetadata
+from etl_lite.core.results import (
+    InstrumentedConnection, PipelineResult, QueryProgress, StepCancelled, StepResult, StepStatus
+)
+from etl_lite.core.state import PartitionTotals, RunStateStore, step_fingerprint
+from etl_lite.core.strategy import Chunk, WatermarkStore, check_replace, plan_chunks
+from etl_lite.core.templates import render_identifier, render_query, server_side_query
+from etl_lite.engines.connection import ConnectionPool
+from etl_lite.engines.staging import StagingTable
+from etl_lite.utils.sql_parser import strip_terminator
+
+# Seconds between checks for cancellation and step timeouts of a run
+POLL_INTERVAL = 0.1
 
 
 class Executor:
-    def __init__(self, connection):
+    def __init__(self, connection, watermarks: Optional[WatermarkStore] = None,
+                 cancel: Optional[threading.Event] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None,
+                 totals: Optional[PartitionTotals] = None,
+                 cache: Optional[QueryCache] = None,
+                 server_side_params: bool = False):
         self.connection = connection
+        self.watermarks = watermarks
+        self.cancel = cancel
+        self.on_progress = on_progress
+        self.totals = totals
+        self.cache = cache
+        # Bind parameters of main queries on the server (ClickHouse)
+        self.server_side_params = server_side_params
         self.logger = logging.getLogger(__name__)
 
-    def execute_step(self, sql_path: Path):
-        """Execute single ETL step"""
+    def execute_step(self, step: Union[Path, SQLMetadata], result: Optional[StepResult] = None,
+                     params: Optional[Dict[str, Any]] = None) -> StepResult:
+        """Execute single ETL step
+
+        Args:
+            step: Path to SQL file or already parsed metadata
+            result: Result to record into, filled in even if the step fails
+            params: Parameter set of a templated step; placeholders in table
+                names are substituted, all others are bound as query
+                parameters (on the server with server_side_params)
+
+        Returns:
+            Step result with timings, query statistics and check results
+
+        Raises:
+            CheckError: If any test or invariant is red
+            StepCancelled: If the cancel event was set while the step ran or
+                it exceeded its meta.timeout; the running query is cancelled
+        """
         from etl_lite.core.parser import parse_sql_file
-        
-        # Parse SQL file
-        self.logger.info(f"Parsing SQL file: {sql_path}")
-        metadata = parse_sql_file(sql_path)
-        
+
+        if result is None:
+            result = StepResult(name=Path(step).stem if not isinstance(step, SQLMetadata) else 'step')
+        result.started_at = datetime.datetime.now()
+        start = time.perf_counter()
+
+        try:
+            if isinstance(step, SQLMetadata):
+                metadata = step
+            else:
+                # Parse SQL file
+                self.logger.info(f"Parsing SQL file: {step}")
+                metadata = parse_sql_file(step)
+                result.parse_time = time.perf_counter() - start
+
+            connection = InstrumentedConnection(self.connection, result, cancel=self.cancel,
+                                                on_progress=self.on_progress)
+            if metadata.timeout is not None:
+                connection.deadline = start + metadata.timeout
+            self._execute(metadata, connection, result, params or {})
+        except Exception as e:
+            result.status = StepStatus.CANCELLED if isinstance(e, StepCancelled) else StepStatus.FAILED
+            result.error = str(e)
+            raise
+        finally:
+            result.elapsed = time.perf_counter() - start
+
+        self.logger.info(f"Step completed successfully in {result.elapsed:.2f}s")
+        return result
+
+    def _execute(self, metadata: SQLMetadata, connection: InstrumentedConnection, result: StepResult,
+                 params: Dict[str, Any]):
+        target_params = dict(metadata.target['params'])
+        if params:
+            target_params['name'] = render_identifier(target_params['name'], params)
+        target = target_params['name']
+        planner = CheckPlanner(connection, self.totals, self.cache)
+
+        connection.phase = 'ddl'
+        target_exists = self._table_exists(connection, target)
+
+        # Invariant values before the step, compared against after it ran
+        baseline = None
+        if metadata.invariants and target_exists:
+            self.logger.info(f"Computing invariant baseline for {target}")
+            connection.phase = 'baseline'
+            baseline = planner.evaluate(target, metadata.invariants)
+
         # Create target table if needed
+        spec = None
         if metadata.target['type'] == 'table':
-            create_stmt = metadata.target['function'](**metadata.target['params']).get_create_statement()
-            self.logger.info(f"Creating target table: {metadata.target['params']['name']}")
-            self.connection.execute(create_stmt)
-        
-        # Execute main query
-        self.logger.info("Executing main query")
-        query = self._prepare_query(metadata.query, metadata.target['params']['name'])
-        self.connection.execute(query)
-        
-        self.logger.info("Step completed successfully")
\ No newline at end of file
+            spec = metadata.target['function'](**target_params)
+            if getattr(spec, 'strategy', 'append') == 'replace':
+                check_replace(metadata.strategy)
+            self.logger.info(f"Creating target table: {target}")
+            connection.phase = 'ddl'
+            connection.execute(spec.get_create_statement())
+
+        # Replacing targets are loaded into a staging table and swapped in
+        # once the checks pass, so readers never see a partial load
+        replace = getattr(spec, 'strategy', 'append') == 'replace'
+        staging = None
+        if replace:
+            staging = self._staging(target, bool(spec.partition_by), params)
+            connection.phase = 'ddl'
+            staging.create(connection)
+        destination = staging.name if staging is not None else target
+        checked = destination
+        watermark = None
+
+        try:
+            # Execute main query, in chunks for incremental/chunked strategies
+            connection.phase = 'main'
+            chunks = [Chunk('')]
+            if metadata.strategy:
+                chunks = plan_chunks(metadata.strategy, target, connection, self.watermarks, target_exists)
+
+            main_query = render_query(metadata.query, params) if params else metadata.query
+            for i, chunk in enumerate(chunks, 1):
+                self.logger.info(f"Executing main query ({i}/{len(chunks)}) {chunk.condition}".rstrip())
+                query = self._prepare_query(main_query, destination, chunk, escaped=bool(params))
+                self._execute_main(connection, query, {**params, **chunk.params})
+                if chunk.watermark is not None and self.watermarks is not None:
+                    if replace:
+                        watermark = chunk.watermark
+                    else:
+                        self.watermarks.set(target, chunk.watermark)
+            # Baseline results of the target are stale from here on
+            self._invalidate(destination)
+
+            if replace:
+                # Stored partition totals describe the target, not staging
+                planner = CheckPlanner(connection, cache=self.cache)
+            if replace and spec.partition_by:
+                # Target as it will be after replacing the loaded partitions
+                checked = (
+                    f"(SELECT * FROM {target} WHERE _partition_id NOT IN "
+                    f"(SELECT DISTINCT _partition_id FROM {destination}) "
+                    f"UNION ALL SELECT * FROM {destination})"
+                )
+
+            if metadata.tests or metadata.invariants:
+                self.logger.info(f"Running {len(metadata.tests)} tests and {len(metadata.invariants)} invariants")
+                connection.phase = 'check'
+                result.checks = planner.run(checked, metadata.tests, metadata.invariants, baseline)
+                self._check_results(result.checks)
+
+            if replace:
+                connection.phase = 'ddl'
+                staging.swap(connection)
+        finally:
+            # Also after a failure, the target may have been partially written
+            self._invalidate(target)
+            if replace:
+                connection.phase = 'cleanup'
+                staging.drop(connection)
+
+        if watermark is not None:
+            self.watermarks.set(target, watermark)
+
+    def _staging(self, target: str, partitioned: bool, params: Dict[str, Any]) -> StagingTable:
+        """Staging table of a replacing load"""
+        suffix = None
+        if params:
+            # Sub-steps of a template may load partitions of one target concurrently
+            suffix = hashlib.sha256(repr(sorted(params.items())).encode()).hexdigest()[:8]
+        return StagingTable(target, partitioned, suffix)
+
+    def _invalidate(self, table: str):
+        """Drop cached check results of a table the step wrote to"""
+        if self.cache is not None:
+            self.cache.invalidate([table])
+
+    def _table_exists(self, connection, table: str) -> bool:
+        return bool(connection.execute(f"EXISTS TABLE {table}")[0][0])
+
+    def _check_results(self, results: List[CheckResult]):
+        """Log check outcomes and fail the step on red ones"""
+        for result in results:
+            message = f"{result.kind} {result.name} ({result.type}): {result.status}, value={result.value}"
+            if result.status == 'green':
+                self.logger.info(message)
+            else:
+                self.logger.warning(message)
+
+        failed = [result.name for result in results if result.status == 'red']
+        if failed:
+            raise CheckError(f"Red checks: {', '.join(failed)}")
+
+    def _execute_main(self, connection: InstrumentedConnection, query: str, params: Dict[str, Any]):
+        """Run main query, binding its parameters on the server when the engine can"""
+        if params and self.server_side_params:
+            converted = server_side_query(query, params)
+            if converted is not None:
+                return connection.execute(converted, params, settings={'server_side_params': True})
+        return connection.execute(query, params or None)
+
+    def _prepare_query(self, query: str, target: str, chunk: Optional[Chunk] = None,
+                       escaped: bool = False) -> str:
+        """Wrap main query into insert into target table"""
+        query = strip_terminator(query)
+        if chunk is None or not chunk.condition:
+            return f"INSERT INTO {target} {query}"
+        if chunk.params and not escaped:
+            # Query is %-formatted by the driver when parameters are passed
+            query = query.replace('%', '%%')
+        # On its own line, so that a trailing comment doesn't swallow it
+        return f"INSERT INTO {target} SELECT * FROM ({query}\n) WHERE {chunk.condition}"
+
+
+class ParallelExecutor:
+    """Run steps of a StepGraph concurrently
+
+    Steps whose dependencies have completed are started on a bounded thread
+    pool. Each step occupies `concurrency` worker slots (declared with a
+    `-- @meta.concurrency` block), so heavy steps can limit how much else runs
+    next to them. When a step fails, all of its downstream steps are skipped
+    while independent branches keep running.
+
+    Steps with a `-- @meta.timeout` block (`seconds: 600`) have their running
+    query cancelled on the server once the timeout passes. A whole run can
+    be cancelled with an event, and given a timeout per step (see run).
+
+    With a run state store, sum and count invariants are maintained per
+    partition in it, so they only rescan partitions changed by the step.
+
+    Results of check queries are cached for the duration of a run, so the
+    same check of an unchanged table (e.g. a shared dimension) runs once.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_workers: int = 4,
+                 watermarks: Optional[WatermarkStore] = None,
+                 state: Optional[RunStateStore] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None,
+                 cache_size: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            pool: Connection pool; each running step holds one connection with
+                its engine settings applied as session settings
+            max_workers: Maximum number of worker slots used concurrently
+            watermarks: Watermark store for incremental steps
+            state: Run state store; steps unchanged since their last run are skipped
+            on_progress: Called from worker threads with the progress of
+                running queries, e.g. ProgressLogger()
+            cache_size: Maximum number of check query results cached during
+                a run, 0 disables the cache
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.pool = pool
+        self.max_workers = max_workers
+        self.watermarks = watermarks
+        self.state = state
+        self.on_progress = on_progress
+        self.cache_size = cache_size
+        self.logger = logging.getLogger(__name__)
+
+    def new_cache(self) -> Optional[QueryCache]:
+        """Query cache for one run, None if disabled"""
+        if not self.cache_size:
+            return None
+        return QueryCache(self.pool.engine, max_entries=self.cache_size)
+
+    def kill(self, result: StepResult) -> bool:
+        """Kill queries of a step on the server, e.g. when its worker is unresponsive
+
+        Returns:
+            Whether the engine supports killing queries
+        """
+        return self.pool.engine.kill_queries(result.query_ids)
+
+    def _run_step(self, graph: StepGraph, name: str, result: StepResult,
+                  cancel: Optional[threading.Event] = None, cache: Optional[QueryCache] = None):
+        from etl_lite.core.parser import parse_sql_file
+
+        node = graph.nodes[name]
+        if node.metadata is not None:
+            metadata = node.metadata
+        else:
+            start = time.perf_counter()
+            metadata = parse_sql_file(node.path)
+            result.parse_time = time.perf_counter() - start
+
+        with self.pool.connection(settings=metadata.engine_settings) as connection:
+            fingerprint = None
+            # Incremental steps depend on the current time, they always run
+            if self.state is not None and 'incremental' not in metadata.strategy:
+                versions = self.pool.engine.table_versions(connection, node.inputs | {node.target})
+                # Inputs without a version (missing, or views the engine can't tell) may have changed
+                if versions is not None and all(versions[table] is not None for table in node.inputs):
+                    fingerprint = step_fingerprint(metadata, {t: versions[t] for t in node.inputs}, node.params)
+                    if self.state.is_fresh(name, fingerprint, versions[node.target]):
+                        self.logger.info(f"Step {name} is fresh, skipping")
+                        result.status = StepStatus.FRESH
+                        return
+
+            self.logger.info(f"Starting step: {name}")
+            totals = PartitionTotals(self.pool.engine, self.state) if self.state is not None else None
+            Executor(connection, self.watermarks, cancel, self.on_progress, totals, cache,
+                     self.pool.engine.server_side_params).execute_step(metadata, result, node.params)
+
+            if fingerprint is not None:
+                target_version = self.pool.engine.table_versions(connection, [node.target])[node.target]
+                self.state.set(name, fingerprint, target_version)
+
+    def run(self, graph: StepGraph, select: Optional[List[str]] = None,
+            cancel: Optional[threading.Event] = None, timeout: Optional[float] = None) -> PipelineResult:
+        """Execute all steps of the graph
+
+        Every step runs with its own cancel event. Setting `cancel` (e.g. from
+        a signal handler) cancels the running steps and starts no further
+        ones; a step running longer than `timeout` is cancelled on its own.
+        The running query of a cancelled step is cancelled on the server and
+        killed by query_id as well, the step is reported as cancelled and its
+        downstream is skipped.
+
+        Args:
+            graph: Step dependency graph
+            select: Selectors limiting the run to part of the graph
+                (see StepGraph.select), e.g. ['reads:raw.trades+']
+            cancel: Event cancelling the run
+            timeout: Maximum run time of a single step in seconds
+
+        Returns:
+            Pipeline result with a StepResult per executed step
+        """
+        if select:
+            graph = graph.subgraph(graph.select(select))
+            self.logger.info(f"Selected {len(graph.nodes)} steps: {', '.join(graph.nodes)}")
+
+        order = graph.topological_order()
+        position = {name: i for i, name in enumerate(order)}
+        remaining = {name: len(graph.upstream(name)) for name in order}
+        pending = [name for name in order if remaining[name] == 0]
+        result = PipelineResult(started_at=datetime.datetime.now())
+        steps = result.steps
+        cache = self.new_cache()
+        running = {}
+        events: Dict[str, threading.Event] = {}
+        started_at: Dict[str, float] = {}
+        stopped: Dict[str, str] = {}    # step -> reason it was cancelled
+        free_slots = self.max_workers
+        start = time.perf_counter()
+        # Without cancellation there is nothing to watch between step completions
+        poll = POLL_INTERVAL if cancel is not None or timeout is not None else None
+
+        def slots(name: str) -> int:
+            return max(1, min(graph.nodes[name].concurrency, self.max_workers))
+
+        def skip_downstream(name: str):
+            stack = list(graph.downstream(name))
+            while stack:
+                dependent = stack.pop()
+                if dependent in steps:
+                    continue
+                self.logger.warning(f"Skipping step {dependent}: upstream step {name} did not succeed")
+                steps[dependent] = StepResult(name=dependent, status=StepStatus.SKIPPED)
+                stack.extend(graph.downstream(dependent))
+
+        def stop(name: str, reason: str):
+            if name in stopped:
+                return
+            stopped[name] = reason
+            events[name].set()
+            # The worker cancels its query at the next progress packet; killing
+            # it by id also covers drivers that don't report progress
+            try:
+                self.kill(steps[name])
+            except Exception as e:
+                self.logger.warning(f"Could not kill queries of step {name}: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if cancel is not None and cancel.is_set():
+                    for name in running.values():
+                        stop(name, "Cancelled")
+                    pending.clear()
+
+                # Start ready steps in declaration order while slots are free
+                started = True
+                while started:
+                    started = False
+                    for name in pending:
+                        if slots(name) <= free_slots:
+                            pending.remove(name)
+                            free_slots -= slots(name)
+                            steps[name] = StepResult(name=name)
+                            events[name] = threading.Event()
+                            started_at[name] = time.perf_counter()
+                            future = pool.submit(self._run_step, graph, name, steps[name], events[name], cache)
+                            running[future] = name
+                            started = True
+                            break
+                if not running:
+                    break
+
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                if timeout is not None:
+                    now = time.perf_counter()
+                    for name in running.values():
+                        if name not in stopped and now - started_at[name] > timeout:
+                            self.logger.error(f"Step {name} timed out after {timeout}s")
+                            stop(name, f"Timed out after {timeout}s")
+
+                for future in done:
+                    name = running.pop(future)
+                    free_slots += slots(name)
+                    error = future.exception()
+                    if error is not None:
+                        if isinstance(error, StepCancelled) or name in stopped:
+                            steps[name].status = StepStatus.CANCELLED
+                            steps[name].error = stopped.get(name, str(error))
+                        else:
+                            self.logger.error(f"Step {name} failed: {error}")
+                            steps[name].status = StepStatus.FAILED
+                            steps[name].error = str(error)
+                        skip_downstream(name)
+                        continue
+
+                    for dependent in graph.downstream(name):
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0 and dependent not in steps:
+                            pending.append(dependent)
+                    pending.sort(key=position.get)
+
+        if cancel is not None and cancel.is_set():
+            for name in order:
+                if name not in steps:
+                    steps[name] = StepResult(name=name, status=StepStatus.SKIPPED)
+
+        result.elapsed = time.perf_counter() - start
+        if cache is not None and cache.hits:
+            self.logger.info(f"Answered {cache.hits} of {cache.hits + cache.misses} check queries from the cache")
+        # Report steps in execution order of the graph
+        result.steps = {name: steps[name] for name in order if name in steps}
+        return result
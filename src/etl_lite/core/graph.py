@@ -0,0 +1,350 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Iterable, Tuple
+from pathlib import Path
+
+from etl_lite.core.parser import SQLMetadata
+from etl_lite.core.templates import TemplateError, parameter_sets, render_identifier, substep_name
+from etl_lite.utils.sql_parser import extract_tables
+
+
+class GraphError(Exception):
+    """Raised when the step graph is invalid (unknown steps, cycles)"""
+    pass
+
+
+@dataclass
+class StepNode:
+    """Single pipeline step in the dependency graph"""
+    name: str
+    target: str                              # fully qualified target table
+    inputs: Set[str] = field(default_factory=set)   # tables read by the main query
+    metadata: Optional[SQLMetadata] = None
+    path: Optional[Path] = None
+    concurrency: int = 1                     # worker slots the step occupies
+    template: Optional[str] = None           # step file a templated sub-step was expanded from
+    params: Dict[str, Any] = field(default_factory=dict)   # template parameter values
+
+
+def find_input_tables(query: str) -> Set[str]:
+    """Find tables read by a query (FROM, JOIN and IN table), CTEs excluded
+
+    Args:
+        query: SQL query text
+
+    Returns:
+        Set of table names as written in the query
+    """
+    return set(extract_tables(query).tables)
+
+
+def table_matches(reference: str, target: str) -> bool:
+    """Check whether a table reference points to the target table
+
+    Unqualified references ("trades") match targets in any database
+    ("reports.trades"), qualified ones must match exactly.
+    """
+    if reference == target:
+        return True
+    if '.' not in reference:
+        return target.rsplit('.', 1)[-1] == reference
+    return False
+
+
+class StepGraph:
+    """Dependency graph of pipeline steps
+
+    A step depends on every step whose target table appears among its input
+    tables. Steps writing the same target are chained in insertion order so
+    that concurrent writes to one table never happen, except for sub-steps of
+    one template: those write disjoint parameter sets and run in parallel.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, StepNode] = {}
+        self._upstream: Dict[str, Set[str]] = {}
+        self._downstream: Dict[str, Set[str]] = {}
+        self._built = False
+
+    def add_step(self, node: StepNode) -> 'StepGraph':
+        """Add step to the graph"""
+        if node.name in self.nodes:
+            raise GraphError(f"Duplicate step name: {node.name}")
+        self.nodes[node.name] = node
+        self._built = False
+        return self
+
+    @classmethod
+    def from_metadata(cls, steps: Iterable[tuple]) -> 'StepGraph':
+        """Build graph from (path, SQLMetadata) pairs
+
+        Args:
+            steps: Iterable of (path, metadata) pairs in declaration order
+
+        Returns:
+            StepGraph with one node per step file, and one node per parameter
+            set for templated steps (named e.g. client_volume[emea])
+
+        Raises:
+            GraphError: If a template can't be expanded
+        """
+        graph = cls()
+        for path, metadata in steps:
+            path = Path(path)
+            slots = (metadata.meta.get('concurrency', {})
+                     .get('params', {})
+                     .get('slots', 1))
+            target = metadata.target['params']['name']
+            if not metadata.parameters:
+                graph.add_step(StepNode(
+                    name=path.stem,
+                    target=target,
+                    inputs=set(metadata.inputs),
+                    metadata=metadata,
+                    path=path,
+                    concurrency=int(slots),
+                ))
+                continue
+
+            for name, params, rendered_target, inputs in cls._expand(path.stem, metadata):
+                graph.add_step(StepNode(
+                    name=name,
+                    target=rendered_target,
+                    inputs=inputs,
+                    metadata=metadata,
+                    path=path,
+                    concurrency=int(slots),
+                    template=path.stem,
+                    params=params,
+                ))
+        return graph
+
+    @staticmethod
+    def _expand(stem: str, metadata: SQLMetadata) -> List[Tuple[str, Dict[str, Any], str, Set[str]]]:
+        """Sub-steps of a templated step: (name, params, target, inputs)"""
+        target = metadata.target['params']['name']
+        shared_target = '{{' not in target
+        if shared_target and 'incremental' in metadata.strategy:
+            # Sub-steps would share (and race on) the watermark of the target
+            raise GraphError(f"Templated step {stem} with strategy.incremental must have a templated target")
+        if (shared_target and metadata.target['params'].get('strategy') == 'replace'
+                and 'partition_by' not in metadata.target['params']):
+            raise GraphError(f"Templated step {stem} would replace its shared target {target} once per "
+                             f"parameter set, use a templated target or partition_by")
+
+        try:
+            substeps = []
+            for params in parameter_sets(metadata.parameters):
+                inputs = set(metadata.inputs)
+                inputs.update(render_identifier(table, params) for table in metadata.input_templates)
+                substeps.append((substep_name(stem, params), params, render_identifier(target, params), inputs))
+            return substeps
+        except TemplateError as e:
+            raise GraphError(f"Can't expand templated step {stem}: {e}")
+
+    def _build(self):
+        """Compute upstream/downstream edges"""
+        if self._built:
+            return
+
+        upstream = {name: set() for name in self.nodes}
+        # Target -> groups of writers as (template, steps); a group is one plain
+        # step or consecutive sub-steps of one template
+        writers: Dict[str, List[Tuple[Optional[str], List[str]]]] = {}
+        group_of: Dict[str, int] = {}
+
+        for name, node in self.nodes.items():
+            # Chain writers of the same target in declaration order
+            groups = writers.setdefault(node.target, [])
+            if not (node.template is not None and groups and groups[-1][0] == node.template):
+                groups.append((node.template, []))
+            if len(groups) > 1:
+                upstream[name].update(groups[-2][1])
+            groups[-1][1].append(name)
+            group_of[name] = len(groups) - 1
+
+        # Unqualified references match targets in any database (see table_matches)
+        by_table: Dict[str, List[str]] = {}
+        for target in writers:
+            by_table.setdefault(target.rsplit('.', 1)[-1], []).append(target)
+
+        for name, node in self.nodes.items():
+            for table in node.inputs:
+                if '.' not in table:
+                    targets = by_table.get(table, [])
+                else:
+                    targets = [table] if table in writers else []
+                for target in targets:
+                    groups = writers[target]
+                    # A step reading its own target only sees earlier writers
+                    if target == node.target:
+                        groups = groups[:group_of[name]]
+                    for _, target_writers in groups:
+                        upstream[name].update(target_writers)
+
+        downstream = {name: set() for name in self.nodes}
+        for name, deps in upstream.items():
+            for dep in deps:
+                downstream[dep].add(name)
+
+        self._upstream = upstream
+        self._downstream = downstream
+        self._built = True
+        self.topological_order()  # fail early on cycles
+
+    def upstream(self, name: str) -> Set[str]:
+        """Direct dependencies of a step"""
+        self._build()
+        if name not in self.nodes:
+            raise GraphError(f"Unknown step: {name}")
+        return set(self._upstream[name])
+
+    def downstream(self, name: str) -> Set[str]:
+        """Direct dependents of a step"""
+        self._build()
+        if name not in self.nodes:
+            raise GraphError(f"Unknown step: {name}")
+        return set(self._downstream[name])
+
+    def ancestors(self, name: str) -> Set[str]:
+        """All steps the given step depends on, directly or not"""
+        return self._walk(name, self.upstream)
+
+    def descendants(self, name: str) -> Set[str]:
+        """All steps depending on the given step, directly or not"""
+        return self._walk(name, self.downstream)
+
+    @staticmethod
+    def _walk(name: str, neighbours) -> Set[str]:
+        seen = set()
+        stack = [name]
+        while stack:
+            for step in neighbours(stack.pop()):
+                if step not in seen:
+                    seen.add(step)
+                    stack.append(step)
+        return seen
+
+    def writers(self, table: str) -> Set[str]:
+        """Steps writing the table"""
+        return {name for name, node in self.nodes.items() if table_matches(table, node.target)}
+
+    def readers(self, table: str) -> Set[str]:
+        """Steps whose main query reads the table"""
+        return {
+            name for name, node in self.nodes.items()
+            if any(table_matches(reference, table) or table_matches(table, reference)
+                   for reference in node.inputs)
+        }
+
+    def select(self, selectors: Iterable[str]) -> Set[str]:
+        """Steps matched by selectors, the union over all selectors
+
+        Selector syntax:
+            step            the step itself (all sub-steps of a templated step)
+            step+           the step and everything downstream of it
+            +step           the step and everything upstream of it
+            +step+          both directions
+            target:table    steps writing the table (accepts + on both sides)
+            reads:table     steps reading the table (accepts + on both sides)
+
+        Example:
+            graph.select(['reads:raw.trades+'])   # late data in raw.trades
+
+        Raises:
+            GraphError: If a selector matches no step
+        """
+        selected: Set[str] = set()
+        for selector in selectors:
+            upstream = selector.startswith('+')
+            downstream = selector.endswith('+')
+            pattern = selector.strip('+')
+
+            if pattern.startswith('target:'):
+                roots = self.writers(pattern[len('target:'):])
+            elif pattern.startswith('reads:'):
+                roots = self.readers(pattern[len('reads:'):])
+            elif pattern in self.nodes:
+                roots = {pattern}
+            else:
+                roots = {name for name, node in self.nodes.items() if node.template == pattern}
+            if not roots:
+                raise GraphError(f"Selector matches no step: {selector}")
+
+            selected |= roots
+            for root in roots:
+                if upstream:
+                    selected |= self.ancestors(root)
+                if downstream:
+                    selected |= self.descendants(root)
+        return selected
+
+    def subgraph(self, names: Iterable[str]) -> 'StepGraph':
+        """Graph restricted to the given steps, in declaration order
+
+        Dependencies between remaining steps are kept; steps outside the
+        subgraph are assumed to be up to date.
+        """
+        names = set(names)
+        unknown = names - set(self.nodes)
+        if unknown:
+            raise GraphError(f"Unknown steps: {', '.join(sorted(unknown))}")
+
+        graph = StepGraph()
+        for name, node in self.nodes.items():
+            if name in names:
+                graph.add_step(node)
+        return graph
+
+    def topological_order(self) -> List[str]:
+        """Return step names ordered so that dependencies come first
+
+        Raises:
+            GraphError: If the graph contains a cycle
+        """
+        self._build()
+        order = list(self.nodes)
+        position = {name: i for i, name in enumerate(order)}
+        remaining = {name: len(deps) for name, deps in self._upstream.items()}
+        ready = sorted((name for name, count in remaining.items() if count == 0), key=position.get)
+        result = []
+
+        while ready:
+            name = ready.pop(0)
+            result.append(name)
+            for dependent in sorted(self._downstream[name], key=position.get):
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(result) != len(self.nodes):
+            cycle = sorted(name for name, count in remaining.items() if count > 0)
+            raise GraphError(f"Dependency cycle between steps: {', '.join(cycle)}")
+        return result
+
+    def critical_path(self, durations: Dict[str, float]) -> List[str]:
+        """Longest chain of steps given per-step durations
+
+        Args:
+            durations: Step name -> expected duration, missing steps count as 0
+
+        Returns:
+            Step names on the critical path, in execution order
+        """
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for name in self.topological_order():
+            best, best_dep = 0.0, None
+            for dep in self._upstream[name]:
+                if finish[dep] > best:
+                    best, best_dep = finish[dep], dep
+            finish[name] = best + durations.get(name, 0.0)
+            previous[name] = best_dep
+
+        if not finish:
+            return []
+        node = max(finish, key=finish.get)
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return list(reversed(path))
@@ -55,13 +55,13 @@ type ProcessingStrategy = Literal['one_go', 'incremental']
 type ApplyParametersFunc[**P] = Callable[Concatenate[DbTable, P], Query | None]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DataQualityTestTemplate:
     name: str
     get_query: ApplyParametersFunc
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DataQualityTest:
     name: str
     query: Query
@@ -73,7 +73,7 @@ type DataInvariantTemplate =  DataQualityTestTemplate
 type DataInvariant = DataQualityTest
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SqlPipelineStep:
     step_number: int
     main_query: Query | ParameterizedQuery
@@ -86,7 +86,7 @@ class SqlPipelineStep:
 
 
 # draft, to be defined later
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PythonPipelineStep:
     step_number: int
     main_func: Callable[[], None]
@@ -100,7 +100,7 @@ class PythonPipelineStep:
 
 type PipelineStep = SqlPipelineStep | PythonPipelineStep
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ETLPipeline:
     description: str | None = None
     steps: List[PipelineStep]
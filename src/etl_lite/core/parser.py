@@ -1,19 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Dict, List, Any, Optional
+from itertools import repeat
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
+import hashlib
+import logging
+import os
+import pickle
 import re
+import sys
+import threading
 import yaml
-import importlib
 
-@dataclass
+from etl_lite.core.registry import registry
+from etl_lite.utils.sql_parser import extract_tables
+from etl_lite.utils.yaml_loader import load_yaml
+
+logger = logging.getLogger(__name__)
+
+
+class Block:
+    """Parsed metadata block: type, params, function and description
+
+    Slotted to keep thousands of steps small; supports the mapping access
+    used throughout the code (block['params'], block.get('function')).
+    """
+    __slots__ = ('type', 'params', 'function', 'description')
+
+    def __init__(self, type: str, params: Dict[str, Any], function: Any = None,
+                 description: Optional[str] = None):
+        self.type = sys.intern(type)
+        self.params = params
+        self.function = function
+        self.description = description
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __repr__(self) -> str:
+        return f"Block(type={self.type!r}, params={self.params!r})"
+
+
 class SQLMetadata:
-    """Parsed SQL metadata and query"""
-    meta: Dict[str, Any]        # meta.description, meta.engine etc
-    target: Dict[str, Any]      # target configuration
-    strategy: Dict[str, Any]    # strategy.chunk, strategy.incremental etc
-    invariants: List[Dict[str, Any]]
-    tests: List[Dict[str, Any]]
-    query: str
+    """Parsed SQL metadata and query
+
+    Steps parsed from files don't hold their query text: it is read back
+    from the file on access and verified against `query_digest`. Planning
+    (dependency graph, selection, fingerprints) only needs `inputs` and
+    `query_digest`, so large pipelines never materialize every query.
+    """
+    __slots__ = ('meta', 'target', 'strategy', 'invariants', 'tests',
+                 'inputs', 'input_templates', 'query_digest', '_query', '_source')
+
+    def __init__(self, meta: Dict[str, Any], target: Any, strategy: Dict[str, Any],
+                 invariants: List[Any], tests: List[Any], query: Optional[str] = None,
+                 source: Optional[Tuple[str, int]] = None):
+        """
+        Args:
+            meta: meta.description, meta.engine etc
+            target: Target block
+            strategy: strategy.chunk, strategy.incremental etc
+            invariants: Invariant blocks
+            tests: Test blocks
+            query: Main query text
+            source: (file path, offset of the query in the file); when given
+                the query text is not kept in memory
+        """
+        self.meta = meta
+        self.target = target
+        self.strategy = strategy
+        self.invariants = invariants
+        self.tests = tests
+        tables = extract_tables(query)
+        self.inputs = tables.tables
+        self.input_templates = tables.templated_tables
+        self.query_digest = query_digest(query)
+        self._query = query if source is None else None
+        self._source = source
+
+    @property
+    def query(self) -> str:
+        """Main query text, read from the step file for lazily loaded steps"""
+        if self._query is not None:
+            return self._query
+        path, offset = self._source
+        with open(path, 'rb') as f:
+            query = f.read().decode()[offset:].strip()
+        if query_digest(query) != self.query_digest:
+            raise ParsingError(f"SQL file changed since it was parsed: {path}")
+        return query
 
     @property
     def engine(self) -> str:
@@ -25,16 +106,168 @@ class SQLMetadata:
         """Get engine settings from metadata"""
         return self.meta.get('engine', {}).get('params', {}).get('settings', {})
 
+    @property
+    def timeout(self) -> Optional[float]:
+        """Get step timeout in seconds from meta.timeout"""
+        seconds = self.meta.get('timeout', {}).get('params', {}).get('seconds')
+        return float(seconds) if seconds is not None else None
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        """Get template parameters from meta.parameters, empty for plain steps"""
+        return self.meta.get('parameters', {}).get('params', {})
+
+    def __repr__(self) -> str:
+        return f"SQLMetadata(target={self.target!r}, inputs={sorted(self.inputs)!r})"
+
+
+def query_digest(query: str) -> str:
+    """Content hash of a main query"""
+    return hashlib.sha256(query.encode()).hexdigest()
+
 class ParsingError(Exception):
     """Base class for parsing errors"""
     pass
 
-def parse_sql_file(path: Path, default_engine: str = 'sql') -> SQLMetadata:
+PARALLEL_THRESHOLD = 64    # changed files parsed in-process below this
+
+MAIN_SEPARATOR = re.compile(r'--\s*@main\b')
+BLOCK_SEPARATOR = re.compile(r'--\s*@')
+
+
+@dataclass
+class CacheEntry:
+    """Parsed file together with the state it was parsed from"""
+    mtime_ns: int
+    size: int
+    digest: str
+    metadata: SQLMetadata
+
+
+class ParseCache:
+    """Cache of parsed SQL files keyed by path, mtime and content hash
+
+    A file whose mtime and size did not change is served without being read.
+    A touched file is re-read and hashed, and only re-parsed when its content
+    actually changed. With `cache_dir` set, parsed results are also pickled to
+    disk by content hash so that unchanged files survive process restarts.
+
+    Cached SQLMetadata objects are shared between callers and must not be
+    modified.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._entries: Dict[tuple, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, default_engine: str = 'sql') -> SQLMetadata:
+        """Return parsed metadata for path, parsing only if the file changed"""
+        path = Path(path)
+        key = (str(path.resolve()), default_engine)
+        stat = path.stat()
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            self.hits += 1
+            return entry.metadata
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw + default_engine.encode()).hexdigest()
+
+        if entry is not None and entry.digest == digest:
+            metadata = entry.metadata
+            self.hits += 1
+        else:
+            metadata = self._load(digest, path)
+            if metadata is None:
+                self.misses += 1
+                metadata = parse_sql_text(raw.decode(), path, default_engine, lazy=True)
+                self._store(digest, metadata)
+            else:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = CacheEntry(stat.st_mtime_ns, stat.st_size, digest, metadata)
+        return metadata
+
+    def cached(self, path: Path, default_engine: str = 'sql') -> Optional[SQLMetadata]:
+        """Metadata of an unchanged file (same mtime and size), without reading it"""
+        path = Path(path)
+        with self._lock:
+            entry = self._entries.get((str(path.resolve()), default_engine))
+        if entry is None:
+            return None
+        stat = path.stat()
+        if entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            self.hits += 1
+            return entry.metadata
+        return None
+
+    def entry(self, path: Path, default_engine: str = 'sql') -> Optional[CacheEntry]:
+        """Cache entry of a file, e.g. to hand it over to another process"""
+        with self._lock:
+            return self._entries.get((str(Path(path).resolve()), default_engine))
+
+    def add(self, path: Path, entry: CacheEntry, default_engine: str = 'sql'):
+        """Add entry of a file parsed elsewhere"""
+        with self._lock:
+            self._entries[(str(Path(path).resolve()), default_engine)] = entry
+
+    def clear(self):
+        """Drop in-memory entries (on-disk entries are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _disk_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.pickle"
+
+    def _load(self, digest: str, path: Path) -> Optional[SQLMetadata]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._disk_path(digest), 'rb') as f:
+                metadata = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Stale or corrupted entry (e.g. renamed function), parse again
+            return None
+        # Files with the same content share the entry, the query is read from this one
+        if metadata._source is not None:
+            metadata._source = (str(path), metadata._source[1])
+        return metadata
+
+    def _store(self, digest: str, metadata: SQLMetadata):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see partial pickles
+        tmp_path = self._disk_path(digest).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # Functions that can't be pickled by reference keep the entry in memory only
+            tmp_path.unlink()
+            return
+        os.replace(tmp_path, self._disk_path(digest))
+
+
+default_cache = ParseCache()
+
+
+def parse_sql_file(path: Path, default_engine: str = 'sql', cache: Optional[ParseCache] = default_cache) -> SQLMetadata:
     """Parse SQL file with metadata comments
     
     Args:
         path: Path to SQL file
         default_engine: Default database engine if not specified in metadata
+        cache: Parse cache to use, None to always parse the file
     
     Returns:
         SQLMetadata object containing parsed metadata and query
@@ -43,15 +276,125 @@ def parse_sql_file(path: Path, default_engine: str = 'sql') -> SQLMetadata:
         ParsingError: If parsing fails
         FileNotFoundError: If file doesn't exist
     """
-    with open(path) as f:
-        content = f.read()
-    
+    if cache is not None:
+        return cache.get(path, default_engine)
+
+    with open(path, 'rb') as f:
+        content = f.read().decode()
+    return parse_sql_text(content, path, default_engine, lazy=True)
+
+
+def _parse_in_worker(path: str, default_engine: str,
+                     cache_dir: Optional[str]) -> Tuple[Optional[CacheEntry], Optional[str]]:
+    """Parse a file in a worker process, returning its cache entry or the error"""
+    cache = ParseCache(cache_dir)
+    try:
+        cache.get(Path(path), default_engine)
+    except Exception as e:
+        # Exceptions may not be picklable, the message is sent back instead
+        return None, str(e) if isinstance(e, ParsingError) else f"{type(e).__name__}: {e}"
+    return cache.entry(Path(path), default_engine), None
+
+
+def parse_sql_files(paths: List[Path], default_engine: str = 'sql',
+                    cache: Optional[ParseCache] = default_cache, max_workers: Optional[int] = None,
+                    errors: Optional[Dict[Path, str]] = None) -> Dict[Path, SQLMetadata]:
+    """Parse many SQL files, changed ones in parallel worker processes
+
+    Unchanged files are served from the cache without being read. YAML
+    parsing is CPU-bound, so when more than PARALLEL_THRESHOLD files
+    changed they are parsed by a process pool; fewer are parsed in-process,
+    which is faster than starting workers.
+
+    Args:
+        paths: Paths to SQL files
+        default_engine: Default database engine if not specified in metadata
+        cache: Parse cache to use and fill, None to always parse the files
+        max_workers: Number of worker processes, CPU count by default
+        errors: Collects the error of every file that failed to parse
+            instead of raising on the first one
+
+    Returns:
+        Path -> SQLMetadata for the files parsed successfully, in order of paths
+
+    Raises:
+        ParsingError: Listing every file that failed, unless errors is given
+    """
+    paths = [Path(path) for path in paths]
+    parsed: Dict[Path, SQLMetadata] = {}
+    failed: Dict[Path, str] = {}
+
+    changed = []
+    for path in paths:
+        metadata = cache.cached(path, default_engine) if cache is not None else None
+        if metadata is not None:
+            parsed[path] = metadata
+        else:
+            changed.append(path)
+
+    workers = max_workers or os.cpu_count() or 1
+    if len(changed) > PARALLEL_THRESHOLD and workers > 1:
+        cache_dir = str(cache.cache_dir) if cache is not None and cache.cache_dir is not None else None
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(_parse_in_worker, [str(path) for path in changed],
+                                   repeat(default_engine), repeat(cache_dir), chunksize=16)
+                for path, (entry, error) in zip(changed, results):
+                    if error is not None:
+                        failed[path] = error
+                        continue
+                    parsed[path] = entry.metadata
+                    if cache is not None:
+                        cache.misses += 1
+                        cache.add(path, entry, default_engine)
+        except (BrokenProcessPool, pickle.PicklingError, OSError) as e:
+            # Workers that can't start or results (functions) that can't be
+            # pickled by reference; parse errors are reported per file instead
+            logger.warning(f"Parsing in worker processes failed, parsing in-process: {type(e).__name__}: {e}")
+        changed = [path for path in changed if path not in parsed and path not in failed]
+
+    for path in changed:
+        try:
+            parsed[path] = parse_sql_file(path, default_engine, cache)
+        except Exception as e:
+            failed[path] = str(e) if isinstance(e, ParsingError) else f"{type(e).__name__}: {e}"
+
+    if failed:
+        if errors is None:
+            raise ParsingError("Failed to parse SQL files:\n" + "\n".join(
+                f"  {path}: {error}" for path, error in failed.items()
+            ))
+        errors.update(failed)
+    return {path: parsed[path] for path in paths if path in parsed}
+
+
+def parse_sql_text(content: str, path: Any = '<string>', default_engine: str = 'sql',
+                   lazy: bool = False) -> SQLMetadata:
+    """Parse content of SQL step file
+
+    Blocks are split once; the meta.engine block is processed first so that
+    every other block is resolved against the right engine in a single pass.
+
+    Args:
+        content: SQL file content
+        path: Source of the content, used in error messages
+        default_engine: Default database engine if not specified in metadata
+        lazy: Don't keep the query text, read it back from path on access;
+            content must be the UTF-8 decoded content of the file at path
+
+    Returns:
+        SQLMetadata object containing parsed metadata and query
+
+    Raises:
+        ParsingError: If parsing fails
+    """
     # Split into metadata and query parts
-    parts = re.split(r'--\s*@main\b', content)
-    if len(parts) != 2:
+    separators = list(MAIN_SEPARATOR.finditer(content))
+    if len(separators) != 1:
         raise ParsingError(f"SQL file must contain '-- @main' separator: {path}")
-    
-    metadata_text, query = parts
+
+    offset = separators[0].end()
+    metadata_text, query = content[:separators[0].start()], content[offset:]
     
     # Initialize metadata containers
     metadata = {
@@ -62,43 +405,27 @@ def parse_sql_file(path: Path, default_engine: str = 'sql') -> SQLMetadata:
         'tests': []
     }
     
-    # Split metadata text into blocks
-    blocks = re.split(r'--\s*@', metadata_text)
-    
-    # First pass: process meta.engine if present
-    engine = default_engine
-    for block in blocks[1:]:  # skip first empty block
-        if not block.strip():
-            continue
-        
-        lines = block.strip().split('\n')
-        if not lines:
-            continue
-        
-        first_line = lines[0]
-        if first_line.startswith('meta.engine'):
-            process_metadata_block(first_line, lines[1:], metadata, default_engine)
-            engine = (metadata['meta'].get('engine', {})
-                     .get('params', {})
-                     .get('type', default_engine))
-            break
-    
-    # Second pass: process all blocks with determined engine
-    for block in blocks[1:]:
-        if not block.strip():
-            continue
-        
+    # Split metadata text into blocks, skipping the text before the first one
+    blocks = []
+    for block in BLOCK_SEPARATOR.split(metadata_text)[1:]:
         lines = block.strip().split('\n')
-        if not lines:
-            continue
-            
-        first_line = lines[0]
-        remaining_lines = lines[1:]
-        
+        if lines[0]:
+            blocks.append((lines[0], lines[1:]))
+
+    # Engine block goes first, it determines where functions are looked up
+    blocks.sort(key=lambda block: not block[0].startswith('meta.engine'))
+
+    engine = default_engine
+    for first_line, remaining_lines in blocks:
         try:
             process_metadata_block(first_line, remaining_lines, metadata, engine)
         except Exception as e:
             raise ParsingError(f"Error processing metadata block '{first_line}': {str(e)}")
+
+        if first_line.startswith('meta.engine'):
+            engine = (metadata['meta'].get('engine', {})
+                     .get('params', {})
+                     .get('type', default_engine))
     
     # Validate required metadata
     if not metadata['target']:
@@ -110,7 +437,8 @@ def parse_sql_file(path: Path, default_engine: str = 'sql') -> SQLMetadata:
         strategy=metadata['strategy'],
         invariants=metadata['invariants'],
         tests=metadata['tests'],
-        query=query.strip()
+        query=query.strip(),
+        source=(str(path), offset) if lazy else None,
     )
 
 def process_metadata_block(first_line: str, remaining_lines: List[str], metadata: Dict, engine: str):
@@ -140,8 +468,9 @@ def process_metadata_block(first_line: str, remaining_lines: List[str], metadata
             continue
             
         # Remove comment marker if present
-        if line.lstrip().startswith('--'):
-            line = re.sub(r'^\s*--\s?', '', line)
+        stripped = line.lstrip()
+        if stripped.startswith('--'):
+            line = stripped[3:] if stripped[2:3].isspace() else stripped[2:]
         
         # Check for YAML pipe symbol
         if line.rstrip() == 'query: |':
@@ -157,7 +486,7 @@ def process_metadata_block(first_line: str, remaining_lines: List[str], metadata
     # Parse YAML content
     yaml_text = '\n'.join(processed_lines)
     try:
-        params = yaml.safe_load(yaml_text) or {}
+        params = load_yaml(yaml_text) or {}
     except yaml.YAMLError as e:
         raise ParsingError(f"Invalid YAML in metadata block: {str(e)}")
     
@@ -170,37 +499,29 @@ def process_metadata_block(first_line: str, remaining_lines: List[str], metadata
             sql_text = '\n'.join(line[min_indent:] for line in sql_lines)
             params['query'] = sql_text.strip()
     
-    # For meta.engine, we don't need to get the function
-    if category == 'meta' and func_name == 'engine':
-        params['type'] = params.get('type', engine)
-        block = {
-            'type': func_name,
-            'params': params,
-            'description': description
-        }
+    # Meta blocks (engine, description, concurrency...) have no function
+    if category == 'meta':
+        if func_name == 'engine':
+            params['type'] = sys.intern(params.get('type', engine))
+        block = Block(func_name, params, description=description)
     else:
         # Get function implementation
         try:
             func = get_function(category, func_name, engine)
-        except (ImportError, AttributeError) as e:
+        except (ImportError, AttributeError, ValueError) as e:
             raise ParsingError(f"Unknown function {category}.{func_name} for engine {engine}: {str(e)}")
         
-        block = {
-            'type': func_name,
-            'params': params,
-            'function': func,
-            'description': description
-        }
+        block = Block(func_name, params, func, description)
     
     # Add block to appropriate category
     if category == 'meta':
-        metadata['meta'][func_name] = block
+        metadata['meta'][block.type] = block
     elif category == 'target':
         if metadata['target']:
             raise ParsingError("Multiple target definitions found")
         metadata['target'] = block
     elif category == 'strategy':
-        metadata['strategy'][func_name] = block
+        metadata['strategy'][block.type] = block
     elif category == 'invariant':
         metadata['invariants'].append(block)
     elif category == 'test':
@@ -220,20 +541,9 @@ def get_function(category: str, name: str, engine: str = 'sql') -> Any:
         Function implementation
     
     Raises:
-        ImportError: If module not found
         AttributeError: If function not found
     """
-    try:
-        # Try engine-specific implementation first
-        module = importlib.import_module(f'etl_lite.{engine}.{category}s')
-    except ImportError:
-        # Fall back to generic SQL implementation
-        module = importlib.import_module(f'etl_lite.sql.{category}s')
-    
-    if not hasattr(module, name):
-        raise AttributeError(f"Function {name} not found in {module.__name__}")
-    
-    return getattr(module, name)
+    return registry.get(engine, category, name)
 
 # Example usage
 if __name__ == "__main__":
@@ -1,45 +1,250 @@
 # src/etl_lite/core/pipeline.py
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Optional
+import asyncio
+import inspect
 import logging
 from clickhouse_driver import Client
 
+from etl_lite.core.async_executor import AsyncExecutor
+from etl_lite.core.checks import check_params
+from etl_lite.core.executor import Executor, ParallelExecutor
+from etl_lite.core.graph import GraphError, StepGraph
+from etl_lite.core.parser import ParsingError, SQLMetadata, parse_sql_files
+from etl_lite.core.results import PipelineResult, QueryProgress, StepResult
+from etl_lite.core.state import RunStateStore
+from etl_lite.core.strategy import StrategyError, WatermarkStore, check_replace
+from etl_lite.engines.base import Engine
+from etl_lite.engines.connection import ConnectionPool
+from etl_lite.clickhouse.connection import ClickHouseEngine
+
+logger = logging.getLogger(__name__)
+
+
+def load_graph(sql_paths: List[Path]) -> StepGraph:
+    """Parse SQL step files and build their dependency graph"""
+    logger.info(f"Parsing {len(sql_paths)} SQL files")
+    return StepGraph.from_metadata(parse_sql_files(sql_paths).items())
+
+
+def load_directory(directory: Path, pattern: str = '*.sql', max_workers: Optional[int] = None) -> StepGraph:
+    """Discover, parse and validate the step files of a directory
+
+    Files are parsed in parallel (see parse_sql_files) and every step is
+    validated before anything runs: target and strategy definitions are
+    built, test and invariant parameters are checked against their
+    functions, and the dependency graph is checked for duplicates and
+    cycles.
+
+    Args:
+        directory: Directory with step files, taken in sorted path order
+        pattern: Glob pattern of step files, e.g. '**/*.sql' to include
+            subdirectories
+        max_workers: Number of parsing processes, CPU count by default
+
+    Returns:
+        Step graph ready to be executed
+
+    Raises:
+        ParsingError: Listing every invalid step file at once
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        raise FileNotFoundError(f"Step directory not found: {directory}")
+    paths = sorted(directory.glob(pattern))
+
+    errors: Dict[Path, str] = {}
+    steps = parse_sql_files(paths, max_workers=max_workers, errors=errors)
+    for path, metadata in steps.items():
+        problems = _validate_step(metadata)
+        if problems:
+            errors[path] = '; '.join(problems)
+
+    graph = None
+    if not errors:
+        try:
+            graph = StepGraph.from_metadata(steps.items())
+            graph.topological_order()
+        except GraphError as e:
+            errors[directory] = str(e)
+
+    if errors:
+        raise ParsingError(f"{len(errors)} invalid steps in {directory}:\n" + "\n".join(
+            f"  {path}: {error}" for path, error in sorted(errors.items())
+        ))
+    logger.info(f"Loaded {len(graph.nodes)} steps from {directory}")
+    return graph
+
+
+def _validate_step(metadata: SQLMetadata) -> List[str]:
+    """Problems with the block definitions of a parsed step"""
+    problems = []
+    target = metadata.target
+    if not target['params'].get('name'):
+        problems.append(f"target.{target['type']} has no name")
+    else:
+        try:
+            target['function'](**target['params'])
+        except Exception as e:
+            problems.append(f"target.{target['type']}: {e}")
+
+    for block in metadata.strategy.values():
+        try:
+            block['function'](**block['params'])
+        except Exception as e:
+            problems.append(f"strategy.{block['type']}: {e}")
+    if target['params'].get('strategy') == 'replace':
+        try:
+            check_replace(metadata.strategy)
+        except StrategyError as e:
+            problems.append(str(e))
+
+    for kind, blocks in (('test', metadata.tests), ('invariant', metadata.invariants)):
+        for block in blocks:
+            params = check_params(block['params'])
+            plan = getattr(block['function'], 'plan', None)
+            try:
+                if plan is not None:
+                    plan(**params)
+                else:
+                    inspect.signature(block['function']).bind(None, **params)
+            except Exception as e:
+                problems.append(f"{kind}.{block['type']} {params.get('name', '')}: {e}".replace(' :', ':'))
+    return problems
+
+
 class Pipeline:
-    def __init__(self, connection: Client):
+    def __init__(self, connection: Client, watermarks: Optional[WatermarkStore] = None,
+                 state: Optional[RunStateStore] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None,
+                 engine: Optional[Engine] = None):
+        """
+        Args:
+            connection: Connection steps run on, e.g. a clickhouse_driver
+                Client or SQLiteEngine().connect()
+            watermarks: Watermark store for incremental steps
+            state: Run state store; steps unchanged since their last run are skipped
+            on_progress: Called with the progress of running queries
+            engine: Engine of the connection, ClickHouse by default
+        """
         self.connection = connection
+        self.watermarks = watermarks
+        self.state = state
+        self.on_progress = on_progress
+        self.engine = engine
+        self.graph: Optional[StepGraph] = None
         self.logger = logging.getLogger(__name__)
 
-    def run(self, sql_path: Path):
+    def collect_sql_steps(self, directory: Path, pattern: str = '*.sql',
+                          max_workers: Optional[int] = None) -> 'Pipeline':
+        """Load and validate the step files of a directory for execute()
+
+        Example:
+            result = Pipeline(client).collect_sql_steps('sql').execute(max_workers=8, pool=pool)
+
+        Raises:
+            ParsingError: Listing every invalid step file at once
+        """
+        self.graph = load_directory(directory, pattern, max_workers)
+        return self
+
+    def execute(self, max_workers: int = 4, pool: Optional[ConnectionPool] = None,
+                select: Optional[List[str]] = None) -> PipelineResult:
+        """Execute the collected steps in dependency order (see run_steps)"""
+        if self.graph is None:
+            raise ValueError("No steps collected, call collect_sql_steps first")
+        return self._execute_graph(self.graph, max_workers, pool, select)
+
+    def run(self, sql_path: Path) -> StepResult:
+        """Execute single SQL transformation
+
+        The step runs exactly as in run_steps: replacing targets are loaded
+        through a staging table and swapped in once tests and invariants pass.
+
+        Returns:
+            Step result with timings, query statistics and check results
+
+        Raises:
+            CheckError: If any test or invariant is red
+        """
+        engine = self.engine if self.engine is not None else ClickHouseEngine()
+        executor = Executor(self.connection, self.watermarks, on_progress=self.on_progress,
+                            server_side_params=engine.server_side_params)
+        return executor.execute_step(Path(sql_path), StepResult(name=Path(sql_path).stem))
+
+    def run_steps(self, sql_paths: List[Path], max_workers: int = 4,
+                  pool: Optional[ConnectionPool] = None,
+                  select: Optional[List[str]] = None) -> PipelineResult:
+        """Execute several SQL transformations in dependency order
+
+        Independent steps run concurrently on up to `max_workers` connections.
+
+        Args:
+            sql_paths: SQL step files in declaration order
+            max_workers: Maximum number of steps running at the same time
+            pool: Connection pool shared by the steps. Without it steps run
+                one by one on the pipeline connection.
+            select: Run only part of the pipeline, e.g. ['step_name+'] for a
+                step and its downstream, ['reads:raw.trades+'] for everything
+                affected by a table (see StepGraph.select)
+
+        Returns:
+            Pipeline result with status, timings and query statistics per step
+        """
+        return self._execute_graph(load_graph(sql_paths), max_workers, pool, select)
+
+    def _execute_graph(self, graph: StepGraph, max_workers: int, pool: Optional[ConnectionPool],
+                       select: Optional[List[str]]) -> PipelineResult:
+        if pool is None:
+            engine = self.engine if self.engine is not None else ClickHouseEngine()
+            pool, max_workers = ConnectionPool.from_connection(self.connection, engine), 1
+
+        executor = ParallelExecutor(pool, max_workers=max_workers, watermarks=self.watermarks,
+                                    state=self.state, on_progress=self.on_progress)
+        return executor.run(graph, select)
+
+
+class AsyncPipeline:
+    """Pipeline driven from an asyncio event loop
+
+    Reads the same step files as Pipeline. Blocking driver calls run on
+    worker threads, so many steps and queries can be in flight at once
+    without blocking the loop.
+
+    Example:
+        pipeline = AsyncPipeline(ConnectionPool(ClickHouseEngine(), max_size=32))
+        result = await pipeline.run_steps(sorted(Path('sql').glob('*.sql')), timeout=900)
+    """
+
+    def __init__(self, pool: ConnectionPool, watermarks: Optional[WatermarkStore] = None,
+                 state: Optional[RunStateStore] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None):
+        self.pool = pool
+        self.watermarks = watermarks
+        self.state = state
+        self.on_progress = on_progress
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self, sql_path: Path, timeout: Optional[float] = None) -> PipelineResult:
         """Execute single SQL transformation"""
-        from etl_lite.core.parser import parse_sql_file
-        
-        # Parse SQL file
-        self.logger.info(f"Parsing SQL file: {sql_path}")
-        metadata = parse_sql_file(sql_path)
-        
-        # Create target table
-        if metadata.target['type'] == 'table':
-            table_name = metadata.target['params']['name']
-            columns = metadata.target['params']['columns']
-            engine = metadata.target['params']['engine']
-            
-            self.logger.info(f"Creating target table: {table_name}")
-            
-            columns_def = ", ".join(
-                f"{name} {type_}" 
-                for name, type_ in columns.items()
-            )
-            
-            create_query = f"""
-                CREATE TABLE IF NOT EXISTS {table_name} (
-                    {columns_def}
-                ) ENGINE = {engine}
-            """
-            self.connection.execute(create_query)
-        
-        # Execute main query
-        self.logger.info("Executing main query")
-        insert_query = f"INSERT INTO {table_name} {metadata.query}"
-        self.connection.execute(insert_query)
-        
-        self.logger.info("Step completed successfully")
\ No newline at end of file
+        return await self.run_steps([sql_path], max_in_flight=1, timeout=timeout)
+
+    async def run_steps(self, sql_paths: List[Path], max_in_flight: int = 64,
+                        select: Optional[List[str]] = None,
+                        timeout: Optional[float] = None) -> PipelineResult:
+        """Execute several SQL transformations in dependency order
+
+        Args:
+            sql_paths: SQL step files in declaration order
+            max_in_flight: Maximum number of steps running at the same time,
+                further bounded by the pool size
+            select: Run only part of the pipeline (see StepGraph.select)
+            timeout: Maximum run time of a single step in seconds
+
+        Returns:
+            Pipeline result with status, timings and query statistics per step
+        """
+        graph = await asyncio.get_running_loop().run_in_executor(None, load_graph, sql_paths)
+        executor = AsyncExecutor(self.pool, max_in_flight=max_in_flight, watermarks=self.watermarks,
+                                 state=self.state, on_progress=self.on_progress)
+        return await executor.run(graph, select, timeout=timeout)
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from types import ModuleType
+import importlib
+import importlib.util
+import threading
+
+# Metadata category -> module name inside an engine package
+CATEGORY_MODULES = {
+    'target': 'targets',
+    'test': 'tests',
+    'invariant': 'invariants',
+    'strategy': 'strategies',
+}
+
+
+@dataclass(frozen=True)
+class EngineModules:
+    """Engine package registered in the function registry"""
+    package: str                    # e.g. etl_lite.clickhouse
+    fallback: Optional[str] = 'sql' # engine consulted for functions missing here
+
+
+class FunctionRegistry:
+    """Registry of (engine, category, name) -> function
+
+    Engine packages are registered explicitly with `register_engine`. Category
+    modules are imported at most once per engine and every resolved function
+    is memoized, so repeated lookups are a dictionary access. A function missing
+    from an engine is looked up in its fallback engine (generic SQL by default)
+    without relying on failed imports.
+    """
+
+    def __init__(self):
+        self._engines: Dict[str, EngineModules] = {}
+        self._modules: Dict[Tuple[str, str], Optional[ModuleType]] = {}
+        self._functions: Dict[Tuple[str, str, str], Callable] = {}
+        self._lock = threading.RLock()
+
+    def register_engine(self, engine: str, package: str, fallback: Optional[str] = 'sql'):
+        """Register package providing functions for an engine
+
+        Args:
+            engine: Engine name as used in `-- @meta.engine` (type)
+            package: Importable package with targets/tests/invariants/strategies modules
+            fallback: Engine to consult for functions this package doesn't define
+        """
+        if fallback == engine:
+            fallback = None
+        with self._lock:
+            self._engines[engine] = EngineModules(package, fallback)
+            # Previously resolved functions may now come from the new package
+            self._modules.clear()
+            self._functions.clear()
+
+    def register_function(self, engine: str, category: str, name: str, func: Callable):
+        """Register single function, overriding module lookup"""
+        with self._lock:
+            self._functions[(engine, category, name)] = func
+
+    def engines(self) -> Dict[str, EngineModules]:
+        """Registered engines"""
+        return dict(self._engines)
+
+    def get(self, engine: str, category: str, name: str) -> Callable:
+        """Resolve function implementation
+
+        Args:
+            engine: Registered engine name
+            category: Metadata category (target, strategy, invariant, test)
+            name: Function name
+
+        Returns:
+            Function implementation
+
+        Raises:
+            ValueError: If the engine isn't registered or the category is unknown
+            AttributeError: If no engine in the fallback chain defines the function
+        """
+        key = (engine, category, name)
+        func = self._functions.get(key)
+        if func is not None:
+            return func
+
+        if engine not in self._engines:
+            raise ValueError(f"Unknown engine {engine!r}, known engines: {', '.join(sorted(self._engines))}")
+        if category not in CATEGORY_MODULES:
+            raise ValueError(
+                f"Unknown metadata category {category!r}, known categories: {', '.join(CATEGORY_MODULES)}"
+            )
+
+        with self._lock:
+            func = self._functions.get(key)
+            if func is None:
+                func = self._resolve(engine, category, name)
+                self._functions[key] = func
+        return func
+
+    def _resolve(self, engine: str, category: str, name: str) -> Callable:
+        searched = []
+        current = engine
+        while current is not None and current not in searched:
+            searched.append(current)
+            module = self._module(current, category)
+            if module is not None and hasattr(module, name):
+                return getattr(module, name)
+            current = self._engines[current].fallback if current in self._engines else None
+
+        raise AttributeError(
+            f"Function {category}.{name} not found for engine {engine} "
+            f"(searched: {', '.join(searched)})"
+        )
+
+    def _module(self, engine: str, category: str) -> Optional[ModuleType]:
+        """Import category module of an engine once, None if it doesn't exist"""
+        key = (engine, category)
+        if key in self._modules:
+            return self._modules[key]
+
+        module = None
+        if engine in self._engines and category in CATEGORY_MODULES:
+            module_name = f"{self._engines[engine].package}.{CATEGORY_MODULES[category]}"
+            if importlib.util.find_spec(module_name) is not None:
+                module = importlib.import_module(module_name)
+        self._modules[key] = module
+        return module
+
+
+registry = FunctionRegistry()
+registry.register_engine('sql', 'etl_lite.modules.sql', fallback=None)
+registry.register_engine('clickhouse', 'etl_lite.clickhouse')
+registry.register_engine('oracle', 'etl_lite.modules.oracle')
+registry.register_engine('pandas', 'etl_lite.modules.pandas')
+
+
+def register_engine(engine: str, package: str, fallback: Optional[str] = 'sql'):
+    """Register engine package in the default registry (plugin hook)
+
+    Example:
+        register_engine('postgres', 'my_company.etl.postgres')
+    """
+    registry.register_engine(engine, package, fallback)
@@ -0,0 +1,386 @@
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from pathlib import Path
+import csv
+import datetime
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+
+# Rows streamed by execute_iter between checks for cancellation
+STOP_CHECK_ROWS = 10000
+
+
+class StepStatus:
+    """Possible outcomes of a scheduled step"""
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'    # not run because an upstream step failed
+    FRESH = 'fresh'        # not run because nothing changed since its last run
+    CANCELLED = 'cancelled'    # stopped by cancellation or timeout
+
+
+class StepCancelled(Exception):
+    """Raised inside a step when it was cancelled"""
+    pass
+
+
+@dataclass
+class QueryStats:
+    """Statistics of a single query"""
+    phase: str                      # parse, ddl, baseline, main, check, versions...
+    query_id: Optional[str] = None
+    elapsed: float = 0.0            # wall time seen by the client, seconds
+    rows_read: int = 0
+    bytes_read: int = 0
+    rows_written: int = 0
+    bytes_written: int = 0
+    result_rows: int = 0            # rows returned to the client
+    peak_memory: Optional[int] = None
+    label: Optional[str] = None     # e.g. names of checks computed by the query
+
+
+@dataclass(frozen=True)
+class QueryProgress:
+    """Progress of a running query, as reported by the server"""
+    step: str
+    phase: str
+    query_id: Optional[str]
+    rows: int                       # rows processed so far
+    total_rows: int                 # estimated rows to process, 0 if unknown
+    bytes: int
+    elapsed: float
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Share of the query done, None if the total is unknown"""
+        if not self.total_rows:
+            return None
+        return min(self.rows / self.total_rows, 1.0)
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """Estimated seconds until completion"""
+        fraction = self.fraction
+        if not fraction:
+            return None
+        return self.elapsed * (1 - fraction) / fraction
+
+
+class ProgressLogger:
+    """Progress callback logging each query at most every `interval` seconds"""
+
+    def __init__(self, interval: float = 10.0, logger: Optional[logging.Logger] = None):
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._logged: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, progress: QueryProgress):
+        with self._lock:
+            if progress.elapsed - self._logged.get(progress.query_id, 0.0) < self.interval:
+                return
+            self._logged[progress.query_id] = progress.elapsed
+        message = f"{progress.step} ({progress.phase}): {progress.rows} rows, {progress.bytes} bytes in {progress.elapsed:.1f}s"
+        if progress.remaining is not None:
+            message += f", {progress.fraction:.0%} done, ~{progress.remaining:.0f}s left"
+        self.logger.info(message)
+
+
+@dataclass
+class StepResult:
+    """Execution record of one pipeline step"""
+    name: str
+    status: str = StepStatus.SUCCESS
+    started_at: Optional[datetime.datetime] = None
+    elapsed: float = 0.0
+    parse_time: float = 0.0
+    queries: List[QueryStats] = field(default_factory=list)
+    checks: List[Any] = field(default_factory=list)     # CheckResult
+    error: Optional[str] = None
+
+    def phase_time(self, phase: str) -> float:
+        """Total wall time of queries in phase"""
+        return sum(query.elapsed for query in self.queries if query.phase == phase)
+
+    @property
+    def ddl_time(self) -> float:
+        return self.phase_time('ddl')
+
+    @property
+    def main_time(self) -> float:
+        return self.phase_time('main')
+
+    @property
+    def check_time(self) -> float:
+        return self.phase_time('check') + self.phase_time('baseline')
+
+    @property
+    def check_times(self) -> Dict[str, float]:
+        """Check name -> wall time of the query computing it
+
+        Checks merged into one scan share that query's time.
+        """
+        times: Dict[str, float] = {}
+        for query in self.queries:
+            if query.phase in ('check', 'baseline') and query.label:
+                for name in query.label.split(','):
+                    times[name] = times.get(name, 0.0) + query.elapsed
+        return times
+
+    def total(self, attribute: str) -> int:
+        """Sum of a QueryStats counter over all queries of the step"""
+        return sum(getattr(query, attribute) or 0 for query in self.queries)
+
+    @property
+    def peak_memory(self) -> Optional[int]:
+        values = [query.peak_memory for query in self.queries if query.peak_memory is not None]
+        return max(values) if values else None
+
+    @property
+    def query_ids(self) -> List[str]:
+        return [query.query_id for query in self.queries if query.query_id]
+
+    def summary(self) -> Dict[str, Any]:
+        """Flat row describing the step, used for CSV export"""
+        return {
+            'step': self.name,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'elapsed': round(self.elapsed, 6),
+            'parse_time': round(self.parse_time, 6),
+            'ddl_time': round(self.ddl_time, 6),
+            'main_time': round(self.main_time, 6),
+            'check_time': round(self.check_time, 6),
+            'rows_read': self.total('rows_read'),
+            'bytes_read': self.total('bytes_read'),
+            'rows_written': self.total('rows_written'),
+            'bytes_written': self.total('bytes_written'),
+            'peak_memory': self.peak_memory,
+            'query_ids': ' '.join(self.query_ids),
+            'error': self.error,
+        }
+
+
+@dataclass
+class PipelineResult:
+    """Execution record of a pipeline run"""
+    steps: Dict[str, StepResult] = field(default_factory=dict)
+    started_at: Optional[datetime.datetime] = None
+    elapsed: float = 0.0
+
+    @property
+    def status(self) -> Dict[str, str]:
+        """Step name -> status"""
+        return {name: step.status for name, step in self.steps.items()}
+
+    @property
+    def succeeded(self) -> bool:
+        return all(step.status in (StepStatus.SUCCESS, StepStatus.FRESH) for step in self.steps.values())
+
+    def slowest(self, n: int = 10) -> List[StepResult]:
+        """Steps with the longest wall time"""
+        return sorted(self.steps.values(), key=lambda step: step.elapsed, reverse=True)[:n]
+
+    def critical_path(self, graph: Any) -> List[str]:
+        """Critical path of the run given the StepGraph it was executed from"""
+        return graph.critical_path({name: step.elapsed for name, step in self.steps.items()})
+
+    def to_dict(self) -> Dict[str, Any]:
+        steps = []
+        for step in self.steps.values():
+            data = asdict(step)
+            data.update(step.summary())
+            data['check_times'] = step.check_times
+            steps.append(data)
+        return {
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'elapsed': self.elapsed,
+            'steps': steps,
+        }
+
+    def to_json(self, path: Optional[Path] = None) -> str:
+        """Export full result (including every query) as JSON"""
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if path is not None:
+            Path(path).write_text(text)
+        return text
+
+    def to_csv(self, path: Optional[Path] = None) -> str:
+        """Export one summary row per step as CSV"""
+        rows = [step.summary() for step in self.steps.values()]
+        buffer = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        if path is not None:
+            Path(path).write_text(buffer.getvalue())
+        return buffer.getvalue()
+
+    def load_peak_memory(self, connection: Any):
+        """Fill peak memory of recorded queries from system.query_log
+
+        The query log is flushed periodically by the server, so this is meant
+        to be called some seconds after the run (or after SYSTEM FLUSH LOGS).
+        """
+        queries = {
+            query.query_id: query
+            for step in self.steps.values()
+            for query in step.queries
+            if query.query_id
+        }
+        if not queries:
+            return
+        rows = connection.execute(
+            "SELECT query_id, max(memory_usage) FROM system.query_log "
+            "WHERE query_id IN %(ids)s AND type = 'QueryFinish' GROUP BY query_id",
+            {'ids': tuple(queries)},
+        )
+        for query_id, memory in rows:
+            queries[query_id].peak_memory = memory
+
+
+class InstrumentedConnection:
+    """Connection wrapper recording QueryStats of every executed query
+
+    Each query gets its own query_id when the underlying connection accepts
+    one, and statistics are taken from the driver's progress and profile
+    info of the last query (clickhouse_driver.Client.last_query). Streamed
+    queries (execute_iter) and the DataFrame helpers of the driver
+    (query_dataframe, insert_dataframe) are recorded the same way; a
+    stream's stats are complete once its rows are consumed.
+
+    When a cancel event is given, it is checked before every query so that a
+    cancelled step stops at the next query boundary. Queries of the 'cleanup'
+    phase still run after cancellation.
+
+    If the connection supports progress reporting (execute_with_progress),
+    queries are streamed: progress is passed to `on_progress`, and a query
+    still running when the step is cancelled or passes its `deadline`
+    (time.perf_counter() value) is cancelled on the server.
+    """
+
+    def __init__(self, connection: Any, result: StepResult, phase: str = 'main',
+                 cancel: Optional[threading.Event] = None,
+                 on_progress: Optional[Callable[[QueryProgress], None]] = None):
+        self.connection = connection
+        self.result = result
+        self.phase = phase
+        self.cancel = cancel
+        self.on_progress = on_progress
+        self.deadline: Optional[float] = None
+        self.label: Optional[str] = None
+        self._supports_query_id = hasattr(connection, 'last_query')
+
+    def execute(self, query: str, *args, **kwargs):
+        stats = self._start(kwargs)
+        streamed = (
+            self.phase != 'cleanup'
+            and hasattr(self.connection, 'execute_with_progress')
+            and (self.on_progress is not None or self.cancel is not None or self.deadline is not None)
+        )
+        start = time.perf_counter()
+        try:
+            if streamed:
+                return self._execute_with_progress(query, stats, start, *args, **kwargs)
+            return self.connection.execute(query, *args, **kwargs)
+        finally:
+            stats.elapsed = time.perf_counter() - start
+            self._collect(stats)
+
+    def execute_iter(self, query: str, *args, **kwargs) -> Iterator[Any]:
+        """Stream rows of a query; its statistics are complete once the rows are consumed"""
+        stats = self._start(kwargs)
+        start = time.perf_counter()
+        try:
+            rows = self.connection.execute_iter(query, *args, **kwargs)
+        except BaseException:
+            stats.elapsed = time.perf_counter() - start
+            raise
+        return self._iterate(rows, stats, start)
+
+    def query_dataframe(self, query: str, *args, **kwargs):
+        return self._call(self.connection.query_dataframe, query, args, kwargs)
+
+    def insert_dataframe(self, query: str, *args, **kwargs):
+        return self._call(self.connection.insert_dataframe, query, args, kwargs)
+
+    def _start(self, kwargs: Dict[str, Any]) -> QueryStats:
+        """Check for cancellation and record stats of a query about to run"""
+        if self.phase != 'cleanup':
+            self._check_stop()
+        stats = QueryStats(phase=self.phase, label=self.label)
+        if self._supports_query_id and 'query_id' not in kwargs:
+            kwargs['query_id'] = str(uuid.uuid4())
+        stats.query_id = kwargs.get('query_id')
+        # Recorded up front, so that a running query can be found by its id
+        self.result.queries.append(stats)
+        return stats
+
+    def _call(self, method: Callable, query: str, args: tuple, kwargs: Dict[str, Any]):
+        stats = self._start(kwargs)
+        start = time.perf_counter()
+        try:
+            return method(query, *args, **kwargs)
+        finally:
+            stats.elapsed = time.perf_counter() - start
+            self._collect(stats)
+
+    def _iterate(self, rows: Iterator[Any], stats: QueryStats, start: float) -> Iterator[Any]:
+        try:
+            for i, row in enumerate(rows):
+                if i % STOP_CHECK_ROWS == 0 and self.phase != 'cleanup':
+                    self._check_stop()
+                yield row
+        finally:
+            stats.elapsed = time.perf_counter() - start
+            self._collect(stats)
+
+    def _execute_with_progress(self, query: str, stats: QueryStats, start: float, *args, **kwargs):
+        progress = self.connection.execute_with_progress(query, *args, **kwargs)
+        for rows, total_rows in progress:
+            if self.on_progress is not None:
+                last_progress = getattr(getattr(self.connection, 'last_query', None), 'progress', None)
+                self.on_progress(QueryProgress(
+                    step=self.result.name,
+                    phase=stats.phase,
+                    query_id=stats.query_id,
+                    rows=rows,
+                    total_rows=total_rows,
+                    bytes=getattr(last_progress, 'bytes', 0),
+                    elapsed=time.perf_counter() - start,
+                ))
+            try:
+                self._check_stop()
+            except StepCancelled:
+                # Stops the query on the server and drains the connection
+                self.connection.cancel()
+                raise
+        return progress.get_result()
+
+    def _check_stop(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise StepCancelled(f"Step {self.result.name} was cancelled")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise StepCancelled(f"Step {self.result.name} timed out")
+
+    def _collect(self, stats: QueryStats):
+        last_query = getattr(self.connection, 'last_query', None)
+        if last_query is None:
+            return
+        progress = getattr(last_query, 'progress', None)
+        if progress is not None:
+            stats.rows_read = progress.rows
+            stats.bytes_read = progress.bytes
+            stats.rows_written = getattr(progress, 'written_rows', 0)
+            stats.bytes_written = getattr(progress, 'written_bytes', 0)
+        profile_info = getattr(last_query, 'profile_info', None)
+        if profile_info is not None:
+            stats.result_rows = profile_info.rows
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
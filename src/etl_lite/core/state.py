@@ -0,0 +1,193 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+
+from etl_lite.core.parser import SQLMetadata
+
+
+def metadata_hash(metadata: SQLMetadata) -> str:
+    """Hash of what a step writes: main query, target and strategy"""
+    definition = {
+        'query': metadata.query_digest,
+        'target': [metadata.target['type'], metadata.target['params']],
+        'strategy': {name: block['params'] for name, block in sorted(metadata.strategy.items())},
+    }
+    text = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def step_fingerprint(metadata: SQLMetadata, input_versions: Dict[str, Any],
+                     params: Optional[Dict[str, Any]] = None) -> str:
+    """Fingerprint of a step: its definition, template parameters and versions of the tables it reads"""
+    fingerprint = [metadata_hash(metadata), sorted(input_versions.items())]
+    if params:
+        fingerprint.append(sorted(params.items()))
+    text = json.dumps(fingerprint, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class RunStateStore:
+    """Fingerprints of successfully executed steps, kept in a SQLite file
+
+    A step whose fingerprint and target version are unchanged since its last
+    successful run produced the same data and can be skipped. Since skipping
+    leaves the target untouched, downstream steps then see unchanged inputs
+    and are skipped as well.
+
+    Example:
+        state = RunStateStore(Path('.etl_state.sqlite'))
+        ParallelExecutor(pool, state=state).run(graph)
+    """
+
+    def __init__(self, path: Path = Path('.etl_state.sqlite')):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS step_state (
+                    step TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    target_version TEXT,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS partition_totals (
+                    target TEXT NOT NULL,
+                    expression TEXT NOT NULL,
+                    partition TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (target, expression, partition)
+                )
+            """)
+
+    def get(self, step: str) -> Optional[tuple]:
+        """(fingerprint, target version) of the last successful run"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, target_version FROM step_state WHERE step = ?", (step,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]) if row[1] is not None else None
+
+    def set(self, step: str, fingerprint: str, target_version: Any):
+        """Record successful run of a step"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO step_state VALUES (?, ?, ?, ?)",
+                (step, fingerprint, json.dumps(target_version, default=str),
+                 datetime.datetime.now().isoformat()),
+            )
+
+    def invalidate(self, steps: Optional[Iterable[str]] = None):
+        """Forget steps (all by default) so that they run next time"""
+        with self._lock, self._db:
+            if steps is None:
+                self._db.execute("DELETE FROM step_state")
+            else:
+                self._db.executemany("DELETE FROM step_state WHERE step = ?", [(s,) for s in steps])
+
+    def is_fresh(self, step: str, fingerprint: str, target_version: Any) -> bool:
+        """Whether the step ran with this fingerprint and its target wasn't modified since"""
+        stored = self.get(step)
+        if stored is None or target_version is None:
+            return False
+        return stored[0] == fingerprint and stored[1] == json.loads(json.dumps(target_version, default=str))
+
+    def partition_totals(self, target: str, expression: str) -> Dict[str, Tuple[str, Any]]:
+        """Partition -> (version, value) of an aggregate expression over target"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT partition, version, value FROM partition_totals WHERE target = ? AND expression = ?",
+                (target, expression),
+            ).fetchall()
+        return {partition: (version, json.loads(value)) for partition, version, value in rows}
+
+    def set_partition_totals(self, target: str, expression: str, totals: Dict[str, Tuple[str, Any]]):
+        """Replace stored per-partition values of an aggregate expression"""
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM partition_totals WHERE target = ? AND expression = ?", (target, expression)
+            )
+            self._db.executemany(
+                "INSERT INTO partition_totals VALUES (?, ?, ?, ?, ?)",
+                [(target, expression, partition, version, json.dumps(value))
+                 for partition, (version, value) in totals.items()],
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class PartitionTotals:
+    """Additive aggregates of a table maintained per partition
+
+    Values of expressions such as sum(amount) or count(*) are stored per
+    partition together with the partition version. Only partitions that are
+    new or changed since they were last aggregated are scanned again, so
+    invariants of append-only tables cost time proportional to the new data.
+
+    Requires an engine reporting partition versions and a `_partition_id`
+    virtual column (ClickHouse MergeTree tables); otherwise `compute`
+    returns None and callers scan the whole table.
+    """
+
+    def __init__(self, engine: Any, store: RunStateStore):
+        self.engine = engine
+        self.store = store
+
+    def compute(self, connection: Any, table: str, expressions: List[str]) -> Optional[Dict[str, Any]]:
+        """Totals of additive expressions over the table
+
+        Returns:
+            Expression -> total, or None if the table has no partition versions
+        """
+        versions = self.engine.partition_versions(connection, table)
+        if versions is None:
+            return None
+        versions = {partition: json.dumps(version, default=str) for partition, version in versions.items()}
+        stored = {expression: self.store.partition_totals(table, expression) for expression in expressions}
+
+        stale = {
+            partition for partition, version in versions.items()
+            if any(stored[e].get(partition, (None,))[0] != version for e in expressions)
+        }
+        fresh = {}
+        if stale:
+            # Query is %-formatted by the driver
+            columns = ", ".join(expression.replace('%', '%%') for expression in expressions)
+            rows = connection.execute(
+                f"SELECT _partition_id, {columns} FROM {table} "
+                f"WHERE _partition_id IN %(partitions)s GROUP BY _partition_id",
+                {'partitions': tuple(sorted(stale))},
+            )
+            fresh = {row[0]: row[1:] for row in rows}
+
+        totals = {}
+        for i, expression in enumerate(expressions):
+            values = {}
+            for partition, version in versions.items():
+                if partition in stale:
+                    # Stale partitions without rows were emptied
+                    value = fresh[partition][i] if partition in fresh else 0
+                    values[partition] = (version, _number(value))
+                else:
+                    values[partition] = stored[expression][partition]
+            self.store.set_partition_totals(table, expression, values)
+            totals[expression] = sum(value for _, value in values.values())
+        return totals
+
+
+def _number(value: Any) -> Any:
+    """JSON friendly aggregate value: ints are kept, decimals become floats"""
+    if value is None:
+        return 0
+    return value if isinstance(value, int) else float(value)
@@ -0,0 +1,235 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import datetime
+import json
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+WINDOW_PATTERN = re.compile(r'^\s*(\d+)\s*(minute|hour|day|week)s?\s*$')
+
+
+class StrategyError(Exception):
+    """Raised when a processing strategy can't be planned"""
+    pass
+
+
+def parse_window(window: Any) -> datetime.timedelta:
+    """Parse window size such as '3 day', '12 hours' or '1 week'"""
+    if isinstance(window, datetime.timedelta):
+        return window
+    match = WINDOW_PATTERN.match(str(window))
+    if not match:
+        raise StrategyError(f"Invalid window: {window}")
+    amount, unit = int(match.group(1)), match.group(2)
+    return datetime.timedelta(**{f"{unit}s": amount})
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Part of the main query processed by a single INSERT"""
+    condition: str                          # filter applied to the main query
+    params: Dict[str, Any] = field(default_factory=dict)
+    watermark: Any = None                   # value stored once the chunk is loaded
+
+
+@dataclass(frozen=True)
+class IncrementalStrategy:
+    """Process the main query in consecutive time windows of a column
+
+    Only complete windows after the watermark are processed. The watermark is
+    the exclusive upper bound of the last loaded window. Without a stored
+    watermark, loading continues after max(column) in the target; an empty
+    target is loaded from `initial` with `start: latest`, or from any other
+    `start` value. Rows before an explicit `start` are never loaded.
+    """
+    column: str
+    window: datetime.timedelta
+    start: Any = 'latest'
+    end: Any = None
+    initial: Any = None
+
+    def windows(self, lower: Any, inclusive: bool = True) -> List[Chunk]:
+        """Chunks between lower bound and end (now by default)"""
+        end = self.end
+        if end is None:
+            # Only windows that are complete by now
+            end = datetime.date.today() if _is_date(lower) else datetime.datetime.now()
+
+        if lower + self.window <= lower:
+            raise StrategyError(f"Window {self.window} is too small for {self.column} values")
+
+        chunks = []
+        while lower < end:
+            upper = min(lower + self.window, end)
+            operator = '>=' if inclusive else '>'
+            chunks.append(Chunk(
+                condition=f"{self.column} {operator} %(window_start)s AND {self.column} < %(window_end)s",
+                params={'window_start': lower, 'window_end': upper},
+                watermark=upper,
+            ))
+            lower, inclusive = upper, True
+        return chunks
+
+
+@dataclass(frozen=True)
+class ChunkStrategy:
+    """Split the main query into independent partitions of a column
+
+    Either by explicit `values` (one chunk per value) or into `count` buckets
+    of `hash_function(column)`.
+    """
+    column: str
+    count: Optional[int] = None
+    values: Optional[List[Any]] = None
+    hash_function: Optional[str] = None
+
+    def chunks(self) -> List[Chunk]:
+        if self.values is not None:
+            return [
+                Chunk(f"{self.column} = %(chunk_value)s", {'chunk_value': value})
+                for value in self.values
+            ]
+        if not self.count or self.count < 1:
+            raise StrategyError("strategy.chunk requires 'values' or a positive 'count'")
+
+        expression = f"{self.hash_function}({self.column})" if self.hash_function else self.column
+        return [
+            Chunk(f"mod({expression}, {self.count}) = {i}")
+            for i in range(self.count)
+        ]
+
+
+class WatermarkStore:
+    """Watermarks per target table, kept in a JSON file
+
+    Without a path watermarks are kept in memory only, and incremental steps
+    fall back to deriving them from the target table on every run.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path) as f:
+                self._values = {
+                    target: _decode(value) for target, value in json.load(f).items()
+                }
+
+    def get(self, target: str) -> Any:
+        with self._lock:
+            return self._values.get(target)
+
+    def set(self, target: str, value: Any):
+        with self._lock:
+            self._values[target] = value
+            if self.path is None:
+                return
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({t: _encode(v) for t, v in self._values.items()}, f, indent=2)
+            tmp_path.replace(self.path)
+
+
+def plan_chunks(strategy: Dict[str, Any], target: str, connection: Any,
+                watermarks: Optional[WatermarkStore] = None, target_exists: bool = True) -> List[Chunk]:
+    """Chunks to process for the step's strategy blocks
+
+    Args:
+        strategy: Parsed strategy blocks of the step (SQLMetadata.strategy)
+        target: Target table name
+        connection: Connection used to derive watermarks from the target
+        watermarks: Stored watermarks, if any
+        target_exists: Whether the target table already exists
+
+    Returns:
+        Chunks in processing order, [Chunk('')] for a one-go step
+    """
+    windows = [Chunk('')]
+    if 'incremental' in strategy:
+        block = strategy['incremental']
+        incremental = block['function'](**block['params'])
+
+        lower, inclusive = watermarks.get(target) if watermarks else None, True
+        if lower is None:
+            # Without a stored watermark, rows already loaded tell where to continue
+            latest = None
+            if target_exists:
+                latest, rows = connection.execute(
+                    f"SELECT max({incremental.column}), count() FROM {target}"
+                )[0]
+                if not rows:
+                    latest = None
+            if incremental.start == 'latest':
+                lower = incremental.initial
+                if latest is not None:
+                    lower, inclusive = latest, False
+            else:
+                lower = incremental.start
+                if latest is not None and latest >= lower:
+                    lower, inclusive = latest, False
+            if lower is None:
+                raise StrategyError(
+                    f"No watermark for {target}: set strategy.incremental initial value"
+                )
+
+        windows = incremental.windows(lower, inclusive)
+        logger.info(f"{len(windows)} new windows of {incremental.column} for {target}")
+
+    if 'chunk' not in strategy:
+        return windows
+
+    block = strategy['chunk']
+    parts = block['function'](**block['params']).chunks()
+    chunks = []
+    for window in windows:
+        for i, part in enumerate(parts):
+            chunks.append(Chunk(
+                condition=' AND '.join(c for c in (window.condition, part.condition) if c),
+                params={**window.params, **part.params},
+                # Window is only complete once its last part is loaded
+                watermark=window.watermark if i == len(parts) - 1 else None,
+            ))
+    return chunks
+
+
+def check_replace(strategy: Dict[str, Any]):
+    """Check that a strategy loads the complete result into a replacing target
+
+    Replacing targets are loaded into an empty staging table that then takes
+    the place of the target (or of its loaded partitions). Incremental steps
+    only load the windows after the watermark, so the swap would drop all
+    earlier data.
+
+    Raises:
+        StrategyError: If the strategy loads only part of the result
+    """
+    if 'incremental' in strategy:
+        raise StrategyError(
+            "strategy.incremental can't load a target with strategy 'replace': "
+            "only new windows would be loaded and earlier data dropped, use strategy 'append'"
+        )
+
+
+def _is_date(value: Any) -> bool:
+    return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict) and 'datetime' in value:
+        return datetime.datetime.fromisoformat(value['datetime'])
+    if isinstance(value, dict) and 'date' in value:
+        return datetime.date.fromisoformat(value['date'])
+    return value
@@ -0,0 +1,163 @@
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+import datetime
+import re
+import uuid
+
+from etl_lite.utils.sql_parser import PLACEHOLDER_NAME, TOKEN_PATTERN, extract_tables
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][\w$]*(\.[A-Za-z_][\w$]*)?$')
+# Driver-style parameter or escaped percent sign
+DRIVER_PARAMETER = re.compile(r'%\(([\w.]+)\)s|%%')
+
+
+class TemplateError(Exception):
+    """Raised when a step template can't be expanded or rendered"""
+    pass
+
+
+def parameter_sets(parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Parameter sets a step template fans out over
+
+    The `-- @meta.parameters` block either lists the sets explicitly or
+    gives values per parameter, expanded into all combinations:
+
+        -- @meta.parameters:            -- @meta.parameters:
+        --   sets:                      --   region: [emea, apac]
+        --     - {region: emea, ...}    --   day: ['2024-01-01', '2024-01-02']
+
+    Returns:
+        Parameter sets in declaration order
+    """
+    if 'sets' in parameters:
+        sets = parameters['sets']
+        if not isinstance(sets, list) or not all(isinstance(values, dict) for values in sets):
+            raise TemplateError("meta.parameters sets must be a list of mappings")
+        return [dict(values) for values in sets]
+
+    names = list(parameters)
+    values = [value if isinstance(value, list) else [value] for value in parameters.values()]
+    return [dict(zip(names, combination)) for combination in product(*values)]
+
+
+def substep_name(template: str, params: Dict[str, Any]) -> str:
+    """Name of the sub-step of a template for a parameter set, e.g. volume[emea]"""
+    return f"{template}[{','.join(str(value) for value in params.values())}]"
+
+
+def render_identifier(text: str, params: Dict[str, Any]) -> str:
+    """Substitute placeholders in a table name
+
+    Raises:
+        TemplateError: If a value is missing or isn't a valid identifier
+    """
+    def substitute(match):
+        name = match.group(1)
+        if name not in params:
+            raise TemplateError(f"No value for parameter {name}")
+        value = str(params[name])
+        if not IDENTIFIER.match(value):
+            raise TemplateError(f"Parameter {name} used as a table name is not an identifier: {value!r}")
+        return value
+
+    return PLACEHOLDER_NAME.sub(substitute, text)
+
+
+def render_query(query: str, params: Dict[str, Any]) -> str:
+    """Prepare templated query for execution with driver parameters
+
+    Placeholders in table names are substituted (after validation), all
+    others become %(name)s parameters, so values are never formatted into
+    the step's SQL. Placeholders inside string literals and comments are
+    left as they are. Literal % signs are escaped. On engines binding
+    parameters on the server the query is converted with
+    `server_side_query` right before execution, once the parameters of
+    its chunk condition are known.
+
+    Raises:
+        TemplateError: If a parameter has no value
+    """
+    tables = extract_tables(query)
+    table_placeholders = {
+        name for table in tables.templated_tables for name in PLACEHOLDER_NAME.findall(table)
+    }
+    missing = tables.placeholders - set(params)
+    if missing:
+        raise TemplateError(f"No value for parameters: {', '.join(sorted(missing))}")
+
+    def substitute(match):
+        name = match.group(1)
+        if name in table_placeholders:
+            return render_identifier(match.group(), params)
+        return f"%({name})s"
+
+    return ''.join(
+        text.replace('%', '%%') if literal else PLACEHOLDER_NAME.sub(substitute, text.replace('%', '%%'))
+        for literal, text in _split_literals(query)
+    )
+
+
+def _split_literals(query: str) -> List[Tuple[bool, str]]:
+    """Split query into (is string literal or comment, text) parts"""
+    parts = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(query):
+        if match.lastgroup in ('comment', 'string', 'quoted'):
+            parts.append((False, query[position:match.start()]))
+            parts.append((True, match.group()))
+            position = match.end()
+    parts.append((False, query[position:]))
+    return parts
+
+
+def parameter_type(value: Any) -> Optional[str]:
+    """ClickHouse type of a query parameter value, None if it has none"""
+    if isinstance(value, bool):
+        return 'Bool'
+    if isinstance(value, int):
+        return 'Int64' if -2 ** 63 <= value < 2 ** 63 else 'UInt64'
+    if isinstance(value, float):
+        return 'Float64'
+    if isinstance(value, str):
+        return 'String'
+    if isinstance(value, datetime.datetime):
+        return 'DateTime'
+    if isinstance(value, datetime.date):
+        return 'Date'
+    if isinstance(value, uuid.UUID):
+        return 'UUID'
+    if isinstance(value, list) and value:
+        types = {parameter_type(item) for item in value}
+        if len(types) == 1 and None not in types:
+            return f"Array({types.pop()})"
+    return None
+
+
+def server_side_query(query: str, params: Dict[str, Any]) -> Optional[str]:
+    """Convert %(name)s parameters to typed {name:Type} server-side parameters
+
+    The server then binds the values itself, so every sub-step of a template
+    sends the same query text. Used with the `server_side_params` setting of
+    clickhouse_driver.
+
+    Returns:
+        Converted query, None if a parameter value has no ClickHouse type
+        (None, tuples, empty lists...) or a dotted name, and the driver
+        has to bind it instead
+    """
+    parts = _split_literals(query)
+    used = {name for literal, text in parts if not literal for name in DRIVER_PARAMETER.findall(text) if name}
+    # Server-side parameter names are plain identifiers
+    types = {name: parameter_type(params[name]) if '.' not in name else None for name in used}
+    if any(type_ is None for type_ in types.values()):
+        return None
+
+    def substitute(match):
+        name = match.group(1)
+        return '%' if name is None else f"{{{name}:{types[name]}}}"
+
+    # Literals only hold escaped percent signs
+    return ''.join(
+        text.replace('%%', '%') if literal else DRIVER_PARAMETER.sub(substitute, text)
+        for literal, text in parts
+    )
@@ -0,0 +1,101 @@
+# src/etl_lite/engines/base.py
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Engine(ABC):
+    """Database engine: knows how to open, check and close connections
+
+    Connections returned by `connect` must provide
+    `execute(query, params=None, settings=None, **kwargs)`.
+    """
+
+    name: str = 'sql'
+    # Whether connections bind query parameters on the server ({name:Type}
+    # placeholders with the server_side_params setting) instead of %(name)s
+    server_side_params: bool = False
+
+    @abstractmethod
+    def connect(self) -> Any:
+        """Open new connection"""
+
+    def ping(self, connection: Any) -> bool:
+        """Check that connection is usable"""
+        try:
+            connection.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def table_versions(self, connection: Any, tables: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Version of each table (anything that changes when its data changes)
+
+        Returns:
+            Table name -> version, None for missing tables and tables whose
+            changes the engine can't tell (steps reading them always run);
+            None instead of the mapping if the engine can't tell for any
+            table, in which case steps are never considered fresh
+        """
+        return None
+
+    def partition_versions(self, connection: Any, table: str) -> Optional[Dict[str, Any]]:
+        """Version of each partition of a table
+
+        Returns:
+            Partition id -> version, or None if the engine can't tell, in
+            which case aggregates are always computed over the whole table
+        """
+        return None
+
+    def kill_queries(self, query_ids: List[str]) -> bool:
+        """Stop running queries on the server, using a connection of its own
+
+        Returns:
+            Whether the engine supports killing queries
+        """
+        return False
+
+    def close(self, connection: Any):
+        """Close connection, errors are ignored"""
+        close = getattr(connection, 'disconnect', None) or getattr(connection, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+
+
+class ExistingConnectionEngine(Engine):
+    """Engine handing out one already opened connection
+
+    Used to run pooled code paths on a connection created by the caller.
+    """
+
+    def __init__(self, connection: Any, engine: Optional[Engine] = None):
+        """
+        Args:
+            connection: Connection to hand out
+            engine: Engine the connection belongs to, used for engine-specific
+                queries such as table versions
+        """
+        self.connection = connection
+        self.engine = engine
+        self.name = engine.name if engine is not None else 'sql'
+        self.server_side_params = engine.server_side_params if engine is not None else False
+
+    def connect(self) -> Any:
+        return self.connection
+
+    def table_versions(self, connection: Any, tables: Iterable[str]) -> Optional[Dict[str, Any]]:
+        if self.engine is None:
+            return None
+        return self.engine.table_versions(connection, tables)
+
+    def partition_versions(self, connection: Any, table: str) -> Optional[Dict[str, Any]]:
+        if self.engine is None:
+            return None
+        return self.engine.partition_versions(connection, table)
+
+    def close(self, connection: Any):
+        # The caller owns the connection
+        pass
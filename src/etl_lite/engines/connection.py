@@ -0,0 +1,167 @@
+# src/etl_lite/engines/connection.py
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import threading
+import time
+
+from etl_lite.engines.base import Engine, ExistingConnectionEngine
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available in time"""
+    pass
+
+
+class PooledConnection:
+    """Connection checked out of a pool, with session settings applied
+
+    Session settings (e.g. SQLMetadata.engine_settings) are merged into the
+    settings of every query; settings passed to execute take precedence.
+    Other attributes are delegated to the underlying connection.
+    """
+
+    def __init__(self, raw: Any, settings: Optional[Dict[str, Any]] = None):
+        self.raw = raw
+        self.settings = dict(settings or {})
+
+    def execute(self, query: str, params: Any = None, settings: Optional[Dict[str, Any]] = None, **kwargs):
+        merged = {**self.settings, **(settings or {})}
+        if merged:
+            kwargs['settings'] = merged
+        return self.raw.execute(query, params, **kwargs)
+
+    def _execute_with_progress(self, query: str, params: Any = None,
+                               settings: Optional[Dict[str, Any]] = None, **kwargs):
+        merged = {**self.settings, **(settings or {})}
+        if merged:
+            kwargs['settings'] = merged
+        return self.raw.execute_with_progress(query, params, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.raw, name)
+        if name == 'execute_with_progress':
+            # Only available if the driver supports it, with session settings applied
+            return self._execute_with_progress
+        return attribute
+
+
+class ConnectionPool:
+    """Thread-safe pool of engine connections
+
+    Keeps at least `min_size` idle connections open and never more than
+    `max_size` in total. Connections idle for longer than
+    `health_check_interval` seconds are pinged before being handed out and
+    replaced if broken.
+
+    Example:
+        pool = ConnectionPool(ClickHouseEngine(host='localhost'), max_size=8)
+        with pool.connection(settings=metadata.engine_settings) as connection:
+            connection.execute(query)
+    """
+
+    def __init__(self, engine: Engine, min_size: int = 1, max_size: int = 4,
+                 timeout: Optional[float] = None, health_check_interval: float = 30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+        self.engine = engine
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._idle: List[tuple] = []    # (connection, last used timestamp)
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        for _ in range(min_size):
+            self._idle.append((self.engine.connect(), time.monotonic()))
+            self._size += 1
+
+    @classmethod
+    def from_connection(cls, connection: Any, engine: Optional[Engine] = None) -> 'ConnectionPool':
+        """Pool of size one around an existing connection of engine"""
+        return cls(ExistingConnectionEngine(connection, engine), min_size=1, max_size=1)
+
+    @property
+    def size(self) -> int:
+        """Number of open connections"""
+        return self._size
+
+    def acquire(self) -> Any:
+        """Check out raw connection, waiting if the pool is exhausted
+
+        Raises:
+            PoolTimeout: If no connection is available within timeout
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection, last_used = None, None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(f"No connection available within {self.timeout}s")
+                self._condition.wait(remaining)
+
+        # Connecting and health checks happen outside the lock
+        try:
+            if connection is None:
+                return self.engine.connect()
+            if time.monotonic() - last_used > self.health_check_interval and not self.engine.ping(connection):
+                self.logger.warning("Replacing broken connection")
+                self.engine.close(connection)
+                return self.engine.connect()
+            return connection
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection: Any, broken: bool = False):
+        """Return connection to the pool, closing it if broken"""
+        with self._condition:
+            if broken or self._closed:
+                self._size -= 1
+                self.engine.close(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, settings: Optional[Dict[str, Any]] = None) -> Iterator[PooledConnection]:
+        """Check out connection for the duration of the block
+
+        Args:
+            settings: Session settings applied to every query of the block
+        """
+        raw = self.acquire()
+        broken = False
+        try:
+            yield PooledConnection(raw, settings)
+        except Exception:
+            # A query may have failed mid-stream, verify before reuse
+            broken = not self.engine.ping(raw)
+            raise
+        finally:
+            self.release(raw, broken)
+
+    def close(self):
+        """Close idle connections, busy ones are closed when released"""
+        with self._condition:
+            self._closed = True
+            for connection, _ in self._idle:
+                self.engine.close(connection)
+                self._size -= 1
+            self._idle.clear()
+            self._condition.notify_all()
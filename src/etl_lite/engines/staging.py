@@ -0,0 +1,63 @@
+# src/etl_lite/engines/staging.py
+from typing import Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StagingTable:
+    """Staging table a replacing load goes through
+
+    The staging table is created empty with the structure and engine of the
+    target, loaded, and then swapped in: unpartitioned targets are exchanged
+    as a whole in one atomic EXCHANGE TABLES, partitioned targets only get
+    the partitions present in staging replaced, each one atomically, leaving
+    others untouched. Staging holds the previous data afterwards and is
+    dropped by the caller once done, also after a failed load.
+
+    Example:
+        staging = StagingTable('reports.daily', partitioned=True)
+        staging.create(connection)
+        try:
+            connection.execute(f"INSERT INTO {staging.name} SELECT ...")
+            staging.swap(connection)
+        finally:
+            staging.drop(connection)
+    """
+
+    def __init__(self, target: str, partitioned: bool = False, suffix: Optional[str] = None):
+        """
+        Args:
+            target: Table being replaced
+            partitioned: Replace only the partitions loaded into staging
+            suffix: Distinguishes staging tables of concurrent loads of one
+                target, e.g. of sub-steps loading different partitions
+        """
+        self.target = target
+        self.partitioned = partitioned
+        self.name = f"{target}__staging" + (f"_{suffix}" if suffix else '')
+
+    def create(self, connection: Any):
+        """Create empty staging table, replacing one left over by an interrupted load"""
+        logger.info(f"Loading {self.target} through staging table {self.name}")
+        connection.execute(f"DROP TABLE IF EXISTS {self.name}")
+        connection.execute(f"CREATE TABLE {self.name} AS {self.target}")
+
+    def partitions(self, connection: Any) -> List[str]:
+        """Ids of the partitions loaded into staging"""
+        return [row[0] for row in connection.execute(f"SELECT DISTINCT _partition_id FROM {self.name}")]
+
+    def swap(self, connection: Any):
+        """Move loaded data from staging into the target"""
+        if not self.partitioned:
+            logger.info(f"Swapping {self.name} into {self.target}")
+            connection.execute(f"EXCHANGE TABLES {self.name} AND {self.target}")
+            return
+
+        partitions = self.partitions(connection)
+        logger.info(f"Replacing {len(partitions)} partitions of {self.target}")
+        for partition in partitions:
+            connection.execute(f"ALTER TABLE {self.target} REPLACE PARTITION ID '{partition}' FROM {self.name}")
+
+    def drop(self, connection: Any):
+        connection.execute(f"DROP TABLE IF EXISTS {self.name}")
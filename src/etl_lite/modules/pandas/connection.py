@@ -0,0 +1,150 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+from itertools import islice
+import logging
+
+import pandas as pd
+
+from etl_lite.writers.base import Writer
+from etl_lite.writers.targets import open_writer
+
+DEFAULT_BLOCK_SIZE = 65536
+
+
+class PandasConnection:
+    """pandas bridge for Python pipeline steps
+
+    Wraps a ClickHouse client (or pooled connection). Results can be read
+    whole with `select_into_df` or streamed block by block with
+    `iter_dataframes`, so a transform never holds more than one block in
+    memory. Writes go through the driver's columnar numpy inserts, split into
+    blocks of `block_size` rows.
+
+    Example:
+        def transform_data(connection: PandasConnection):
+            for df in connection.iter_dataframes("SELECT * FROM source.raw_data"):
+                connection.save_result(transform(df))
+    """
+
+    def __init__(self, client: Any, target: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            client: clickhouse_driver.Client or pooled connection
+            target: Default table written by save_result (the step target)
+            block_size: Rows per block for reads and inserts
+        """
+        self.client = client
+        self.target = target
+        self.block_size = block_size
+        self.logger = logging.getLogger(__name__)
+
+    def select_into_df(self, query: str, params: Optional[Dict[str, Any]] = None,
+                       settings: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Read full query result into a DataFrame using columnar numpy mode"""
+        return self.client.query_dataframe(query, params, settings={'use_numpy': True, **(settings or {})})
+
+    def iter_dataframes(self, query: str, params: Optional[Dict[str, Any]] = None,
+                        block_size: Optional[int] = None,
+                        settings: Optional[Dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """Stream query result as DataFrames of at most block_size rows
+
+        The server sends blocks of `max_block_size` rows. On clients streaming
+        columnar blocks (ClickHouseClient) each block is decoded into NumPy
+        columns and becomes a DataFrame without going through row tuples, so
+        memory use is bounded by the block size rather than the result size.
+        Other connections (e.g. the embedded SQLite engine) stream rows,
+        which are collected into blocks.
+        """
+        block_size = block_size or self.block_size
+        settings = {'use_numpy': True, 'max_block_size': block_size, **(settings or {})}
+
+        columnar = getattr(self.client, 'columnar_iter', False)
+        stream = self.client.execute_iter(query, params, with_column_types=True, settings=settings,
+                                          **({'columnar': True} if columnar else {}))
+        columns_with_types = next(stream, None)
+        if columns_with_types is None:
+            return
+        columns = [name for name, _ in columns_with_types]
+
+        if columnar:
+            blocks = stream
+        else:
+            blocks = (list(zip(*rows)) for rows in iter(lambda: list(islice(stream, block_size)), []))
+
+        finished = False
+        try:
+            for block in blocks:
+                size = len(block[0]) if block else 0
+                for start in range(0, size, block_size):
+                    yield pd.DataFrame(
+                        {name: column[start:start + block_size] for name, column in zip(columns, block)},
+                        columns=columns,
+                    )
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early: drop the rest of the stream with the connection
+                self.client.disconnect()
+
+    def map_blocks(self, query: str, func: Callable[[pd.DataFrame], Optional[pd.DataFrame]],
+                   table: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> int:
+        """Apply func to each block of the query result and save its output
+
+        Args:
+            query: Source query
+            func: Transform of one block, returning rows to save (or None)
+            table: Target table, defaults to the step target
+            params: Query parameters
+
+        Returns:
+            Number of rows written
+        """
+        results = (result for result in map(func, self.iter_dataframes(query, params)) if result is not None)
+        return self.save_result(results, table=table)
+
+    def save_result(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                    table: Optional[str] = None, block_size: Optional[int] = None) -> int:
+        """Insert DataFrame (or iterable of DataFrames) into table with block inserts
+
+        Args:
+            data: DataFrame or iterable of DataFrames, consumed lazily
+            table: Target table, defaults to the step target
+            block_size: Rows per insert block
+
+        Returns:
+            Number of rows written
+        """
+        table = table or self.target
+        if table is None:
+            raise ValueError("No target table to save result into")
+        block_size = block_size or self.block_size
+
+        frames = [data] if isinstance(data, pd.DataFrame) else data
+        written = 0
+        for frame in frames:
+            for start in range(0, len(frame), block_size):
+                block = frame.iloc[start:start + block_size]
+                columns = ", ".join(str(column) for column in block.columns)
+                written += self.client.insert_dataframe(
+                    f"INSERT INTO {table} ({columns}) VALUES",
+                    block,
+                    settings={'use_numpy': True},
+                )
+        self.logger.info(f"Saved {written} rows into {table}")
+        return written
+
+    def open_writer(self, target: Any = None, **options: Any) -> Writer:
+        """Streaming writer of a table or file target (see etl_lite.writers)
+
+        Writers take plain rows rather than DataFrames, e.g.
+        `writer.write(df.itertuples(index=False, name=None))`, and convert
+        them to the column types of the target.
+
+        Args:
+            target: TableTarget, table name or file Path, defaults to the step target
+            options: Options of the writer, e.g. columns, insert_threads or compression
+        """
+        target = target if target is not None else self.target
+        if target is None:
+            raise ValueError("No target to write into")
+        options.setdefault('block_size', self.block_size)
+        return open_writer(target, self.client, **options)
@@ -0,0 +1,194 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+
+from etl_lite.core.results import InstrumentedConnection, StepResult, StepStatus
+from etl_lite.engines.base import Engine
+from etl_lite.modules.pandas.connection import DEFAULT_BLOCK_SIZE, PandasConnection
+
+# Connection of the current worker process, opened once and reused by every step it runs
+_worker_connection: Any = None
+
+
+def _init_worker(engine: Engine):
+    global _worker_connection
+    _worker_connection = engine.connect()
+
+
+def _run_in_worker(func: Callable, spool_dir: str, block_size: int) -> Tuple[StepResult, Optional[str]]:
+    """Run a Python step in a worker, returning its result and the Arrow file of its output"""
+    metadata = func._metadata
+    result = StepResult(name=metadata.name, started_at=datetime.datetime.now())
+    start = time.perf_counter()
+    output_path = None
+    try:
+        connection = PandasConnection(
+            InstrumentedConnection(_worker_connection, result),
+            target=metadata.target.name,
+            block_size=block_size,
+        )
+        output = func(connection)
+        if isinstance(output, pd.DataFrame):
+            output_path = os.path.join(spool_dir, f"{metadata.name}-{uuid.uuid4().hex}.arrow")
+            _write_arrow(output, output_path)
+    except Exception as e:
+        # Exceptions may not be picklable, the message is sent back instead
+        result.status = StepStatus.FAILED
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.elapsed = time.perf_counter() - start
+    return result, output_path
+
+
+def _write_arrow(frame: pd.DataFrame, path: str):
+    from pyarrow import feather
+
+    # Uncompressed, so that the parent can memory-map it without a copy
+    feather.write_feather(frame, path, compression='uncompressed')
+
+
+def _read_arrow(path: str) -> pd.DataFrame:
+    from pyarrow import feather
+
+    # Read into memory rather than mapped, so that the file can be deleted
+    return feather.read_table(path, memory_map=False).to_pandas()
+
+
+@dataclass
+class PythonStepOutput:
+    """Result of a Python step run in a worker process"""
+    result: StepResult
+    path: Optional[Path] = None     # Arrow IPC file with the returned DataFrame
+    _frame: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+    def dataframe(self) -> Optional[pd.DataFrame]:
+        """DataFrame returned by the step
+
+        Its Arrow file is deleted once read, later calls return the same frame.
+        """
+        if self._frame is None and self.path is not None:
+            self._frame = _read_arrow(str(self.path))
+            self.path.unlink()
+            self.path = None
+        return self._frame
+
+
+class ProcessStepPool:
+    """Run @pipeline_step functions in worker processes
+
+    CPU-bound pandas transforms are not limited by the GIL: each step runs
+    in one of `max_workers` processes. Every worker opens one connection of
+    `engine` at start and reuses it for all steps it runs. Steps write
+    their results with connection.save_result as usual; a DataFrame returned
+    by a step is handed back as an Arrow IPC file in `spool_dir` instead of
+    being pickled through the process pipe (this requires pyarrow). Files
+    are deleted once read with PythonStepOutput.dataframe(), and a spool
+    directory created by the pool is removed on close.
+
+    Queries of the PandasConnection a step receives are recorded in the
+    QueryStats of its StepResult.
+
+    Steps must be defined at module level so that workers can import them.
+    Steps with the same `order` run concurrently, orders run one after another.
+
+    Example:
+        with ProcessStepPool(ClickHouseEngine(host='localhost'), max_workers=8) as pool:
+            outputs = pool.run([load_clients, transform_trades, aggregate_volume])
+    """
+
+    def __init__(self, engine: Engine, max_workers: Optional[int] = None,
+                 spool_dir: Optional[Path] = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            engine: Engine the worker connections are opened with; must be
+                picklable (e.g. ClickHouseEngine)
+            max_workers: Number of worker processes, CPU count by default
+            spool_dir: Directory for Arrow files of returned DataFrames,
+                a temporary directory (removed on close) by default
+            block_size: Rows per block of worker PandasConnections
+        """
+        self.engine = engine
+        self.block_size = block_size
+        self._owns_spool_dir = spool_dir is None
+        self.spool_dir = Path(spool_dir) if spool_dir is not None else Path(tempfile.mkdtemp(prefix='etl_lite_'))
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(engine,))
+
+    def submit(self, func: Callable):
+        """Schedule one step, returns a future of PythonStepOutput"""
+        if not getattr(func, '_is_pipeline_step', False):
+            raise ValueError(f"{func.__name__} is not decorated with @pipeline_step")
+        future = self._executor.submit(_run_in_worker, func, str(self.spool_dir), self.block_size)
+        return _OutputFuture(future)
+
+    def run(self, steps: List[Callable]) -> Dict[str, PythonStepOutput]:
+        """Run steps by ascending order, steps of equal order in parallel
+
+        Steps of later orders are skipped once a step failed.
+
+        Returns:
+            Step name -> output, in execution order
+        """
+        outputs: Dict[str, PythonStepOutput] = {}
+        failed = False
+        ordered = sorted(steps, key=lambda func: func._metadata.order)
+        for order, group in groupby(ordered, key=lambda func: func._metadata.order):
+            group = list(group)
+            if failed:
+                for func in group:
+                    outputs[func._metadata.name] = PythonStepOutput(
+                        StepResult(name=func._metadata.name, status=StepStatus.SKIPPED)
+                    )
+                continue
+
+            self.logger.info(f"Running {len(group)} Python steps of order {order}")
+            futures = [(func, self.submit(func)) for func in group]
+            for func, future in futures:
+                output = future.result()
+                outputs[func._metadata.name] = output
+                if output.result.status == StepStatus.FAILED:
+                    self.logger.error(f"Step {output.result.name} failed: {output.result.error}")
+                    failed = True
+        return outputs
+
+    def close(self):
+        """Stop worker processes, their connections close with them
+
+        A spool directory created by the pool is removed with the outputs
+        that were not read.
+        """
+        self._executor.shutdown()
+        if self._owns_spool_dir:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'ProcessStepPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _OutputFuture:
+    """Future of a worker result, converted to PythonStepOutput"""
+
+    def __init__(self, future):
+        self._future = future
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: Optional[float] = None) -> PythonStepOutput:
+        result, path = self._future.result(timeout)
+        return PythonStepOutput(result, Path(path) if path is not None else None)
@@ -1,16 +1,24 @@
 from typing import Any
 
-def sum(connection: Any, name: str, column: str, tolerance: str):
+from etl_lite.core.checks import AggregateCheck, aggregate_check
+
+@aggregate_check
+def sum(name: str, column: str, tolerance: str) -> AggregateCheck:
     """Generic SQL sum invariant"""
-    query = f"SELECT sum({column}) FROM {{table}}"
-    result = connection.execute(query)
-    return float(result[0][0])
+    return AggregateCheck(
+        expressions=(f"sum({column})",),
+        evaluate=lambda value: float(value or 0),
+        additive=True,
+    )
 
-def count(connection: Any, name: str, tolerance: str):
+@aggregate_check
+def count(name: str, tolerance: str) -> AggregateCheck:
     """Generic SQL count invariant"""
-    query = "SELECT count(*) FROM {table}"
-    result = connection.execute(query)
-    return int(result[0][0])
+    return AggregateCheck(
+        expressions=("count(*)",),
+        evaluate=int,
+        additive=True,
+    )
 
 def custom(connection: Any, name: str, query: str, tolerance: str):
     """Custom invariant check"""
@@ -0,0 +1,27 @@
+from typing import Any, List, Optional
+import datetime
+
+from etl_lite.core.strategy import ChunkStrategy, IncrementalStrategy, parse_window
+
+def incremental(column: str, window: str, start: Any = 'latest', end: Any = None,
+                initial: Any = None) -> IncrementalStrategy:
+    """Process new time windows of a column since the last run"""
+    return IncrementalStrategy(
+        column=column,
+        window=parse_window(window),
+        start=start if start == 'latest' else _to_datetime(start),
+        end=_to_datetime(end),
+        initial=_to_datetime(initial),
+    )
+
+def chunk(column: str, count: Optional[int] = None, values: Optional[List[Any]] = None) -> ChunkStrategy:
+    """Process the main query in partitions of a column"""
+    return ChunkStrategy(column=column, count=count, values=values)
+
+def _to_datetime(value: Any) -> Any:
+    """Convert ISO strings to date/datetime, YAML already does so for unquoted values"""
+    if not isinstance(value, str):
+        return value
+    if len(value) == 10:
+        return datetime.date.fromisoformat(value)
+    return datetime.datetime.fromisoformat(value)
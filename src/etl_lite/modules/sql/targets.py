@@ -10,6 +10,7 @@ class TableTarget:
     columns: Dict[str, str]  # column_name -> column_type
     partition_by: Optional[str] = None
     settings: Dict[str, Any] = None
+    strategy: str = 'append'    # 'append' or 'replace' (load into staging, then swap)
 
     def get_create_statement(self) -> str:
         """Generate CREATE TABLE statement"""
@@ -45,14 +46,18 @@ def table(
     order_by: List[str],
     columns: Dict[str, str],
     partition_by: Optional[str] = None,
-    settings: Optional[Dict[str, Any]] = None
+    settings: Optional[Dict[str, Any]] = None,
+    strategy: str = 'append'
 ) -> TableTarget:
     """Table target configuration"""
+    if strategy not in ('append', 'replace'):
+        raise ValueError(f"Unknown target strategy: {strategy}")
     return TableTarget(
         name=name,
         engine=engine,
         order_by=order_by,
         columns=columns,
         partition_by=partition_by,
-        settings=settings
+        settings=settings,
+        strategy=strategy
     )
\ No newline at end of file
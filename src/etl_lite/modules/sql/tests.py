@@ -1,20 +1,24 @@
 from typing import List, Any
 
-def no_duplicates(connection: Any, name: str, columns: List[str]):
+from etl_lite.core.checks import AggregateCheck, aggregate_check
+
+@aggregate_check
+def no_duplicates(name: str, columns: List[str]) -> AggregateCheck:
     """Generic SQL duplicate check"""
     cols = ", ".join(columns)
-    query = f"""
-        SELECT count(*) = count(distinct({cols}))
-        FROM {{table}}
-    """
-    result = connection.execute(query)
-    return bool(result[0][0])
+    return AggregateCheck(
+        expressions=("count(*)", f"count(distinct({cols}))"),
+        evaluate=lambda total, distinct: total == distinct,
+    )
 
-def range(connection: Any, name: str, column: str, min: float, max: float):
+@aggregate_check
+def range(name: str, column: str, min: float, max: float) -> AggregateCheck:
     """Generic SQL range check"""
-    query = f"""
-        SELECT min({column}) >= {min} AND max({column}) <= {max}
-        FROM {{table}}
-    """
-    result = connection.execute(query)
-    return bool(result[0][0])
+    low, high = min, max
+    return AggregateCheck(
+        expressions=(f"min({column})", f"max({column})"),
+        evaluate=lambda min_value, max_value: (
+            min_value is not None and max_value is not None
+            and min_value >= low and max_value <= high
+        ),
+    )
@@ -0,0 +1,252 @@
+# src/etl_lite/sqlite/connection.py
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+import sqlite3
+import tempfile
+import threading
+import uuid
+
+from etl_lite.engines.base import Engine
+from etl_lite.sqlite import dialect
+
+UNKNOWN_DATABASE = re.compile(r'unknown database (\w+)')
+QUALIFIER = re.compile(r'\b([A-Za-z_]\w*)\.[A-Za-z_]')
+EXISTS_TABLE = re.compile(r'^\s*EXISTS\s+(?:TABLE\s+)?([\w.]+)\s*$', re.IGNORECASE)
+EXCHANGE_TABLES = re.compile(r'^\s*EXCHANGE\s+TABLES\s+([\w.]+)\s+AND\s+([\w.]+)\s*$', re.IGNORECASE)
+CREATE_LIKE = re.compile(r'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?([\w.]+)\s+AS\s+([\w.]+)\s*$', re.IGNORECASE)
+DESCRIBE_TABLE = re.compile(r'^\s*DESCRIBE\s+(?:TABLE\s+)?([\w.]+)\s*$', re.IGNORECASE)
+INSERT_VALUES = re.compile(r'^\s*INSERT\s+INTO\s+([\w.]+)\s*\(([^()]*)\)\s*VALUES\s*$', re.IGNORECASE)
+CREATE_DATABASE = re.compile(r'^\s*CREATE\s+DATABASE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*$', re.IGNORECASE)
+WRITE = re.compile(
+    r'^\s*(?:INSERT\s+INTO|CREATE\s+TABLE(?!\s+IF\s)|DROP\s+TABLE(?:\s+IF\s+EXISTS)?'
+    r'|ALTER\s+TABLE|DELETE\s+FROM|UPDATE)\s+([\w.]+)',
+    re.IGNORECASE,
+)
+
+
+class SQLiteEngine(Engine):
+    """Embedded engine running pipelines in-process on SQLite
+
+    Runs the same step files as ClickHouse without a server, for local
+    development and for testing scheduling and check planning at CI speed.
+    ClickHouse SQL is translated by a thin dialect shim (see
+    etl_lite.sqlite.dialect): table engines and SETTINGS are dropped, driver
+    parameters are bound natively, and the ClickHouse functions used by
+    checks and strategies are registered as SQLite functions.
+
+    Every ClickHouse database (`reports` in `reports.client_volume`) is a
+    SQLite file in `directory`, attached on first use. Files use WAL mode,
+    so concurrent steps read while another one writes.
+
+    Not supported: partitions (replace with partition_by, partition totals),
+    arrays, and killing queries.
+
+    Example:
+        pool = ConnectionPool(SQLiteEngine(), max_size=4)
+        ParallelExecutor(pool).run(load_directory('sql'))
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, directory: Optional[Path] = None, timeout: float = 30.0):
+        """
+        Args:
+            directory: Directory of the database files, a temporary directory
+                by default
+            timeout: Seconds to wait for a lock held by another connection
+        """
+        self.directory = Path(directory) if directory is not None else Path(tempfile.mkdtemp(prefix='etl_lite_'))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        # Writes seen by this engine per table, tables written by other
+        # processes are never considered unchanged across runs
+        self._token = uuid.uuid4().hex
+        self._writes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def connect(self) -> 'SQLiteConnection':
+        return SQLiteConnection(self)
+
+    def close(self, connection: 'SQLiteConnection'):
+        connection.close()
+
+    def database_path(self, database: str) -> Path:
+        return self.directory / f"{database}.sqlite"
+
+    def table_versions(self, connection: Any, tables: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Number of writes by this engine; missing tables have no version"""
+        versions = {}
+        for table in tables:
+            exists = connection.execute(f"EXISTS TABLE {table}")[0][0]
+            versions[table] = [self._token, self._writes.get(self._key(table), 0)] if exists else None
+        return versions
+
+    def written(self, table: str):
+        """Record a write to table"""
+        key = self._key(table)
+        with self._lock:
+            self._writes[key] = self._writes.get(key, 0) + 1
+
+    @staticmethod
+    def _key(table: str) -> str:
+        return table if '.' in table else f"main.{table}"
+
+
+class SQLiteConnection:
+    """Connection with the execute interface of clickhouse_driver.Client
+
+    `execute(query, params=None, settings=None, **kwargs)` returns a list of
+    row tuples; Date and DateTime values are returned as date/datetime.
+    """
+
+    def __init__(self, engine: SQLiteEngine):
+        self.engine = engine
+        # Connections are handed between pool threads, never used concurrently
+        self.connection = sqlite3.connect(
+            str(engine.database_path('main')), timeout=engine.timeout,
+            isolation_level=None, check_same_thread=False,
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        dialect.register_functions(self.connection)
+        self.databases = {'main', 'temp'}
+
+    def execute(self, query: str, params: Any = None, settings: Optional[Dict[str, Any]] = None,
+                with_column_types: bool = False, columnar: bool = False, **kwargs) -> Any:
+        """Execute ClickHouse-style query; settings and other driver options are ignored
+
+        `INSERT INTO t (a, b) VALUES` with a list of rows (or of columns with
+        columnar=True) inserts them like the driver does and returns the
+        number of rows.
+        """
+        match = INSERT_VALUES.match(query)
+        if match and isinstance(params, (list, tuple)):
+            return self._insert(match.group(1), match.group(2), list(zip(*params)) if columnar else params)
+        rows, columns = self._execute(query, params)
+        if with_column_types:
+            return rows, columns
+        return rows
+
+    def close(self):
+        self.connection.close()
+
+    def _execute(self, query: str, params: Any) -> Tuple[List[tuple], List[tuple]]:
+        match = EXISTS_TABLE.match(query)
+        if match:
+            return [(int(self._table_exists(match.group(1))),)], [('result', 'UInt8')]
+
+        match = EXCHANGE_TABLES.match(query)
+        if match:
+            self._exchange(*match.groups())
+            return [], []
+
+        match = CREATE_DATABASE.match(query)
+        if match:
+            self._attach(match.group(1))
+            return [], []
+
+        match = DESCRIBE_TABLE.match(query)
+        if match:
+            # Declared SQLite types, e.g. INTEGER for UInt64
+            database, name = self._split(match.group(1))
+            rows = self.connection.execute(f"PRAGMA {database}.table_info({name})").fetchall()
+            return [(row[1], row[2]) for row in rows], [('name', 'String'), ('type', 'String')]
+
+        match = CREATE_LIKE.match(query)
+        if match:
+            exists, table, source = match.groups()
+            if exists and self._table_exists(table):
+                return [], []
+            query = self._definition(source, table)
+
+        query, bound = dialect.bind(dialect.translate(query), params)
+        cursor = self._run(query, bound)
+
+        write = WRITE.match(query)
+        # Statements that changed no rows leave the version as it is
+        if write and cursor.rowcount != 0:
+            self.engine.written(write.group(1))
+
+        columns = [(column[0], '') for column in cursor.description or []]
+        rows = [tuple(dialect.convert(value) for value in row) for row in cursor.fetchall()]
+        return rows, columns
+
+    def _insert(self, table: str, columns: str, rows: List[Any]) -> int:
+        names = [column.strip() for column in columns.split(',')]
+        self._split(table)
+        query = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        self.connection.execute("BEGIN")
+        try:
+            cursor = self.connection.executemany(query, ([dialect.adapt(value) for value in row] for row in rows))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        if cursor.rowcount:
+            self.engine.written(table)
+        return cursor.rowcount
+
+    def _run(self, query: str, params: Dict[str, Any]) -> sqlite3.Cursor:
+        """Execute, attaching databases of qualified table names on demand"""
+        # Existing databases must be attached up front: SQLite reports unknown
+        # tables rather than databases for reads, and DROP IF EXISTS succeeds
+        for database in set(QUALIFIER.findall(query)) - self.databases:
+            if self.engine.database_path(database).exists():
+                self._attach(database)
+        while True:
+            try:
+                return self.connection.execute(query, params)
+            except sqlite3.OperationalError as e:
+                match = UNKNOWN_DATABASE.search(str(e))
+                if not match or match.group(1) in self.databases:
+                    raise
+                self._attach(match.group(1))
+
+    def _attach(self, database: str):
+        if database in self.databases:
+            return
+        self.connection.execute("ATTACH DATABASE ? AS " + database, (str(self.engine.database_path(database)),))
+        self.connection.execute(f"PRAGMA {database}.journal_mode=WAL")
+        self.databases.add(database)
+
+    def _split(self, table: str) -> Tuple[str, str]:
+        """(database, table name), attaching the database"""
+        database, name = table.split('.', 1) if '.' in table else ('main', table)
+        self._attach(database)
+        return database, name
+
+    def _table_exists(self, table: str) -> bool:
+        database, name = self._split(table)
+        return bool(self.connection.execute(
+            f"SELECT count(*) FROM {database}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()[0])
+
+    def _definition(self, source: str, table: str) -> str:
+        """CREATE TABLE statement of table with the structure of source"""
+        database, name = self._split(source)
+        row = self.connection.execute(
+            f"SELECT sql FROM {database}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise sqlite3.OperationalError(f"no such table: {source}")
+        columns = row[0][row[0].index('('):]
+        return f"CREATE TABLE {table} {columns}"
+
+    def _exchange(self, first: str, second: str):
+        """Swap two tables of one database atomically"""
+        database, first_name = self._split(first)
+        other, second_name = self._split(second)
+        if database != other:
+            raise sqlite3.OperationalError(f"Can't exchange tables of different databases: {first}, {second}")
+        temporary = f"{first_name}__exchange"
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(f"ALTER TABLE {database}.{first_name} RENAME TO {temporary}")
+            self.connection.execute(f"ALTER TABLE {database}.{second_name} RENAME TO {first_name}")
+            self.connection.execute(f"ALTER TABLE {database}.{temporary} RENAME TO {second_name}")
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.engine.written(first)
+        self.engine.written(second)
@@ -0,0 +1,233 @@
+# src/etl_lite/sqlite/dialect.py
+"""Translation of the ClickHouse SQL used by steps and checks to SQLite
+
+Only what step files, targets, strategies and checks actually generate is
+covered: table definitions, query parameters, SETTINGS clauses and a set of
+ClickHouse functions registered on every connection.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import datetime
+import decimal
+import hashlib
+import re
+import uuid
+
+PARAMETER = re.compile(r'%\((\w+)\)s|%%')
+SETTINGS_CLAUSE = re.compile(r'\s+SETTINGS\s+\w+\s*=[^()]*$', re.IGNORECASE)
+EMPTY_COUNT = re.compile(r'\bcount\s*\(\s*\)', re.IGNORECASE)
+DISTINCT_TUPLE = re.compile(r'\bcount\s*\(\s*distinct\s*\(([^()]*,[^()]*)\)\s*\)', re.IGNORECASE)
+CREATE_TABLE = re.compile(
+    r'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?([\w.`"]+)\s*\((.*)\)\s*ENGINE\b.*$',
+    re.IGNORECASE | re.DOTALL,
+)
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+ISO_DATETIME = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?$')
+
+# ClickHouse type name -> SQLite column type
+TYPE_AFFINITY = [
+    (re.compile(r'^U?Int\d*$|^Bool$'), 'INTEGER'),
+    (re.compile(r'^Float\d*$|^Decimal'), 'REAL'),
+    (re.compile(r'^Date'), 'TEXT'),
+    (re.compile(r'^(String|FixedString|UUID|Enum\d*|IPv[46])'), 'TEXT'),
+]
+
+
+def translate(query: str) -> str:
+    """Rewrite a ClickHouse query so that SQLite can run it"""
+    match = CREATE_TABLE.match(query)
+    if match:
+        exists, name, columns = match.groups()
+        return f"CREATE TABLE {exists or ''}{name} ({', '.join(_columns(columns))})"
+
+    query = SETTINGS_CLAUSE.sub('', query.rstrip().rstrip(';'))
+    query = EMPTY_COUNT.sub('count(*)', query)
+    return DISTINCT_TUPLE.sub(r'uniqExact(\1)', query)
+
+
+def bind(query: str, params: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """Convert driver-style %(name)s parameters to SQLite named parameters
+
+    Sequences are expanded into one parameter per item, so that
+    `x IN %(values)s` works as with the ClickHouse driver.
+    """
+    if params is None:
+        return query, {}
+
+    bound: Dict[str, Any] = {}
+
+    def substitute(match):
+        name = match.group(1)
+        if name is None:
+            return '%'
+        value = params[name]
+        if isinstance(value, (list, tuple, set, frozenset)):
+            names = []
+            for i, item in enumerate(value):
+                bound[f"{name}_{i}"] = adapt(item)
+                names.append(f":{name}_{i}")
+            return f"({', '.join(names)})"
+        bound[name] = adapt(value)
+        return f":{name}"
+
+    return PARAMETER.sub(substitute, query), bound
+
+
+def adapt(value: Any) -> Any:
+    """Python value as stored by SQLite: dates as ISO text like ClickHouse prints them, decimals as REAL"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def convert(value: Any) -> Any:
+    """Value read from SQLite, ISO dates back to date/datetime"""
+    if isinstance(value, str):
+        if ISO_DATE.match(value):
+            return datetime.date.fromisoformat(value)
+        if ISO_DATETIME.match(value):
+            return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def _columns(definition: str) -> List[str]:
+    """Column definitions with ClickHouse types mapped to SQLite ones"""
+    columns, depth, current = [], 0, ''
+    for char in definition:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == ',' and depth == 0:
+            columns.append(current)
+            current = ''
+        else:
+            current += char
+    columns.append(current)
+
+    result = []
+    for column in columns:
+        parts = column.strip().split(None, 1)
+        if not parts:
+            continue
+        name, type_ = parts[0], parts[1] if len(parts) > 1 else ''
+        result.append(f"{name} {column_type(type_)}".rstrip())
+    return result
+
+
+def column_type(type_: str) -> str:
+    """SQLite type of a ClickHouse column type, e.g. Nullable(UInt64) -> INTEGER"""
+    type_ = type_.strip()
+    while True:
+        match = re.match(r'^(?:Nullable|LowCardinality)\((.*)\)$', type_)
+        if not match:
+            break
+        type_ = match.group(1).strip()
+    for pattern, affinity in TYPE_AFFINITY:
+        if pattern.match(type_):
+            return affinity
+    return ''
+
+
+# ClickHouse functions used by checks, strategies and step queries
+
+def _hash64(*values: Any) -> int:
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+    # SQLite integers are signed 64 bit
+    return int.from_bytes(digest, 'big') >> 1
+
+
+def _to_date(value: Any) -> Optional[str]:
+    value = convert(value)
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.isoformat() if isinstance(value, datetime.date) else None
+
+
+def _to_yyyymm(value: Any) -> Optional[int]:
+    value = _to_date(value)
+    return int(value[:4] + value[5:7]) if value else None
+
+
+def _to_start_of_month(value: Any) -> Optional[str]:
+    value = _to_date(value)
+    return value[:8] + '01' if value else None
+
+
+def _mod(a: Any, b: Any) -> Any:
+    if a is None or b is None:
+        return None
+    return a % b
+
+
+class _UniqExact:
+    """Number of distinct non-NULL argument tuples"""
+
+    def __init__(self):
+        self.values = set()
+
+    def step(self, *values):
+        if all(value is not None for value in values):
+            self.values.add(values)
+
+    def finalize(self):
+        return len(self.values)
+
+
+class _CountIf:
+    def __init__(self):
+        self.count = 0
+
+    def step(self, condition):
+        if condition:
+            self.count += 1
+
+    def finalize(self):
+        return self.count
+
+
+class _SumIf:
+    def __init__(self):
+        self.total = None
+
+    def step(self, value, condition):
+        if condition and value is not None:
+            self.total = value if self.total is None else self.total + value
+
+    def finalize(self):
+        return self.total if self.total is not None else 0
+
+
+SCALAR_FUNCTIONS = {
+    # name: (number of arguments, function, deterministic)
+    'toDate': (1, _to_date, True),
+    'toYYYYMM': (1, _to_yyyymm, True),
+    'toStartOfMonth': (1, _to_start_of_month, True),
+    'toString': (1, lambda value: None if value is None else str(value), True),
+    'cityHash64': (-1, _hash64, True),
+    'sipHash64': (-1, _hash64, True),
+    'xxHash64': (-1, _hash64, True),
+    'mod': (2, _mod, True),
+    'currentDatabase': (0, lambda: 'main', True),
+    'now': (0, lambda: datetime.datetime.now().replace(microsecond=0).isoformat(sep=' '), False),
+    'today': (0, lambda: datetime.date.today().isoformat(), False),
+}
+
+AGGREGATE_FUNCTIONS = {
+    'uniqExact': (-1, _UniqExact),
+    'uniq': (-1, _UniqExact),
+    'uniqCombined': (-1, _UniqExact),
+    'uniqCombined64': (-1, _UniqExact),
+    'countIf': (1, _CountIf),
+    'sumIf': (2, _SumIf),
+}
+
+
+def register_functions(connection: Any):
+    """Register ClickHouse functions on a sqlite3 connection"""
+    for name, (arguments, function, deterministic) in SCALAR_FUNCTIONS.items():
+        connection.create_function(name, arguments, function, deterministic=deterministic)
+    for name, (arguments, aggregate) in AGGREGATE_FUNCTIONS.items():
+        connection.create_aggregate(name, arguments, aggregate)
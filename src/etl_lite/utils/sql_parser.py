@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterator, List, Tuple
+import hashlib
+import re
+import threading
+
+# Single pass tokenizer: comments and literals are matched first so that
+# keywords inside them are never seen
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<placeholder>\{\{\s*[\w.]+\s*\}\})
+  | (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<quoted>`[^`]*`|"[^"]*")
+  | (?P<word>[A-Za-z_][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<symbol>[(),.;])
+  | (?P<other>\S)
+""", re.VERBOSE | re.DOTALL)
+
+PLACEHOLDER_NAME = re.compile(r'\{\{\s*([\w.]+)\s*\}\}')
+
+# Words after which '(' opens a subquery or expression list, not a function call
+KEYWORDS = frozenset("""
+    select from where join on using in as with and or not exists union all any
+    distinct by group order having limit prewhere final sample array global
+    left right inner outer full cross semi anti asof when then else case
+    values into insert
+""".split())
+
+CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class QueryTables:
+    """Tables referenced by a query"""
+    tables: FrozenSet[str]          # tables read (FROM, JOIN, IN table), CTEs excluded
+    ctes: FrozenSet[str]            # names defined in WITH name AS (...)
+    placeholders: FrozenSet[str]    # {{name}} placeholders, e.g. source.table
+    templated_tables: FrozenSet[str] = frozenset()  # tables named by placeholders, e.g. db.{{table}}
+
+
+def tokenize(query: str) -> Iterator[Tuple[str, str]]:
+    """Yield (kind, text) tokens of a query, skipping comments"""
+    for match in TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        if kind != 'comment':
+            yield kind, match.group()
+
+
+def strip_terminator(query: str) -> str:
+    """Query without trailing semicolons (and comments after them)"""
+    while True:
+        last = None
+        for match in TOKEN_PATTERN.finditer(query):
+            if match.lastgroup != 'comment':
+                last = match
+        if last is None or last.group() != ';':
+            return query.rstrip()
+        query = query[:last.start()]
+
+
+def _identifier(tokens: List[Tuple[str, str]], i: int) -> Tuple[str, int]:
+    """Read possibly qualified identifier at position i
+
+    Returns:
+        (name, index after the identifier), name is '' if there is none
+    """
+    parts = []
+    while i < len(tokens) and tokens[i][0] in ('word', 'quoted', 'placeholder'):
+        kind, text = tokens[i]
+        parts.append(text[1:-1] if kind == 'quoted' else text)
+        i += 1
+        if i < len(tokens) and tokens[i][1] == '.':
+            i += 1
+            continue
+        break
+    return '.'.join(parts), i
+
+
+def _extract(query: str) -> QueryTables:
+    tokens = list(tokenize(query))
+    tables, ctes, placeholders = set(), set(), set()
+    # Kind of each open parenthesis: True for function calls
+    parens: List[bool] = []
+
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        lower = text.lower() if kind == 'word' else None
+        previous = tokens[i - 1] if i else ('', '')
+
+        if kind == 'placeholder':
+            placeholders.add(PLACEHOLDER_NAME.match(text).group(1))
+        elif text == '(':
+            parens.append(previous[0] in ('word', 'quoted') and previous[1].lower() not in KEYWORDS)
+        elif text == ')':
+            if parens:
+                parens.pop()
+        elif lower == 'with':
+            # WITH name AS (subquery) [, name AS (subquery)]
+            j = i + 1
+            while j + 2 < len(tokens):
+                name, k = _identifier(tokens, j)
+                if name and k + 1 < len(tokens) and tokens[k][1].lower() == 'as' and tokens[k + 1][1] == '(':
+                    ctes.add(name)
+                    # Skip to the matching parenthesis, the body is scanned normally later
+                    depth, k = 0, k + 1
+                    while k < len(tokens):
+                        depth += {'(': 1, ')': -1}.get(tokens[k][1], 0)
+                        if depth == 0:
+                            break
+                        k += 1
+                    if k + 1 < len(tokens) and tokens[k + 1][1] == ',':
+                        j = k + 2
+                        continue
+                break
+        elif lower in ('from', 'join') and not (parens and parens[-1]):
+            # FROM inside a function call is EXTRACT(x FROM y) / trim(... FROM ...)
+            if lower == 'join' and previous[1].lower() == 'array':
+                i += 1
+                continue
+            j = i + 1
+            while j < len(tokens):
+                name, k = _identifier(tokens, j)
+                if not name or (k < len(tokens) and tokens[k][1] == '('):
+                    break  # subquery or table function
+                tables.add(name)
+                # Skip alias, then continue on comma joins
+                if k < len(tokens) and tokens[k][1].lower() == 'as':
+                    k += 1
+                if k < len(tokens) and tokens[k][0] in ('word', 'quoted') and tokens[k][1].lower() not in KEYWORDS:
+                    k += 1
+                if k < len(tokens) and tokens[k][1] == ',' and lower == 'from':
+                    j = k + 1
+                    continue
+                break
+        elif lower == 'in' and i + 1 < len(tokens) and tokens[i + 1][1] != '(':
+            # ClickHouse: x IN db.table. A lone placeholder is a value list
+            # parameter (x IN {{ids}}), unless it follows GLOBAL IN
+            name, k = _identifier(tokens, i + 1)
+            parameter = k == i + 2 and tokens[i + 1][0] == 'placeholder' and previous[1].lower() != 'global'
+            if name and not parameter:
+                tables.add(name)
+        i += 1
+
+    templated_tables = {name for name in tables if '{{' in name}
+    tables = {name for name in tables - templated_tables if name not in ctes}
+    return QueryTables(frozenset(tables), frozenset(ctes), frozenset(placeholders), frozenset(templated_tables))
+
+
+_cache: Dict[bytes, QueryTables] = {}
+_cache_lock = threading.Lock()
+
+
+def extract_tables(query: str) -> QueryTables:
+    """Tables, CTE names and placeholders of a query, cached by query hash
+
+    Args:
+        query: SQL query text
+
+    Returns:
+        QueryTables with names as written in the query
+    """
+    key = hashlib.blake2b(query.encode(), digest_size=16).digest()
+    result = _cache.get(key)
+    if result is None:
+        result = _extract(query)
+        with _cache_lock:
+            if len(_cache) >= CACHE_SIZE:
+                _cache.clear()
+            _cache[key] = result
+    return result
@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional
+import re
+
+import yaml
+
+# libyaml based loader when PyYAML was built with it
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+KEY_LINE = re.compile(r'^([A-Za-z_][\w]*):(?:[ \t]+(.*?))?[ \t]*$')
+INTEGER = re.compile(r'^(?:0|-?[1-9][0-9]*)$')
+FLOAT = re.compile(r'^-?(?:0|[1-9][0-9]*)\.[0-9]+$')
+QUANTITY = re.compile(r'^[0-9]+ +[A-Za-z]+$')      # e.g. window: 3 day
+# Plain scalars YAML resolves to something other than a string
+SPECIAL_WORDS = frozenset("""
+    true false yes no on off null ~ y n
+""".split())
+PLAIN_START = re.compile(r'^[A-Za-z_]')
+QUOTED = re.compile(r"""^(?:'[^']*'|"[^"\\]*")$""")
+
+
+class _Unsupported(Exception):
+    """Text is outside the subset understood by the fast parser"""
+    pass
+
+
+def load_yaml(text: str) -> Any:
+    """Load YAML of a metadata block
+
+    The common block shapes (flat `key: value` lines, inline lists and one
+    level of nested `key: value` mappings) are read by a restricted parser
+    that produces exactly what yaml.safe_load would; anything else goes
+    through PyYAML, using the libyaml loader when available.
+
+    Raises:
+        yaml.YAMLError: If the text is not valid YAML
+    """
+    try:
+        return parse_simple(text)
+    except _Unsupported:
+        return yaml.load(text, Loader=SafeLoader)
+
+
+def parse_simple(text: str) -> Optional[Dict[str, Any]]:
+    """Parse the restricted block format
+
+    Raises:
+        _Unsupported: If the text uses any other YAML feature
+    """
+    result: Dict[str, Any] = {}
+    nested: Optional[Dict[str, Any]] = None
+    nested_indent = None
+    # Blocks keep the indentation of their comment lines, e.g. "--   name: x"
+    base_indent = None
+
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        if base_indent is None:
+            base_indent = indent
+        if indent < base_indent:
+            raise _Unsupported()
+        line, indent = line[base_indent:], indent - base_indent
+        if indent:
+            # Entry of the mapping opened by the previous "key:" line
+            if nested is None or (nested_indent is not None and indent != nested_indent):
+                raise _Unsupported()
+            nested_indent = indent
+            key, value = _key_value(line[indent:])
+            if value is None:
+                raise _Unsupported()
+            nested[key] = _value(value)
+            continue
+
+        if nested is not None and not nested:
+            raise _Unsupported()     # "key:" without entries is null
+        nested, nested_indent = None, None
+        key, value = _key_value(line)
+        if value is None:
+            nested = result[key] = {}
+        elif value == '|':
+            # Start of the SQL of a custom check, the SQL itself is cut out by the caller
+            result[key] = ''
+        else:
+            result[key] = _value(value)
+
+    if nested is not None and not nested:
+        raise _Unsupported()
+    return result or None
+
+
+def _key_value(line: str):
+    match = KEY_LINE.match(line)
+    if not match or match.group(1).lower() in SPECIAL_WORDS:
+        raise _Unsupported()
+    return match.group(1), match.group(2)
+
+
+def _value(value: str) -> Any:
+    if value.startswith('[') and value.endswith(']'):
+        return _list(value[1:-1])
+    return _scalar(value)
+
+
+def _list(items: str) -> List[Any]:
+    if not items.strip():
+        return []
+    if any(char in items for char in '[]{}\'"'):
+        raise _Unsupported()
+    return [_scalar(item.strip()) for item in items.split(',')]
+
+
+def _scalar(value: str) -> Any:
+    if QUOTED.match(value):
+        return value[1:-1]
+    if INTEGER.match(value):
+        return int(value)
+    if FLOAT.match(value):
+        return float(value)
+    if QUANTITY.match(value):
+        return value
+    if not PLAIN_START.match(value) or value.lower() in SPECIAL_WORDS:
+        raise _Unsupported()
+    if ': ' in value or ' #' in value or value.endswith(':') or '\t' in value:
+        raise _Unsupported()
+    return value
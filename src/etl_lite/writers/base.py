@@ -0,0 +1,253 @@
+# src/etl_lite/writers/base.py
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+import datetime
+import decimal
+import logging
+import re
+import uuid
+
+DEFAULT_BLOCK_SIZE = 65536
+
+WRAPPER_TYPE = re.compile(r'^(Nullable|LowCardinality|Array)\((.*)\)$')
+DECIMAL_TYPE = re.compile(r'^Decimal(\d*)\(')
+
+Converter = Callable[[Any], Any]
+
+
+class WriterError(Exception):
+    """Raised when rows can't be converted or written to a target"""
+    pass
+
+
+class Writer(ABC):
+    """Streaming writer of rows into a target
+
+    Rows are consumed lazily and written in blocks of `block_size` rows, so
+    a result is never held in memory as a whole. Each row is a sequence in
+    column order or a mapping by column name; values are converted to the
+    ClickHouse type of their column first (see column_converter).
+
+    Writers are context managers: leaving the block without an error
+    commits what was written, an error discards it.
+
+    Example:
+        with CSVWriter('export/volume.csv.gz', columns) as writer:
+            writer.write(connection.execute_iter(query))
+    """
+
+    def __init__(self, columns: Dict[str, str], block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            columns: Column name -> ClickHouse type, e.g. TableTarget.columns
+            block_size: Rows per written block
+        """
+        if not columns:
+            raise WriterError("Writer needs at least one column")
+        if block_size < 1:
+            raise WriterError("block_size must be positive")
+        self.columns = dict(columns)
+        self.block_size = block_size
+        self.converters = [column_converter(type_) for type_ in self.columns.values()]
+        self.rows = 0
+        self.blocks = 0
+        self.closed = False
+        self.logger = logging.getLogger(__name__)
+
+    def write(self, rows: Iterable[Any]) -> int:
+        """Write rows block by block
+
+        Returns:
+            Number of rows written by this call
+        """
+        written = 0
+        iterator = iter(rows)
+        while True:
+            block = list(islice(iterator, self.block_size))
+            if not block:
+                return written
+            self.write_block(block)
+            written += len(block)
+
+    def write_block(self, rows: List[Any]):
+        """Convert and write one block of rows"""
+        if self.closed:
+            raise WriterError("Writer is closed")
+        if rows:
+            self._write_columns(self.convert(rows), len(rows))
+            self.rows += len(rows)
+            self.blocks += 1
+
+    def convert(self, rows: List[Any]) -> List[List[Any]]:
+        """Typed values of a block of rows, column by column"""
+        names = list(self.columns)
+        if isinstance(rows[0], Mapping):
+            try:
+                columns = [[row[name] for row in rows] for name in names]
+            except KeyError as e:
+                raise WriterError(f"Row has no value for column {e.args[0]}")
+        else:
+            columns = [list(column) for column in zip(*rows)]
+            if len(columns) != len(names) or any(len(row) != len(names) for row in rows):
+                raise WriterError(f"Rows must have {len(names)} values ({', '.join(names)})")
+
+        for i, (name, converter) in enumerate(zip(names, self.converters)):
+            if converter is None:
+                continue
+            values = columns[i]
+            try:
+                columns[i] = [converter(value) for value in values]
+            except (TypeError, ValueError, ArithmeticError) as e:
+                raise WriterError(f"Can't convert column {name} to {self.columns[name]}: {e}")
+        return columns
+
+    def close(self):
+        """Commit written rows and release resources"""
+        if not self.closed:
+            self.closed = True
+            self._commit()
+            self.logger.info(f"Wrote {self.rows} rows in {self.blocks} blocks to {self}")
+
+    def abort(self):
+        """Discard written rows and release resources"""
+        if not self.closed:
+            self.closed = True
+            self._abort()
+
+    @abstractmethod
+    def _write_columns(self, columns: List[List[Any]], size: int):
+        """Write converted block, one list of values per column"""
+
+    def _commit(self):
+        pass
+
+    def _abort(self):
+        pass
+
+    def __enter__(self) -> 'Writer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def stream_query(connection: Any, query: str, params: Optional[Dict[str, Any]] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[Sequence[Any]]:
+    """Rows of a query, streamed block by block when the driver supports it
+
+    Drivers without execute_iter (e.g. the SQLite engine) return the result
+    at once.
+    """
+    execute_iter = getattr(connection, 'execute_iter', None)
+    if execute_iter is None:
+        return iter(connection.execute(query, params))
+    return execute_iter(query, params, settings={'max_block_size': block_size})
+
+
+def column_converter(type_: str) -> Optional[Converter]:
+    """Function converting Python values to a ClickHouse column type
+
+    Values of the expected type pass unchanged; strings, numbers and
+    date/datetime values are converted (e.g. '2024-01-31' to a date for a
+    Date column). Returns None for types whose values are passed as they are.
+    """
+    type_ = type_.strip()
+    match = WRAPPER_TYPE.match(type_)
+    if match:
+        wrapper, inner = match.groups()
+        converter = column_converter(inner)
+        if wrapper == 'LowCardinality':
+            return converter
+        if wrapper == 'Array':
+            convert_item = converter or (lambda value: value)
+            return lambda values: [convert_item(value) for value in values]
+        if converter is None:
+            return lambda value: None if _is_null(value) else value
+        return lambda value: None if _is_null(value) else converter(value)
+
+    if re.match(r'^U?Int\d+$', type_):
+        return _to_int
+    if re.match(r'^Float\d+$', type_):
+        return float
+    if DECIMAL_TYPE.match(type_):
+        return _to_decimal
+    if type_ == 'Bool':
+        return _to_bool
+    if type_ in ('Date', 'Date32'):
+        return _to_date
+    if type_.startswith('DateTime'):
+        return _to_datetime
+    if type_ == 'UUID':
+        return _to_uuid
+    if type_ == 'String' or type_.startswith(('FixedString', 'Enum')):
+        return _to_string
+    return None
+
+
+def _is_null(value: Any) -> bool:
+    # NaN stands for missing values in pandas results
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def _to_decimal(value: Any) -> decimal.Decimal:
+    if isinstance(value, decimal.Decimal):
+        return value
+    # Through str, so that 0.1 is Decimal('0.1')
+    return decimal.Decimal(str(value))
+
+
+def _to_bool(value: Any) -> bool:
+    if value is None:
+        raise TypeError("None is not a boolean")
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', '1'):
+            return True
+        if lowered in ('false', '0'):
+            return False
+        raise ValueError(f"{value!r} is not a boolean")
+    return bool(value)
+
+
+def _to_date(value: Any) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    raise TypeError(f"{value!r} is not a date")
+
+
+def _to_datetime(value: Any) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value)
+    raise TypeError(f"{value!r} is not a datetime")
+
+
+def _to_uuid(value: Any) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _to_string(value: Any) -> Any:
+    if value is None:
+        raise TypeError("None is not a string")
+    return value if isinstance(value, (str, bytes)) else str(value)
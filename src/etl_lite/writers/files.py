@@ -0,0 +1,229 @@
+# src/etl_lite/writers/files.py
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import re
+
+from etl_lite.writers.base import DEFAULT_BLOCK_SIZE, Writer, WriterError
+
+# Compression of CSV files -> function opening a compressed text file
+CSV_COMPRESSION = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+EXCEL_MAX_ROWS = 1048576
+
+
+class FileWriter(Writer):
+    """Writer of a file target
+
+    The file is written under a temporary name next to its final path and
+    renamed on close, so an interrupted export never leaves a partial file.
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Dict[str, str], block_size: int = DEFAULT_BLOCK_SIZE):
+        super().__init__(columns, block_size)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.partial_path = self.path.with_name(f".{self.path.stem}.partial{self.path.suffix}")
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def _commit(self):
+        self._finish()
+        os.replace(self.partial_path, self.path)
+
+    def _abort(self):
+        try:
+            self._finish()
+        finally:
+            if self.partial_path.exists():
+                self.partial_path.unlink()
+
+    def _finish(self):
+        """Flush and close the partial file"""
+
+
+class CSVWriter(FileWriter):
+    """Writer of CSV files with a header line, optionally compressed
+
+    Blocks are appended to the (compressed) stream as they arrive. Dates are
+    written in ISO format and NULLs as empty fields.
+
+    Example:
+        with CSVWriter('export/volume.csv.gz', target.columns) as writer:
+            writer.write(stream_query(connection, "SELECT * FROM reports.client_volume"))
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Dict[str, str], block_size: int = DEFAULT_BLOCK_SIZE,
+                 compression: Optional[str] = 'infer', delimiter: str = ',', encoding: str = 'utf-8'):
+        """
+        Args:
+            path: File to write
+            columns: Column name -> ClickHouse type
+            block_size: Rows per written block
+            compression: 'gzip', 'bz2', 'xz' or None; 'infer' picks it from
+                the file suffix (.gz, .bz2, .xz)
+            delimiter: Field delimiter
+            encoding: Text encoding
+        """
+        super().__init__(path, columns, block_size)
+        if compression == 'infer':
+            compression = COMPRESSION_SUFFIXES.get(self.path.suffix.lower())
+        if compression is not None and compression not in CSV_COMPRESSION:
+            raise WriterError(f"Unknown CSV compression: {compression}")
+        self.compression = compression
+
+        if compression is None:
+            self.file = open(self.partial_path, 'w', newline='', encoding=encoding)
+        else:
+            self.file = CSV_COMPRESSION[compression](self.partial_path, 'wt', newline='', encoding=encoding)
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow(self.columns)
+
+    def _write_columns(self, columns: List[List[Any]], size: int):
+        self.writer.writerows(zip(*columns))
+
+    def _finish(self):
+        self.file.close()
+
+
+class ParquetWriter(FileWriter):
+    """Writer of Parquet files, one row group per block (requires pyarrow)
+
+    The Arrow schema is derived from the ClickHouse column types, e.g.
+    Nullable(Decimal(18, 4)) is a nullable decimal128(18, 4) column.
+
+    Example:
+        with ParquetWriter('export/volume.parquet', target.columns, compression='zstd') as writer:
+            writer.write(rows)
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Dict[str, str], block_size: int = DEFAULT_BLOCK_SIZE,
+                 compression: Optional[str] = 'snappy'):
+        """
+        Args:
+            path: File to write
+            columns: Column name -> ClickHouse type
+            block_size: Rows per written block (row group)
+            compression: Parquet compression codec ('snappy', 'zstd',
+                'gzip', 'brotli', 'lz4') or None
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, columns, block_size)
+        self.pa = pa
+        self.schema = pa.schema([
+            pa.field(name, arrow_type(type_), nullable='Nullable(' in type_)
+            for name, type_ in self.columns.items()
+        ])
+        # Arrow has no UUID type, they are written as strings
+        self.converters = _uuids_as_strings(self.columns, self.converters)
+        self.writer = pq.ParquetWriter(str(self.partial_path), self.schema, compression=compression or 'none')
+
+    def _write_columns(self, columns: List[List[Any]], size: int):
+        arrays = [
+            self.pa.array(values, type=field.type)
+            for values, field in zip(columns, self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema), row_group_size=size)
+
+    def _finish(self):
+        self.writer.close()
+
+
+class ExcelWriter(FileWriter):
+    """Writer of Excel workbooks with one sheet (requires openpyxl)
+
+    Uses the write-only workbook of openpyxl, which streams rows to disk
+    instead of keeping cells in memory. Sheets hold at most 1048576 rows.
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Dict[str, str], block_size: int = DEFAULT_BLOCK_SIZE,
+                 sheet_name: str = 'data'):
+        """
+        Args:
+            path: File to write
+            columns: Column name -> ClickHouse type
+            block_size: Rows per written block
+            sheet_name: Name of the sheet
+        """
+        from openpyxl import Workbook
+
+        super().__init__(path, columns, block_size)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_name)
+        self.sheet.append(list(self.columns))
+        # Cells can't hold UUIDs
+        self.converters = _uuids_as_strings(self.columns, self.converters)
+
+    def _write_columns(self, columns: List[List[Any]], size: int):
+        if self.rows + size >= EXCEL_MAX_ROWS:
+            raise WriterError(f"Excel sheets hold at most {EXCEL_MAX_ROWS - 1} rows besides the header")
+        for row in zip(*columns):
+            self.sheet.append(row)
+
+    def _finish(self):
+        self.workbook.save(str(self.partial_path))
+
+
+def arrow_type(type_: str) -> Any:
+    """Arrow type of a ClickHouse column type"""
+    import pyarrow as pa
+
+    type_ = type_.strip()
+    match = re.match(r'^(Nullable|LowCardinality|Array)\((.*)\)$', type_)
+    if match:
+        inner = arrow_type(match.group(2))
+        return pa.list_(inner) if match.group(1) == 'Array' else inner
+
+    match = re.match(r'^(U?)Int(8|16|32|64)$', type_)
+    if match:
+        return getattr(pa, f"{'u' if match.group(1) else ''}int{match.group(2)}")()
+    if type_ in ('Float32', 'Float64'):
+        return pa.float32() if type_ == 'Float32' else pa.float64()
+    match = re.match(r'^Decimal\(\s*(\d+)\s*,\s*(\d+)\s*\)$', type_)
+    if match:
+        return pa.decimal128(int(match.group(1)), int(match.group(2)))
+    match = re.match(r'^Decimal(32|64|128)\(\s*(\d+)\s*\)$', type_)
+    if match:
+        precision = {'32': 9, '64': 18, '128': 38}[match.group(1)]
+        return pa.decimal128(precision, int(match.group(2)))
+    if type_ == 'Bool':
+        return pa.bool_()
+    if type_ in ('Date', 'Date32'):
+        return pa.date32()
+    if type_.startswith('DateTime64'):
+        match = re.match(r'^DateTime64\(\s*(\d+)', type_)
+        precision = int(match.group(1)) if match else 3
+        unit = 's' if precision == 0 else 'ms' if precision <= 3 else 'us' if precision <= 6 else 'ns'
+        return pa.timestamp(unit)
+    if type_.startswith('DateTime'):
+        return pa.timestamp('s')
+    if type_ in ('String', 'UUID') or type_.startswith(('FixedString', 'Enum')):
+        return pa.string()
+    raise WriterError(f"No Parquet type for column type {type_}")
+
+
+def _uuids_as_strings(columns: Dict[str, str], converters: List[Any]) -> List[Any]:
+    """Converters with the ones of UUID columns returning strings"""
+    def as_string(converter):
+        def convert(value):
+            value = converter(value)
+            return None if value is None else str(value)
+        return convert
+
+    return [
+        as_string(converter) if re.sub(r'^(Nullable|LowCardinality)\((.*)\)$', r'\2', type_.strip()) == 'UUID'
+        else converter
+        for converter, type_ in zip(converters, columns.values())
+    ]
@@ -0,0 +1,123 @@
+# src/etl_lite/writers/table.py
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+import uuid
+
+from etl_lite.engines.connection import ConnectionPool
+from etl_lite.engines.staging import StagingTable
+from etl_lite.modules.sql.targets import TableTarget
+from etl_lite.writers.base import DEFAULT_BLOCK_SIZE, Writer, WriterError
+
+
+class TableWriter(Writer):
+    """Writer inserting rows into a table with native block inserts
+
+    Every block is sent as one columnar INSERT, so the server creates one
+    part per block instead of one per small batch. With `insert_threads`
+    above one, blocks are inserted concurrently on connections of the pool
+    while the next block is read; at most `insert_threads` blocks are in
+    flight, which bounds memory use.
+
+    A TableTarget is created if missing and gives the column types rows are
+    converted to; for a table name the types are read with DESCRIBE TABLE.
+    Targets with the 'replace' strategy are loaded into a staging table and
+    swapped in on close, so readers never see a partial load.
+
+    Example:
+        pool = ConnectionPool(ClickHouseEngine(host='localhost'), max_size=4)
+        with TableWriter(pool, target, insert_threads=4) as writer:
+            writer.write(rows)
+    """
+
+    def __init__(self, pool: Union[ConnectionPool, Any], target: Union[TableTarget, str],
+                 block_size: int = DEFAULT_BLOCK_SIZE, insert_threads: int = 1,
+                 columns: Optional[Dict[str, str]] = None, settings: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            pool: Connection pool, or a single connection (inserts then run
+                one at a time)
+            target: Target table, TableTarget or table name
+            block_size: Rows per INSERT
+            insert_threads: Number of blocks inserted concurrently
+            columns: Column name -> type, defaults to the target columns
+            settings: Settings of the INSERT queries
+        """
+        if insert_threads < 1:
+            raise WriterError("insert_threads must be positive")
+        self.pool = pool if isinstance(pool, ConnectionPool) else ConnectionPool.from_connection(pool)
+        self.name = target.name if isinstance(target, TableTarget) else target
+        self.settings = {'insert_block_size': block_size, **(settings or {})}
+
+        with self.pool.connection() as connection:
+            if isinstance(target, TableTarget):
+                connection.execute(target.get_create_statement())
+                columns = columns or target.columns
+            elif columns is None:
+                columns = {row[0]: row[1] for row in connection.execute(f"DESCRIBE TABLE {self.name}")}
+            super().__init__(columns, block_size)
+
+            self.staging = None
+            if isinstance(target, TableTarget) and target.strategy == 'replace':
+                self.staging = StagingTable(self.name, bool(target.partition_by), uuid.uuid4().hex[:8])
+                self.staging.create(connection)
+
+        destination = self.staging.name if self.staging is not None else self.name
+        self.query = f"INSERT INTO {destination} ({', '.join(self.columns)}) VALUES"
+        self.insert_threads = insert_threads
+        self._executor = ThreadPoolExecutor(insert_threads) if insert_threads > 1 else None
+        self._pending: deque = deque()
+
+    def __str__(self) -> str:
+        return self.name
+
+    def _write_columns(self, columns: List[List[Any]], size: int):
+        if self._executor is None:
+            self._insert(columns)
+            return
+        # Wait for the oldest block before reading further ones
+        while len(self._pending) >= self.insert_threads:
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(self._insert, columns))
+
+    def _insert(self, columns: List[List[Any]]):
+        with self.pool.connection() as connection:
+            connection.execute(self.query, columns, settings=self.settings, columnar=True, types_check=False)
+
+    def _wait(self):
+        """Wait for inserts in flight, raising the first error"""
+        try:
+            while self._pending:
+                self._pending.popleft().result()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def _commit(self):
+        try:
+            self._wait()
+        except Exception:
+            self._drop_staging()
+            raise
+        if self.staging is None:
+            return
+        try:
+            with self.pool.connection() as connection:
+                self.staging.swap(connection)
+        finally:
+            self._drop_staging()
+
+    def _abort(self):
+        try:
+            for future in self._pending:
+                future.cancel()
+            self._wait()
+        except Exception:
+            pass
+        finally:
+            self._drop_staging()
+
+    def _drop_staging(self):
+        if self.staging is not None:
+            with self.pool.connection() as connection:
+                self.staging.drop(connection)
@@ -0,0 +1,51 @@
+# src/etl_lite/writers/targets.py
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from etl_lite.modules.sql.targets import TableTarget
+from etl_lite.writers.base import Writer, WriterError
+from etl_lite.writers.files import CSVWriter, ExcelWriter, ParquetWriter
+from etl_lite.writers.table import TableWriter
+
+# File suffix -> writer, compression suffixes are skipped (volume.csv.gz)
+FILE_WRITERS = {
+    '.csv': CSVWriter,
+    '.tsv': CSVWriter,
+    '.parquet': ParquetWriter,
+    '.xlsx': ExcelWriter,
+}
+
+
+def open_writer(target: Union[TableTarget, str, Path], connection: Any = None,
+                columns: Optional[Dict[str, str]] = None, **options: Any) -> Writer:
+    """Writer for a step target
+
+    TableTargets and table names are written with a TableWriter on
+    connection (a connection or a ConnectionPool); paths with the writer of
+    their file type, which needs the column types.
+
+    Args:
+        target: TableTarget, table name or path of a file target
+        connection: Connection or pool, for table targets
+        columns: Column name -> ClickHouse type; defaults to the columns of
+            a TableTarget, or those of the table if it exists
+        options: Options of the writer, e.g. block_size, insert_threads or
+            compression
+
+    Raises:
+        WriterError: If the target type is unknown or columns are missing
+    """
+    if isinstance(target, Path):
+        suffixes = [suffix.lower() for suffix in target.suffixes]
+        writer = next((FILE_WRITERS[suffix] for suffix in reversed(suffixes) if suffix in FILE_WRITERS), None)
+        if writer is None:
+            raise WriterError(f"No writer for files like {target.name}")
+        if columns is None:
+            raise WriterError(f"Column types of {target} are required")
+        if '.tsv' in suffixes:
+            options.setdefault('delimiter', '\t')
+        return writer(target, columns, **options)
+
+    if connection is None:
+        raise WriterError(f"Writing to table {target} requires a connection")
+    return TableWriter(connection, target, columns=columns, **options)
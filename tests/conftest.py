@@ -0,0 +1,60 @@
+import datetime
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from etl_lite.engines.connection import ConnectionPool
+from etl_lite.sqlite.connection import SQLiteEngine
+
+TRADES = [
+    (client_id, datetime.date(2024, 1, 1) + datetime.timedelta(days=day), float(10 * client_id + day),
+     'emea' if client_id % 2 else 'apac')
+    for client_id in range(1, 5)
+    for day in range(4)
+]
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Embedded engine with its database files in the test directory"""
+    return SQLiteEngine(tmp_path / 'db')
+
+
+@pytest.fixture
+def connection(sqlite_engine):
+    connection = sqlite_engine.connect()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def pool(sqlite_engine):
+    pool = ConnectionPool(sqlite_engine, max_size=4)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def trades(connection):
+    """raw.trades with 4 days of trades of 4 clients"""
+    connection.execute(
+        "CREATE TABLE raw.trades (client_id UInt64, day Date, amount Float64, region String) "
+        "ENGINE = MergeTree ORDER BY (client_id, day)"
+    )
+    connection.execute("INSERT INTO raw.trades (client_id, day, amount, region) VALUES", TRADES)
+    return TRADES
+
+
+@pytest.fixture
+def step_dir(tmp_path):
+    """Write step files: step_dir({'01_daily': sql, ...}) -> directory"""
+    directory = tmp_path / 'steps'
+
+    def write(steps):
+        directory.mkdir(exist_ok=True)
+        for name, text in steps.items():
+            (directory / f"{name}.sql").write_text(textwrap.dedent(text).lstrip())
+        return directory
+
+    return write
@@ -0,0 +1,26 @@
+from etl_lite.core.cache import QueryCache
+from etl_lite.core.results import InstrumentedConnection, StepResult
+
+COUNT = "SELECT count() FROM raw.trades"
+
+
+def test_cached_check_query_runs_once(sqlite_engine, connection, trades):
+    cache = QueryCache(sqlite_engine)
+    assert cache.execute(connection, COUNT) == cache.execute(connection, COUNT) == [(len(trades),)]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_version_lookups_are_not_check_queries(sqlite_engine, connection, trades):
+    result = StepResult('daily')
+    instrumented = InstrumentedConnection(connection, result, phase='check')
+    instrumented.label = 'row_count'
+    cache = QueryCache(sqlite_engine)
+
+    cache.execute(instrumented, COUNT)
+    cache.execute(instrumented, COUNT)
+
+    phases = [query.phase for query in result.queries]
+    assert phases.count('check') == 1
+    assert set(phases) == {'check', 'versions'}
+    assert list(result.check_times) == ['row_count']
+    assert (instrumented.phase, instrumented.label) == ('check', 'row_count')
@@ -0,0 +1,85 @@
+from etl_lite.core.checks import AggregateCheck, CheckPlanner, aggregate_check
+from etl_lite.modules.sql import invariants, tests
+
+
+class RecordingConnection:
+    """Records the queries sent to the wrapped connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = []
+
+    def execute(self, query, *args, **kwargs):
+        self.queries.append(query)
+        return self.connection.execute(query, *args, **kwargs)
+
+
+def block(kind, function, **params):
+    return {'type': kind, 'function': function, 'params': params}
+
+
+def test_checks_of_a_table_run_in_one_scan(connection, trades):
+    recording = RecordingConnection(connection)
+    test_blocks = [
+        block('no_duplicates', tests.no_duplicates, name='unique', columns=['client_id', 'day']),
+        block('range', tests.range, name='positive', column='amount', min=0, max=40),
+    ]
+    baseline = [float(sum(row[2] for row in trades) + 1), 16]
+    invariant_blocks = [
+        block('sum', invariants.sum, name='amount', column='amount', tolerance='relative(0.01)'),
+        block('count', invariants.count, name='rows', tolerance='absolute(0)'),
+    ]
+
+    results = CheckPlanner(recording).run('raw.trades', test_blocks, invariant_blocks, baseline)
+
+    assert len(recording.queries) == 1
+    # count(*) is shared by no_duplicates and the count invariant
+    assert recording.queries[0].count('count(*)') == 1
+    assert [(r.name, r.kind, r.status) for r in results] == [
+        ('unique', 'test', 'green'),
+        ('positive', 'test', 'red'),
+        ('amount', 'invariant', 'green'),
+        ('rows', 'invariant', 'green'),
+    ]
+    assert results[2].value == sum(row[2] for row in trades)
+    assert results[3].value == 16
+
+
+def test_custom_checks_run_on_their_own(connection, trades):
+    recording = RecordingConnection(connection)
+    checks = [
+        block('range', tests.range, name='positive', column='amount', min=0, max=100),
+        block('custom', invariants.custom, name='regions',
+              query="SELECT count(distinct region) FROM {table}", tolerance=0),
+    ]
+
+    values = CheckPlanner(recording).evaluate('raw.trades', checks)
+
+    assert values == [True, 2]
+    assert recording.queries[1] == "SELECT count(distinct region) FROM raw.trades"
+    assert len(recording.queries) == 2
+
+
+def count_with(settings):
+    """Row count check running with query settings"""
+    @aggregate_check
+    def count(name):
+        return AggregateCheck(expressions=("count(*)",), evaluate=int, settings=settings)
+    return count
+
+
+def test_conflicting_settings_split_the_scan():
+    checks = [
+        block('a', count_with({'max_threads': 1}), name='a'),
+        block('b', count_with({'max_threads': 2}), name='b'),
+        block('c', count_with({'max_threads': 1}), name='c'),
+    ]
+
+    queries, standalone = CheckPlanner(None).plan('raw.trades', checks)
+
+    assert standalone == []
+    assert [query for query, _ in queries] == [
+        "SELECT count(*) FROM raw.trades SETTINGS max_threads=1",
+        "SELECT count(*) FROM raw.trades SETTINGS max_threads=2",
+    ]
+    assert [[i for i, _, _ in members] for _, members in queries] == [[0, 2], [1]]
@@ -0,0 +1,221 @@
+import threading
+import time
+
+import pytest
+
+from etl_lite.core.executor import ParallelExecutor
+from etl_lite.core.graph import GraphError, StepGraph, StepNode
+from etl_lite.core.results import StepCancelled, StepStatus
+from etl_lite.engines.connection import ConnectionPool
+
+
+def graph_of(*nodes):
+    graph = StepGraph()
+    for node in nodes:
+        graph.add_step(node)
+    return graph
+
+
+def test_dependencies_come_first():
+    graph = graph_of(
+        StepNode('total', 'reports.total', {'reports.daily'}),
+        StepNode('daily', 'reports.daily', {'raw.trades'}),
+        StepNode('clients', 'reports.clients', {'raw.clients'}),
+    )
+    assert graph.topological_order() == ['daily', 'clients', 'total']
+    assert graph.upstream('total') == {'daily'}
+
+
+def test_unqualified_reference_matches_target_in_any_database():
+    graph = graph_of(
+        StepNode('daily', 'reports.daily', {'raw.trades'}),
+        StepNode('total', 'reports.total', {'daily'}),
+    )
+    assert graph.upstream('total') == {'daily'}
+
+
+def test_writers_of_one_target_are_chained():
+    graph = graph_of(
+        StepNode('load_a', 'reports.daily', {'raw.a'}),
+        StepNode('load_b', 'reports.daily', {'raw.b'}),
+        StepNode('total', 'reports.total', {'reports.daily'}),
+    )
+    assert graph.upstream('load_b') == {'load_a'}
+    assert graph.upstream('total') == {'load_a', 'load_b'}
+
+
+def test_cycle_is_rejected():
+    graph = graph_of(
+        StepNode('a', 'reports.a', {'reports.b'}),
+        StepNode('b', 'reports.b', {'reports.a'}),
+    )
+    with pytest.raises(GraphError, match='cycle'):
+        graph.topological_order()
+
+
+class RecordingExecutor(ParallelExecutor):
+    """Runs no queries, records the slots in use while steps run"""
+
+    def __init__(self, max_workers, fail=()):
+        super().__init__(ConnectionPool.from_connection(object()), max_workers=max_workers, cache_size=0)
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.used = 0
+        self.peak = 0
+        self.started = []
+
+    def _run_step(self, graph, name, result, cancel=None, cache=None):
+        slots = max(1, min(graph.nodes[name].concurrency, self.max_workers))
+        with self.lock:
+            self.used += slots
+            self.peak = max(self.peak, self.used)
+            self.started.append(name)
+        time.sleep(0.02)
+        with self.lock:
+            self.used -= slots
+        if name in self.fail:
+            raise RuntimeError(f"{name} failed")
+
+
+def pipeline_graph():
+    """trades -> daily -> total -> report, clients on its own"""
+    return graph_of(
+        StepNode('daily', 'reports.daily', {'raw.trades'}),
+        StepNode('total', 'reports.total', {'reports.daily'}),
+        StepNode('report', 'reports.report', {'reports.total', 'reports.clients'}),
+        StepNode('clients', 'reports.clients', {'raw.clients'}),
+        StepNode('volume[emea]', 'reports.volume_emea', {'raw.trades'}, template='volume'),
+        StepNode('volume[apac]', 'reports.volume_apac', {'raw.trades'}, template='volume'),
+    )
+
+
+@pytest.mark.parametrize('selectors, expected', [
+    (['total'], {'total'}),
+    (['total+'], {'total', 'report'}),
+    (['+total'], {'daily', 'total'}),
+    (['+total+'], {'daily', 'total', 'report'}),
+    (['target:reports.clients+'], {'clients', 'report'}),
+    (['reads:raw.trades'], {'daily', 'volume[emea]', 'volume[apac]'}),
+    (['volume'], {'volume[emea]', 'volume[apac]'}),
+    (['clients', 'daily+'], {'clients', 'daily', 'total', 'report'}),
+])
+def test_selectors(selectors, expected):
+    assert pipeline_graph().select(selectors) == expected
+
+
+def test_selector_matching_nothing_is_rejected():
+    with pytest.raises(GraphError, match='reads:raw.missing'):
+        pipeline_graph().select(['reads:raw.missing'])
+
+
+def test_subgraph_keeps_dependencies_between_selected_steps():
+    graph = pipeline_graph()
+    subgraph = graph.subgraph(graph.select(['daily+']))
+
+    assert subgraph.topological_order() == ['daily', 'total', 'report']
+    assert subgraph.upstream('report') == {'total'}
+
+
+def test_scheduler_runs_selected_steps_only():
+    executor = RecordingExecutor(max_workers=2)
+    result = executor.run(pipeline_graph(), select=['+total'])
+
+    assert sorted(executor.started) == ['daily', 'total']
+    assert set(result.steps) == {'daily', 'total'}
+
+
+class BlockingExecutor(ParallelExecutor):
+    """Steps named slow* run until cancelled, records killed steps"""
+
+    def __init__(self, max_workers=2):
+        super().__init__(ConnectionPool.from_connection(object()), max_workers=max_workers, cache_size=0)
+        self.killed = []
+
+    def _run_step(self, graph, name, result, cancel=None, cache=None):
+        if name.startswith('slow'):
+            if not cancel.wait(5):
+                raise RuntimeError(f"{name} was not cancelled")
+            raise StepCancelled(f"{name} cancelled")
+
+    def kill(self, result):
+        self.killed.append(result.name)
+        return True
+
+
+def test_scheduler_times_out_steps():
+    graph = graph_of(
+        StepNode('slow', 'reports.slow', {'raw.a'}),
+        StepNode('after_slow', 'reports.after_slow', {'reports.slow'}),
+        StepNode('fast', 'reports.fast', {'raw.b'}),
+    )
+    executor = BlockingExecutor()
+
+    started = time.perf_counter()
+    result = executor.run(graph, timeout=0.1)
+
+    assert time.perf_counter() - started < 2
+    assert result.steps['slow'].status == StepStatus.CANCELLED
+    assert result.steps['slow'].error == "Timed out after 0.1s"
+    assert result.steps['after_slow'].status == StepStatus.SKIPPED
+    assert result.steps['fast'].status == StepStatus.SUCCESS
+    assert executor.killed == ['slow']
+
+
+def test_scheduler_cancels_run():
+    graph = graph_of(
+        StepNode('slow1', 'reports.slow1', {'raw.a'}),
+        StepNode('slow2', 'reports.slow2', {'raw.b'}),
+        StepNode('waiting', 'reports.waiting', {'raw.c'}),
+    )
+    executor = BlockingExecutor()
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+
+    result = executor.run(graph, cancel=cancel)
+
+    assert result.steps['slow1'].status == StepStatus.CANCELLED
+    assert result.steps['slow2'].status == StepStatus.CANCELLED
+    assert result.steps['slow1'].error == "Cancelled"
+    assert result.steps['waiting'].status == StepStatus.SKIPPED
+    assert sorted(executor.killed) == ['slow1', 'slow2']
+
+
+def test_scheduler_respects_worker_slots():
+    graph = graph_of(
+        StepNode('heavy', 'reports.heavy', {'raw.a'}, concurrency=2),
+        StepNode('huge', 'reports.huge', {'raw.b'}, concurrency=8),
+        *[StepNode(f"light{i}", f"reports.light{i}", {'raw.c'}) for i in range(4)],
+    )
+    executor = RecordingExecutor(max_workers=3)
+
+    result = executor.run(graph)
+
+    assert executor.peak <= 3
+    assert set(result.status.values()) == {StepStatus.SUCCESS}
+
+
+def test_dependents_start_after_their_dependencies():
+    graph = graph_of(
+        StepNode('total', 'reports.total', {'reports.daily'}),
+        StepNode('daily', 'reports.daily', {'raw.trades'}),
+    )
+    executor = RecordingExecutor(max_workers=4)
+    executor.run(graph)
+    assert executor.started == ['daily', 'total']
+
+
+def test_failure_skips_downstream_steps_only():
+    graph = graph_of(
+        StepNode('daily', 'reports.daily', {'raw.trades'}),
+        StepNode('total', 'reports.total', {'reports.daily'}),
+        StepNode('report', 'reports.report', {'reports.total'}),
+        StepNode('clients', 'reports.clients', {'raw.clients'}),
+    )
+    result = RecordingExecutor(max_workers=2, fail={'daily'}).run(graph)
+
+    assert result.status == {
+        'daily': StepStatus.FAILED,
+        'total': StepStatus.SKIPPED,
+        'report': StepStatus.SKIPPED,
+        'clients': StepStatus.SUCCESS,
+    }
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from etl_lite.core.parser import ParseCache, ParsingError, parse_sql_files
+
+STEP = """-- @target.table: Step {i}
+--   name: reports.t{i}
+--   engine: MergeTree
+--   order_by: [a]
+--   columns: {{a: UInt8}}
+
+-- @main
+SELECT a FROM raw.source
+"""
+
+
+def write_steps(directory: Path, count: int) -> list:
+    paths = []
+    for i in range(count):
+        path = directory / f"{i:03}.sql"
+        path.write_text(STEP.format(i=i))
+        paths.append(path)
+    return paths
+
+
+def test_parse_error_in_worker_is_reported(tmp_path):
+    paths = write_steps(tmp_path, 70)
+    paths[5].write_text("-- @target.table: Broken\n--   name: [unclosed\n\n-- @main\nSELECT 1\n")
+
+    with pytest.raises(ParsingError, match='005.sql'):
+        parse_sql_files(paths, cache=None, max_workers=2)
+
+
+def test_parse_errors_collected_per_file(tmp_path):
+    paths = write_steps(tmp_path, 70)
+    paths[5].write_text("-- @target.table: Broken\n--   name: [unclosed\n\n-- @main\nSELECT 1\n")
+
+    errors = {}
+    parsed = parse_sql_files(paths, cache=None, max_workers=2, errors=errors)
+    assert list(errors) == [paths[5]]
+    assert len(parsed) == 69
+
+
+def test_disk_cache_entry_reads_query_of_its_own_file(tmp_path):
+    first, second = tmp_path / 'a' / 'x.sql', tmp_path / 'b' / 'y.sql'
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_text(STEP.format(i=1))
+    cache_dir = tmp_path / 'cache'
+
+    ParseCache(cache_dir).get(first)
+    metadata = ParseCache(cache_dir).get(second)
+    first.unlink()
+
+    assert metadata.query == 'SELECT a FROM raw.source'
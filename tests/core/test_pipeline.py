@@ -0,0 +1,188 @@
+import pytest
+
+from etl_lite.core.executor import Executor, ParallelExecutor
+from etl_lite.core.parser import ParsingError, parse_sql_file
+from etl_lite.core.pipeline import Pipeline, load_directory
+from etl_lite.core.results import StepStatus
+from etl_lite.core.state import RunStateStore
+from etl_lite.core.strategy import StrategyError
+
+DAILY = """
+    -- @meta.engine: ClickHouse
+    --   type: clickhouse
+
+    -- @target.table: Daily volume
+    --   name: reports.daily
+    --   engine: MergeTree
+    --   order_by: [client_id, day]
+    --   columns: {client_id: UInt64, day: Date, amount: Float64}
+    --   strategy: replace
+
+    -- @test.no_duplicates: Unique days
+    --   name: unique_days
+    --   columns: [client_id, day]
+
+    -- @main
+    SELECT client_id, day, sum(amount) AS amount FROM raw.trades GROUP BY client_id, day
+"""
+
+TOTAL = """
+    -- @target.table: Total volume
+    --   name: reports.total
+    --   engine: MergeTree
+    --   order_by: [client_id]
+    --   columns: {client_id: UInt64, amount: Float64}
+    --   strategy: replace
+
+    -- @test.range: Positive
+    --   name: positive
+    --   column: amount
+    --   min: {min}
+    --   max: 1000000
+
+    -- @main
+    SELECT client_id, sum(amount) AS amount FROM reports.daily GROUP BY client_id
+"""
+
+REGION = """
+    -- @meta.parameters:
+    --   region: [emea, apac]
+
+    -- @target.table: Volume of a region
+    --   name: reports.volume_{{region}}
+    --   engine: MergeTree
+    --   order_by: [client_id]
+    --   columns: {client_id: UInt64, amount: Float64}
+
+    -- @main
+    SELECT client_id, sum(amount) AS amount FROM raw.trades WHERE region = {{region}} GROUP BY client_id
+"""
+
+
+def statuses(result):
+    return {name: step.status for name, step in result.steps.items()}
+
+
+def test_steps_run_after_the_steps_they_read_from(step_dir, pool, connection, trades):
+    # File order is the reverse of the dependency order
+    directory = step_dir({'01_total': TOTAL.replace('{min}', '0'), '02_daily': DAILY})
+
+    result = ParallelExecutor(pool).run(load_directory(directory))
+
+    assert list(result.steps) == ['02_daily', '01_total']
+    assert result.succeeded
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(16,)]
+    assert connection.execute("SELECT amount FROM reports.total WHERE client_id = 1") == [(46.0,)]
+
+
+def test_failed_check_keeps_replaced_target_and_skips_downstream(step_dir, pool, connection, trades):
+    directory = step_dir({'01_daily': DAILY, '02_total': TOTAL.replace('{min}', '0')})
+    ParallelExecutor(pool).run(load_directory(directory))
+
+    connection.execute("INSERT INTO raw.trades (client_id, day, amount, region) VALUES",
+                       [(9, trades[0][1], 1.0, 'emea')])
+    directory = step_dir({'02_total': TOTAL.replace('{min}', '100')})
+    result = ParallelExecutor(pool).run(load_directory(directory))
+
+    assert statuses(result) == {'01_daily': StepStatus.SUCCESS, '02_total': StepStatus.FAILED}
+    # The previous total is still in place and no staging table is left behind
+    assert connection.execute("SELECT count(*) FROM reports.total") == [(4,)]
+    assert connection.execute("SELECT name FROM reports.sqlite_master ORDER BY name") == [('daily',), ('total',)]
+
+
+def test_templated_step_fans_out_over_parameters(step_dir, pool, connection, trades):
+    result = ParallelExecutor(pool).run(load_directory(step_dir({'03_region': REGION})))
+
+    assert statuses(result) == {'03_region[emea]': StepStatus.SUCCESS, '03_region[apac]': StepStatus.SUCCESS}
+    assert connection.execute("SELECT client_id FROM reports.volume_emea ORDER BY client_id") == [(1,), (3,)]
+    assert connection.execute("SELECT client_id FROM reports.volume_apac ORDER BY client_id") == [(2,), (4,)]
+
+
+def test_unchanged_steps_are_fresh(step_dir, pool, connection, trades, tmp_path):
+    directory = step_dir({'01_daily': DAILY, '02_total': TOTAL.replace('{min}', '0')})
+    executor = ParallelExecutor(pool, state=RunStateStore(tmp_path / 'state.sqlite'))
+
+    executor.run(load_directory(directory))
+    assert set(statuses(executor.run(load_directory(directory))).values()) == {StepStatus.FRESH}
+
+    connection.execute("INSERT INTO raw.trades (client_id, day, amount, region) VALUES",
+                       [(9, trades[0][1], 1.0, 'emea')])
+    assert statuses(executor.run(load_directory(directory))) == {
+        '01_daily': StepStatus.SUCCESS, '02_total': StepStatus.SUCCESS,
+    }
+    assert connection.execute("SELECT count(*) FROM reports.total") == [(5,)]
+
+
+def test_pipeline_executes_collected_steps_on_engine(step_dir, sqlite_engine, connection, trades):
+    directory = step_dir({'01_daily': DAILY, '02_total': TOTAL.replace('{min}', '0')})
+
+    result = Pipeline(connection, engine=sqlite_engine).collect_sql_steps(directory).execute()
+
+    assert result.succeeded
+    assert connection.execute("SELECT sum(amount) FROM reports.total") == [(sum(row[2] for row in trades),)]
+
+
+INCREMENTAL_REPLACE = """
+    -- @target.table: Daily volume
+    --   name: reports.daily
+    --   engine: MergeTree
+    --   order_by: [client_id, day]
+    --   columns: {client_id: UInt64, day: Date, amount: Float64}
+    --   strategy: replace
+
+    -- @strategy.incremental: New days
+    --   column: day
+    --   window: 1 day
+    --   start: latest
+    --   initial: 2024-01-01
+    --   end: 2024-01-05
+
+    -- @main
+    SELECT client_id, day, sum(amount) AS amount FROM raw.trades GROUP BY client_id, day
+"""
+
+
+def test_incremental_replace_target_is_rejected(step_dir):
+    directory = step_dir({'01_daily': INCREMENTAL_REPLACE})
+
+    with pytest.raises(ParsingError, match="strategy.incremental can't load a target with strategy 'replace'"):
+        load_directory(directory)
+
+
+def test_incremental_replace_step_keeps_target_data(step_dir, connection, trades):
+    # Loaded before, e.g. by the same step with strategy 'append'
+    connection.execute("CREATE TABLE reports.daily (client_id UInt64, day Date, amount Float64) "
+                       "ENGINE = MergeTree ORDER BY (client_id, day)")
+    connection.execute("INSERT INTO reports.daily (client_id, day, amount) VALUES", [row[:3] for row in trades])
+    path = step_dir({'01_daily': INCREMENTAL_REPLACE}) / '01_daily.sql'
+
+    with pytest.raises(StrategyError):
+        Executor(connection).execute_step(parse_sql_file(path, cache=None))
+
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(16,)]
+
+
+def test_steps_reading_unversioned_tables_always_run(step_dir, pool, connection, trades, tmp_path):
+    # The engine can't tell whether a view changed, it has no version
+    connection.execute("CREATE VIEW raw.trades_view AS SELECT * FROM raw.trades")
+    directory = step_dir({'01_daily': DAILY.replace('FROM raw.trades', 'FROM raw.trades_view')})
+    executor = ParallelExecutor(pool, state=RunStateStore(tmp_path / 'state.sqlite'))
+
+    executor.run(load_directory(directory))
+    connection.execute("INSERT INTO raw.trades (client_id, day, amount, region) VALUES",
+                       [(9, trades[0][1], 1.0, 'emea')])
+
+    assert statuses(executor.run(load_directory(directory))) == {'01_daily': StepStatus.SUCCESS}
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(17,)]
+
+
+def test_pipeline_run_replaces_target(step_dir, sqlite_engine, connection, trades):
+    path = step_dir({'01_daily': DAILY}) / '01_daily.sql'
+    pipeline = Pipeline(connection, engine=sqlite_engine)
+
+    pipeline.run(path)
+    result = pipeline.run(path)
+
+    assert result.status == StepStatus.SUCCESS
+    assert [check.name for check in result.checks] == ['unique_days']
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(16,)]
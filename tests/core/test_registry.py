@@ -0,0 +1,42 @@
+import pytest
+
+from etl_lite.core.parser import ParsingError, parse_sql_text
+from etl_lite.core.registry import FunctionRegistry, registry
+
+
+def test_engine_functions_fall_back_to_sql():
+    assert registry.get('clickhouse', 'target', 'table') is registry.get('sql', 'target', 'table')
+
+
+def test_unknown_engine_raises():
+    with pytest.raises(ValueError, match="Unknown engine 'clickhous'.*clickhouse"):
+        registry.get('clickhous', 'target', 'table')
+
+
+def test_unknown_category_raises():
+    with pytest.raises(ValueError, match="Unknown metadata category 'tests'"):
+        registry.get('clickhouse', 'tests', 'range')
+
+
+def test_missing_function_raises():
+    local = FunctionRegistry()
+    local.register_engine('sql', 'etl_lite.modules.sql', fallback=None)
+    with pytest.raises(AttributeError, match='test.nonexistent'):
+        local.get('sql', 'test', 'nonexistent')
+
+
+def test_misspelled_step_engine_is_a_parsing_error():
+    text = """-- @meta.engine: Engine
+--   type: clickhous
+
+-- @target.table: Target
+--   name: reports.t
+--   engine: MergeTree
+--   order_by: [a]
+--   columns: {a: UInt8}
+
+-- @main
+SELECT a FROM raw.source
+"""
+    with pytest.raises(ParsingError, match='known engines'):
+        parse_sql_text(text)
@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from etl_lite.core.results import InstrumentedConnection, StepCancelled, StepResult
+
+
+class DriverConnection:
+    """Client-like connection reporting the query_id of its last query"""
+
+    def __init__(self):
+        self.last_query = None
+        self.inserted = []
+
+    def _run(self, query_id):
+        self.last_query = SimpleNamespace(query_id=query_id, progress=None, profile_info=None)
+
+    def execute(self, query, params=None, query_id=None, **kwargs):
+        self._run(query_id)
+        return [(1,)]
+
+    def execute_iter(self, query, params=None, query_id=None, **kwargs):
+        self._run(query_id)
+        return iter([(1,), (2,), (3,)])
+
+    def query_dataframe(self, query, params=None, query_id=None, **kwargs):
+        self._run(query_id)
+        return [{'x': 1}]
+
+    def insert_dataframe(self, query, dataframe, query_id=None, **kwargs):
+        self._run(query_id)
+        self.inserted.append(dataframe)
+        return len(dataframe)
+
+
+def test_streamed_and_dataframe_queries_are_recorded():
+    result = StepResult('step')
+    connection = InstrumentedConnection(DriverConnection(), result, phase='main')
+
+    rows = connection.execute_iter("SELECT x FROM t")
+    assert len(result.queries) == 1
+    assert list(rows) == [(1,), (2,), (3,)]
+    connection.query_dataframe("SELECT x FROM t")
+    assert connection.insert_dataframe("INSERT INTO t VALUES", [{'x': 1}]) == 1
+
+    assert len(result.queries) == 3
+    assert all(query.phase == 'main' and query.query_id for query in result.queries)
+    assert len(set(result.query_ids)) == 3
+
+
+def test_streamed_query_stops_when_cancelled():
+    cancel = threading.Event()
+    connection = InstrumentedConnection(DriverConnection(), StepResult('step'), cancel=cancel)
+
+    rows = connection.execute_iter("SELECT x FROM t")
+    cancel.set()
+    with pytest.raises(StepCancelled):
+        next(rows)
+    with pytest.raises(StepCancelled):
+        connection.query_dataframe("SELECT x FROM t")
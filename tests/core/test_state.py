@@ -0,0 +1,107 @@
+import pytest
+
+from etl_lite.core.state import PartitionTotals, RunStateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStateStore(tmp_path / 'state.sqlite')
+    yield store
+    store.close()
+
+
+class PartitionedEngine:
+    """Engine reporting versions of the partitions of one in-memory table"""
+
+    def __init__(self):
+        self.versions = {}
+
+    def partition_versions(self, connection, table):
+        return dict(self.versions)
+
+
+class PartitionedConnection:
+    """Answers per-partition aggregate queries over in-memory rows"""
+
+    def __init__(self):
+        self.rows = {}      # partition -> amounts
+        self.scanned = []
+
+    def execute(self, query, params=None):
+        partitions = params['partitions']
+        self.scanned.append(set(partitions))
+        return [
+            (partition, sum(self.rows[partition]), len(self.rows[partition]))
+            for partition in partitions if self.rows.get(partition)
+        ]
+
+
+def load(engine, connection, partition, amounts):
+    connection.rows[partition] = amounts
+    engine.versions[partition] = engine.versions.get(partition, 0) + 1
+
+
+def test_step_state_round_trip(store, tmp_path):
+    store.set('daily', 'abc', {'raw.trades': 3})
+
+    assert store.get('daily') == ('abc', {'raw.trades': 3})
+    assert store.is_fresh('daily', 'abc', {'raw.trades': 3})
+    assert not store.is_fresh('daily', 'abc', {'raw.trades': 4})
+    assert not store.is_fresh('daily', 'def', {'raw.trades': 3})
+    assert not store.is_fresh('daily', 'abc', None)
+
+    reopened = RunStateStore(tmp_path / 'state.sqlite')
+    assert reopened.get('daily') == ('abc', {'raw.trades': 3})
+    reopened.invalidate(['daily'])
+    assert reopened.get('daily') is None
+    reopened.close()
+
+
+def test_only_changed_partitions_are_aggregated(store):
+    engine, connection = PartitionedEngine(), PartitionedConnection()
+    totals = PartitionTotals(engine, store)
+    expressions = ['sum(amount)', 'count(*)']
+    load(engine, connection, '20240101', [1.0, 2.0])
+    load(engine, connection, '20240102', [3.0])
+
+    assert totals.compute(connection, 'reports.daily', expressions) == {'sum(amount)': 6.0, 'count(*)': 3}
+
+    load(engine, connection, '20240103', [4.0, 5.0])
+    assert totals.compute(connection, 'reports.daily', expressions) == {'sum(amount)': 15.0, 'count(*)': 5}
+    assert connection.scanned[-1] == {'20240103'}
+
+    # Unchanged table needs no scan at all
+    assert totals.compute(connection, 'reports.daily', expressions) == {'sum(amount)': 15.0, 'count(*)': 5}
+    assert len(connection.scanned) == 2
+
+
+def test_replaced_and_dropped_partitions_are_reflected(store):
+    engine, connection = PartitionedEngine(), PartitionedConnection()
+    totals = PartitionTotals(engine, store)
+    load(engine, connection, '20240101', [1.0, 2.0])
+    load(engine, connection, '20240102', [3.0])
+    totals.compute(connection, 'reports.daily', ['sum(amount)'])
+
+    load(engine, connection, '20240101', [10.0])
+    del engine.versions['20240102']
+
+    assert totals.compute(connection, 'reports.daily', ['sum(amount)']) == {'sum(amount)': 10.0}
+    assert connection.scanned[-1] == {'20240101'}
+    assert set(store.partition_totals('reports.daily', 'sum(amount)')) == {'20240101'}
+
+
+def test_new_expression_scans_all_partitions(store):
+    engine, connection = PartitionedEngine(), PartitionedConnection()
+    totals = PartitionTotals(engine, store)
+    load(engine, connection, '20240101', [1.0, 2.0])
+    load(engine, connection, '20240102', [3.0])
+    totals.compute(connection, 'reports.daily', ['sum(amount)'])
+
+    assert totals.compute(connection, 'reports.daily', ['sum(amount)', 'count(*)']) == {
+        'sum(amount)': 6.0, 'count(*)': 3,
+    }
+    assert connection.scanned[-1] == {'20240101', '20240102'}
+
+
+def test_engine_without_partition_versions_is_not_supported(store, sqlite_engine, connection, trades):
+    assert PartitionTotals(sqlite_engine, store).compute(connection, 'raw.trades', ['count(*)']) is None
@@ -0,0 +1,42 @@
+import datetime
+
+from etl_lite.core.executor import Executor
+from etl_lite.core.parser import parse_sql_file
+from etl_lite.core.strategy import Chunk
+
+INCREMENTAL = """
+    -- @target.table: Daily volume
+    --   name: reports.daily
+    --   engine: MergeTree
+    --   order_by: [client_id, day]
+    --   columns: {client_id: UInt64, day: Date, amount: Float64}
+
+    -- @strategy.incremental: New days
+    --   column: day
+    --   window: 1 day
+    --   start: 2024-01-02
+    --   end: 2024-01-05
+
+    -- @main
+    SELECT client_id, day, sum(amount) AS amount FROM raw.trades GROUP BY client_id, day;  -- per day
+"""
+
+
+def test_incremental_append_without_watermarks_continues_after_loaded_rows(step_dir, connection, trades):
+    path = step_dir({'01_daily': INCREMENTAL}) / '01_daily.sql'
+
+    Executor(connection).execute_step(parse_sql_file(path, cache=None))
+    assert connection.execute("SELECT count(*), min(day) FROM reports.daily") == [(12, datetime.date(2024, 1, 2))]
+
+    connection.execute("INSERT INTO raw.trades (client_id, day, amount, region) VALUES",
+                       [(1, trades[0][1].replace(day=5), 1.0, 'emea')])
+    Executor(connection).execute_step(parse_sql_file(path, cache=None))
+    # Windows already loaded are not loaded again, the new day is past `end`
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(12,)]
+
+
+def test_terminated_query_is_wrapped_into_chunk_filter():
+    query = Executor(None)._prepare_query(
+        "SELECT * FROM raw.trades;\n-- end of step\n", 'reports.daily', Chunk("day = %(day)s", {'day': 1}),
+    )
+    assert query == "INSERT INTO reports.daily SELECT * FROM (SELECT * FROM raw.trades\n) WHERE day = %(day)s"
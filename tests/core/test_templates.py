@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+
+from etl_lite.core.executor import Executor
+from etl_lite.core.templates import TemplateError, render_query, server_side_query
+
+QUERY = "SELECT day, sum(amount) FROM raw.{{table}} WHERE day >= {{day}} AND note LIKE 'x%' GROUP BY day"
+
+
+def test_values_become_parameters_and_tables_are_substituted():
+    query = render_query(QUERY, {'table': 'trades_emea', 'day': datetime.date(2024, 1, 2)})
+    assert query == (
+        "SELECT day, sum(amount) FROM raw.trades_emea WHERE day >= %(day)s AND note LIKE 'x%%' GROUP BY day"
+    )
+
+
+def test_table_placeholders_must_be_identifiers():
+    with pytest.raises(TemplateError):
+        render_query(QUERY, {'table': 'trades; DROP TABLE raw.trades', 'day': '2024-01-02'})
+    with pytest.raises(TemplateError, match='day'):
+        render_query(QUERY, {'table': 'trades'})
+
+
+def test_server_side_query_declares_parameter_types():
+    query = render_query(QUERY, {'table': 'trades_emea', 'day': datetime.date(2024, 1, 2)})
+    query += " HAVING count() > %(rows)s AND %(ids)s != []"
+    params = {'day': datetime.date(2024, 1, 2), 'rows': 10, 'ids': [1, 2]}
+    assert server_side_query(query, params) == (
+        "SELECT day, sum(amount) FROM raw.trades_emea WHERE day >= {day:Date} AND note LIKE 'x%' GROUP BY day"
+        " HAVING count() > {rows:Int64} AND {ids:Array(Int64)} != []"
+    )
+    # Values without a ClickHouse type are left to the driver
+    assert server_side_query(query, {**params, 'ids': (1, 2)}) is None
+    assert server_side_query(query, {**params, 'rows': None}) is None
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=None, **kwargs):
+        self.queries.append((query, params, kwargs))
+        return []
+
+
+def test_executor_binds_parameters_on_the_server_when_the_engine_can():
+    params = {'day': datetime.date(2024, 1, 2)}
+    query = "INSERT INTO reports.daily SELECT * FROM raw.trades WHERE day = %(day)s"
+
+    connection = RecordingConnection()
+    Executor(connection, server_side_params=True)._execute_main(connection, query, params)
+    Executor(connection)._execute_main(connection, query, params)
+
+    assert connection.queries == [
+        ("INSERT INTO reports.daily SELECT * FROM raw.trades WHERE day = {day:Date}", params,
+         {'settings': {'server_side_params': True}}),
+        (query, params, {}),
+    ]
+
+
+def test_placeholders_in_literals_and_comments_are_kept():
+    query = "SELECT '{{day}}', day -- {{day}} or {{missing}}\nFROM raw.trades WHERE day = {{day}} AND note = '%'"
+    rendered = render_query(query, {'day': datetime.date(2024, 1, 2)})
+
+    assert rendered == (
+        "SELECT '{{day}}', day -- {{day}} or {{missing}}\nFROM raw.trades WHERE day = %(day)s AND note = '%%'"
+    )
+    assert rendered % {'day': "'2024-01-02'"} == (
+        "SELECT '{{day}}', day -- {{day}} or {{missing}}\nFROM raw.trades WHERE day = '2024-01-02' AND note = '%'"
+    )
+    assert server_side_query(rendered, {'day': datetime.date(2024, 1, 2)}) == (
+        "SELECT '{{day}}', day -- {{day}} or {{missing}}\nFROM raw.trades WHERE day = {day:Date} AND note = '%'"
+    )
@@ -0,0 +1,67 @@
+from etl_lite.clickhouse.connection import ClickHouseEngine
+from etl_lite.clickhouse.tests import no_duplicates
+from etl_lite.core.checks import CheckPlanner
+
+
+class SystemTablesConnection:
+    """Answers the system table queries of ClickHouseEngine.table_versions"""
+
+    def __init__(self, tables, parts):
+        self.tables = tables
+        self.parts = parts
+
+    def execute(self, query, params=None, **kwargs):
+        if 'currentDatabase()' in query and 'system' not in query:
+            return [('default',)]
+        if 'FROM system.tables' in query:
+            return self.tables
+        if 'FROM system.parts' in query:
+            return self.parts
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+def test_merge_tree_tables_are_versioned_by_their_parts():
+    connection = SystemTablesConnection(
+        tables=[('raw', 'trades', 100, 2048, '2024-01-01 00:00:00')],
+        parts=[('raw', 'trades', 3, 100, '2024-01-02 10:00:00')],
+    )
+    versions = ClickHouseEngine().table_versions(connection, ['raw.trades'])
+    assert versions == {'raw.trades': [100, 2048, '2024-01-01 00:00:00', 3, 100, '2024-01-02 10:00:00']}
+
+
+def test_tables_without_parts_have_no_version():
+    connection = SystemTablesConnection(
+        tables=[
+            ('raw', 'trades_view', None, None, '2024-01-01 00:00:00'),     # view
+            ('raw', 'trades_all', None, None, '2024-01-01 00:00:00'),      # Distributed
+            ('raw', 'trades_buffer', 10, 512, '2024-01-01 00:00:00'),      # Buffer, no parts
+        ],
+        parts=[],
+    )
+    versions = ClickHouseEngine().table_versions(
+        connection, ['raw.trades_view', 'raw.trades_all', 'raw.trades_buffer', 'raw.missing']
+    )
+    assert versions == {'raw.trades_view': None, 'raw.trades_all': None,
+                        'raw.trades_buffer': None, 'raw.missing': None}
+
+
+def test_fast_no_duplicates_is_only_green_beyond_estimation_error():
+    fast = no_duplicates.plan(name='unique', columns=['client_id', 'day']).fast
+    # An estimate overshooting by less than its error bound may hide duplicates
+    assert fast.evaluate(1000, 1000) == 'amber'
+    assert fast.evaluate(1000, 1010) == 'amber'
+    assert fast.evaluate(1000, 1011) == 'green'
+    assert fast.evaluate(1000, 995) == 'amber'
+
+
+def test_fast_no_duplicates_escalates_to_exact_check(connection, trades):
+    connection.execute("CREATE TABLE reports.daily (client_id UInt64, day Date) ENGINE = MergeTree ORDER BY day")
+    connection.execute("INSERT INTO reports.daily (client_id, day) VALUES",
+                       [row[:2] for row in trades] + [trades[0][:2]])
+    block = {'type': 'no_duplicates', 'function': no_duplicates,
+             'params': {'name': 'unique', 'columns': ['client_id', 'day'], 'fast': True}}
+
+    [result] = CheckPlanner(connection).run('reports.daily', [block], [])
+
+    assert result.status == 'red'
+    assert not result.approximate
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from etl_lite.engines.base import Engine
+from etl_lite.engines.connection import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.broken = False
+        self.closed = False
+        self.queries = []
+
+    def execute(self, query, params=None, settings=None):
+        if self.broken:
+            raise ConnectionError("connection lost")
+        self.queries.append((query, settings))
+        return [(1,)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEngine(Engine):
+    """Counts the connections it opens"""
+
+    def __init__(self):
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            connection = FakeConnection(len(self.opened))
+            self.opened.append(connection)
+            return connection
+
+
+def test_pool_opens_min_size_and_reuses_connections():
+    engine = FakeEngine()
+    pool = ConnectionPool(engine, min_size=2, max_size=4)
+    assert pool.size == 2
+
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first.raw is not second.raw
+    with pool.connection():
+        pass
+
+    assert len(engine.opened) == 2
+    pool.close()
+    assert pool.size == 0
+    assert all(connection.closed for connection in engine.opened)
+
+
+def test_pool_never_exceeds_max_size():
+    engine = FakeEngine()
+    pool = ConnectionPool(engine, min_size=0, max_size=3)
+    lock = threading.Lock()
+    busy = peak = 0
+
+    def work():
+        nonlocal busy, peak
+        with pool.connection():
+            with lock:
+                busy += 1
+                peak = max(peak, busy)
+            time.sleep(0.01)
+            with lock:
+                busy -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 3
+    assert len(engine.opened) == 3
+    assert pool.size == 3
+
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool(FakeEngine(), min_size=0, max_size=1, timeout=0.05)
+    connection = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    pool.release(connection)
+    assert pool.acquire() is connection
+
+
+def test_invalid_pool_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeEngine(), min_size=3, max_size=2)
+
+
+def test_session_settings_are_merged_into_queries():
+    engine = FakeEngine()
+    pool = ConnectionPool(engine, max_size=1)
+
+    with pool.connection(settings={'max_threads': 2, 'max_memory_usage': 10}) as connection:
+        connection.execute("SELECT 1", settings={'max_threads': 8})
+
+    assert engine.opened[0].queries == [("SELECT 1", {'max_threads': 8, 'max_memory_usage': 10})]
+
+
+def test_broken_connections_are_replaced():
+    engine = FakeEngine()
+    pool = ConnectionPool(engine, max_size=1, health_check_interval=0)
+
+    with pytest.raises(ConnectionError):
+        with pool.connection() as connection:
+            engine.opened[0].broken = True
+            connection.execute("SELECT 1")
+    with pool.connection() as connection:
+        assert connection.raw is engine.opened[1]
+
+    assert engine.opened[0].closed
+    assert pool.size == 1
+
+
+def test_idle_connections_are_health_checked():
+    engine = FakeEngine()
+    pool = ConnectionPool(engine, min_size=1, max_size=1, health_check_interval=0)
+    engine.opened[0].broken = True
+
+    with pool.connection() as connection:
+        assert connection.raw is engine.opened[1]
+
+
+def test_pool_around_existing_connection(sqlite_engine, connection, trades):
+    pool = ConnectionPool.from_connection(connection, sqlite_engine)
+
+    with pool.connection() as pooled:
+        assert pooled.execute("SELECT count(*) FROM raw.trades") == [(16,)]
+    assert pool.engine.table_versions(connection, ['raw.trades']) is not None
+    pool.close()
+
+    # The caller keeps owning the connection
+    assert connection.execute("SELECT count(*) FROM raw.trades") == [(16,)]
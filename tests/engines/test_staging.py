@@ -0,0 +1,16 @@
+from etl_lite.engines.staging import StagingTable
+
+
+def test_staging_table_replaces_target(connection, trades):
+    staging = StagingTable('raw.trades', suffix='load')
+    staging.create(connection)
+    try:
+        connection.execute(f"INSERT INTO {staging.name} (client_id, day, amount, region) VALUES", trades[:2])
+        assert connection.execute("SELECT count(*) FROM raw.trades") == [(16,)]
+        staging.swap(connection)
+    finally:
+        staging.drop(connection)
+
+    assert staging.name == 'raw.trades__staging_load'
+    assert connection.execute("SELECT count(*) FROM raw.trades") == [(2,)]
+    assert connection.execute("SELECT name FROM raw.sqlite_master") == [('trades',)]
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from etl_lite.clickhouse.connection import column_blocks
+from etl_lite.modules.pandas.connection import PandasConnection
+
+COLUMNS = [('client_id', 'UInt64'), ('amount', 'Float64')]
+
+
+def packet(columns, type_=1):
+    rows = len(columns[0]) if columns else 0
+    block = SimpleNamespace(columns_with_types=COLUMNS, num_rows=rows, get_columns=lambda: columns)
+    return SimpleNamespace(type=type_, block=block)
+
+
+def test_column_blocks_skip_header_and_totals():
+    packets = [
+        packet([]),
+        SimpleNamespace(type=3, block=None),
+        packet([np.array([1, 2]), np.array([1.0, 2.0])]),
+        packet([np.array([3]), np.array([3.0])], type_=7),
+    ]
+    blocks = list(column_blocks(packets, with_column_types=True))
+
+    assert blocks[0] == COLUMNS
+    assert len(blocks) == 2
+    assert list(blocks[1][0]) == [1, 2]
+
+
+class ColumnarClient:
+    columnar_iter = True
+
+    def __init__(self):
+        self.calls = []
+
+    def execute_iter(self, query, params=None, **kwargs):
+        self.calls.append(kwargs)
+        return iter([COLUMNS, [np.arange(5), np.arange(5) * 1.5], [np.arange(5, 7), np.arange(5, 7) * 1.5]])
+
+
+class RowClient:
+    def execute_iter(self, query, params=None, **kwargs):
+        return iter([COLUMNS] + [(i, i * 1.5) for i in range(7)])
+
+
+def test_columnar_blocks_become_dataframes_of_at_most_block_size_rows():
+    client = ColumnarClient()
+    frames = list(PandasConnection(client, block_size=3).iter_dataframes("SELECT * FROM raw.trades"))
+
+    assert client.calls[0]['columnar'] is True
+    assert [len(frame) for frame in frames] == [3, 2, 2]
+    assert list(frames[1]['client_id']) == [3, 4]
+    assert list(frames[2].columns) == ['client_id', 'amount']
+
+
+def test_row_streams_are_collected_into_blocks():
+    frames = list(PandasConnection(RowClient(), block_size=3).iter_dataframes("SELECT * FROM raw.trades"))
+
+    assert [len(frame) for frame in frames] == [3, 3, 1]
+    assert list(frames[2]['amount']) == [9.0]
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from etl_lite.core.results import InstrumentedConnection, StepResult
+from etl_lite.modules.pandas.connection import PandasConnection
+from etl_lite.modules.pandas.process_pool import ProcessStepPool, PythonStepOutput, _write_arrow
+
+
+class FrameClient:
+    """Client-like connection serving one DataFrame"""
+
+    def __init__(self):
+        self.last_query = None
+
+    def _run(self, query_id):
+        self.last_query = SimpleNamespace(query_id=query_id, progress=None, profile_info=None)
+
+    def query_dataframe(self, query, params=None, query_id=None, settings=None):
+        self._run(query_id)
+        return pd.DataFrame({'x': [1, 2, 3]})
+
+    def execute_iter(self, query, params=None, with_column_types=False, query_id=None, settings=None):
+        self._run(query_id)
+        return iter([[('x', 'UInt8')], (1,), (2,), (3,)])
+
+    def insert_dataframe(self, query, dataframe, query_id=None, settings=None):
+        self._run(query_id)
+        return len(dataframe)
+
+
+def test_pandas_connection_queries_are_recorded():
+    result = StepResult('transform')
+    connection = PandasConnection(InstrumentedConnection(FrameClient(), result), target='reports.x', block_size=2)
+
+    frame = connection.select_into_df("SELECT x FROM raw.x")
+    assert len(list(connection.iter_dataframes("SELECT x FROM raw.x"))) == 2
+    assert connection.save_result(frame) == 3
+
+    # One read, one stream and two insert blocks
+    assert len(result.queries) == 4
+    assert all(query.phase == 'main' and query.query_id for query in result.queries)
+
+
+def test_pool_removes_its_own_spool_dir(sqlite_engine, tmp_path):
+    with ProcessStepPool(sqlite_engine, max_workers=1) as pool:
+        spool_dir = pool.spool_dir
+        (spool_dir / 'unread.arrow').write_bytes(b'')
+    assert not spool_dir.exists()
+
+    with ProcessStepPool(sqlite_engine, max_workers=1, spool_dir=tmp_path / 'spool') as pool:
+        pass
+    assert (tmp_path / 'spool').exists()
+
+
+def test_output_file_is_deleted_once_read(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'step.arrow'
+    _write_arrow(pd.DataFrame({'x': [1, 2]}), str(path))
+    output = PythonStepOutput(StepResult('step'), path)
+
+    assert list(output.dataframe()['x']) == [1, 2]
+    assert not path.exists()
+    assert list(output.dataframe()['x']) == [1, 2]
@@ -0,0 +1,39 @@
+from etl_lite.utils.sql_parser import extract_tables
+
+
+def test_tables_of_joins_subqueries_and_in():
+    tables = extract_tables("""
+        SELECT t.client_id, c.name
+        FROM raw.trades AS t
+        JOIN raw.clients c ON c.id = t.client_id
+        WHERE t.client_id IN (SELECT id FROM ref.active) AND t.region IN ref.regions
+    """)
+    assert tables.tables == {'raw.trades', 'raw.clients', 'ref.active', 'ref.regions'}
+
+
+def test_ctes_functions_and_literals_are_not_tables():
+    tables = extract_tables("""
+        -- FROM raw.commented
+        WITH recent AS (SELECT * FROM raw.trades WHERE day > today() - 7)
+        SELECT extract(day FROM day), 'FROM raw.quoted'
+        FROM recent, numbers(10) ARRAY JOIN items
+    """)
+    assert tables.tables == {'raw.trades'}
+    assert tables.ctes == {'recent'}
+
+
+def test_placeholders_name_tables_after_from_and_join():
+    tables = extract_tables("SELECT * FROM raw.{{table}} JOIN {{source.table}} USING (id)")
+    assert tables.templated_tables == {'raw.{{table}}', '{{source.table}}'}
+    assert tables.placeholders == {'table', 'source.table'}
+    assert not tables.tables
+
+
+def test_placeholder_after_in_is_a_value_list():
+    tables = extract_tables("SELECT * FROM raw.trades WHERE client_id IN {{ids}} AND region IN ref.{{regions}}")
+    assert tables.tables == {'raw.trades'}
+    assert tables.templated_tables == {'ref.{{regions}}'}
+    assert tables.placeholders == {'ids', 'regions'}
+
+    tables = extract_tables("SELECT * FROM raw.trades WHERE client_id GLOBAL IN {{clients}}")
+    assert tables.templated_tables == {'{{clients}}'}
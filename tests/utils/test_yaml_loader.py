@@ -0,0 +1,65 @@
+import pytest
+import yaml
+
+from etl_lite.utils.yaml_loader import _Unsupported, load_yaml, parse_simple
+
+# Blocks as they reach the loader, with the "--" markers stripped
+SIMPLE_BLOCKS = [
+    "  name: reports.daily\n  engine: MergeTree\n  strategy: replace",
+    "  name: unique_days\n  columns: [client_id, day]",
+    "  name: positive\n  column: amount\n  min: 0\n  max: 1.5",
+    "  name: negative\n  column: amount\n  min: -10\n  max: 0",
+    "  order_by: []",
+    "  columns:\n    client_id: UInt64\n    day: Date\n  order_by: [client_id, day]",
+    "  column: day\n  window: 1 day\n  start: latest",
+    "  name: 'quoted: value'\n  region: \"emea\"",
+    "  name: total\n  tolerance: relative(0.01)",
+    "  name: custom\n  query: |",
+    "  column: amount\n\n  count: 16\n",
+]
+
+# Shapes only full YAML understands, or values YAML resolves to non-strings
+FALLBACK_BLOCKS = [
+    "  initial: 2024-01-01",
+    "  fast: true\n  enabled: no",
+    "  name: ~",
+    "  columns: {client_id: UInt64, day: Date}",
+    "  values: [1, [2, 3]]",
+    "  values: ['a, b', c]",
+    "  sets:\n    - {region: emea}\n    - {region: apac}",
+    "  name: x # comment",
+    "  ratio: 1e3",
+    "  version: 010",
+    "  columns: {}",
+    "  empty:",
+    "  nested:\n    deeper:\n      value: 1",
+    "  hex: 0x1F",
+    "  on: 1",
+]
+
+
+@pytest.mark.parametrize('text', SIMPLE_BLOCKS + FALLBACK_BLOCKS)
+def test_load_yaml_matches_safe_load(text):
+    assert load_yaml(text) == yaml.safe_load(text)
+
+
+@pytest.mark.parametrize('text', SIMPLE_BLOCKS)
+def test_common_blocks_skip_pyyaml(text):
+    assert parse_simple(text) == yaml.safe_load(text)
+
+
+@pytest.mark.parametrize('text', FALLBACK_BLOCKS)
+def test_other_blocks_fall_back_to_pyyaml(text):
+    with pytest.raises(_Unsupported):
+        parse_simple(text)
+
+
+@pytest.mark.parametrize('text', [
+    "  columns: [client_id, day\n  name: x",
+    "  name: a: b",
+])
+def test_invalid_yaml_is_reported(text):
+    with pytest.raises(yaml.YAMLError):
+        yaml.safe_load(text)
+    with pytest.raises(yaml.YAMLError):
+        load_yaml(text)
@@ -0,0 +1,120 @@
+import csv
+import datetime
+import gzip
+
+import pytest
+
+from etl_lite.modules.sql.targets import TableTarget
+from etl_lite.writers.base import WriterError, column_converter, stream_query
+from etl_lite.writers.files import CSVWriter
+from etl_lite.writers.table import TableWriter
+from etl_lite.writers.targets import open_writer
+
+COLUMNS = {'client_id': 'UInt64', 'day': 'Date', 'amount': 'Float64', 'region': 'String'}
+
+
+def daily_target(strategy='append'):
+    return TableTarget(name='reports.daily', engine='MergeTree', order_by=['client_id', 'day'],
+                       columns=COLUMNS, strategy=strategy)
+
+
+def test_converters_cast_to_column_types():
+    assert column_converter('UInt64')('12') == 12
+    assert column_converter('Date')('2024-01-31') == datetime.date(2024, 1, 31)
+    assert column_converter('Nullable(Float64)')(None) is None
+    assert column_converter('Array(UInt8)')(['1', 2]) == [1, 2]
+    assert column_converter('LowCardinality(String)')(5) == '5'
+    with pytest.raises(ValueError):
+        column_converter('Int32')(1.5)
+
+
+def test_csv_writer_streams_blocks(tmp_path, connection, trades):
+    path = tmp_path / 'export' / 'trades.csv'
+
+    with CSVWriter(path, COLUMNS, block_size=5) as writer:
+        writer.write(stream_query(connection, "SELECT * FROM raw.trades ORDER BY client_id, day"))
+
+    assert writer.blocks == 4
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(COLUMNS)
+    assert rows[1] == ['1', '2024-01-01', '10.0', 'emea']
+    assert len(rows) == 17
+    assert [p.name for p in path.parent.iterdir()] == ['trades.csv']
+
+
+def test_gzip_csv_writer(tmp_path, trades):
+    path = tmp_path / 'trades.csv.gz'
+
+    with open_writer(path, columns=COLUMNS) as writer:
+        writer.write({'client_id': row[0], 'day': row[1], 'amount': row[2], 'region': row[3]} for row in trades)
+
+    assert writer.compression == 'gzip'
+    with gzip.open(path, 'rt', newline='') as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 17
+    assert rows[-1] == ['4', '2024-01-04', '43.0', 'apac']
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    path = tmp_path / 'trades.csv'
+
+    with pytest.raises(WriterError, match='client_id'):
+        with CSVWriter(path, COLUMNS) as writer:
+            writer.write([(1, '2024-01-01', 1.0, 'emea'), ('x', '2024-01-01', 1.0, 'emea')])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_table_writer_appends_to_created_target(pool, connection, trades):
+    with TableWriter(pool, daily_target(), block_size=5) as writer:
+        writer.write(trades)
+    with TableWriter(pool, daily_target()) as writer:
+        writer.write(trades[:2])
+
+    assert connection.execute("SELECT count(*), sum(amount) FROM reports.daily") == [
+        (18, sum(row[2] for row in trades) + trades[0][2] + trades[1][2]),
+    ]
+
+
+def test_table_writer_replaces_target_through_staging(pool, connection, trades):
+    with TableWriter(pool, daily_target()) as writer:
+        writer.write(trades)
+
+    with TableWriter(pool, daily_target('replace')) as writer:
+        writer.write(trades[:3])
+        # Readers see the previous data until the writer is closed
+        assert connection.execute("SELECT count(*) FROM reports.daily") == [(16,)]
+
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(3,)]
+    assert connection.execute("SELECT name FROM reports.sqlite_master") == [('daily',)]
+
+
+def test_failed_replace_keeps_target(pool, connection, trades):
+    with TableWriter(pool, daily_target()) as writer:
+        writer.write(trades)
+
+    with pytest.raises(WriterError):
+        with TableWriter(pool, daily_target('replace')) as writer:
+            writer.write(trades[:3] + [('x',) + trades[0][1:]])
+
+    assert connection.execute("SELECT count(*) FROM reports.daily") == [(16,)]
+    assert connection.execute("SELECT name FROM reports.sqlite_master") == [('daily',)]
+
+
+def test_table_writer_reads_columns_of_existing_table(connection, trades):
+    with TableWriter(connection, 'raw.trades') as writer:
+        writer.write([(9, datetime.date(2024, 1, 5), 1.0, 'emea')])
+
+    assert list(writer.columns) == list(COLUMNS)
+    assert connection.execute("SELECT count(*) FROM raw.trades WHERE client_id = 9") == [(1,)]
+
+
+def test_parallel_inserts_use_pool_connections(pool, connection, trades):
+    with TableWriter(pool, daily_target(), block_size=2, insert_threads=3) as writer:
+        writer.write(trades)
+
+    assert writer.blocks == 8
+    assert connection.execute("SELECT count(*), sum(amount) FROM reports.daily") == [
+        (16, sum(row[2] for row in trades)),
+    ]